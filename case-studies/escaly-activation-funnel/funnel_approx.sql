@@ -0,0 +1,44 @@
+-- funnel_approx.sql
+-- Escaly Activation Funnel, approximate-distinct mode
+-- Same steps as funnel.sql, counted from HyperLogLog sketches (../scripts/hll_macros.sql):
+-- one sketch of user_ids per event day and step, merged across days for the totals.
+-- users_low / users_high are the 95% bounds of each estimate (± 2 x 1.6%).
+-- requires: ../scripts/hll_macros.sql
+-- Run with: python ../scripts/run_duckdb.py funnel_approx.sql
+
+CREATE OR REPLACE TABLE funnel_day_hll AS
+SELECT
+  occurred_at::DATE AS event_date,
+  CASE
+    WHEN event = 'signup_completed' THEN 'Signup Completed'
+    WHEN event = 'select_scale' THEN 'Scale Selected'
+    WHEN event = 'submit_assessment' AND status = 'complete' THEN 'Assessment Completed'
+    WHEN event = 'generate_report' THEN 'Report Generated (Activated)'
+  END AS step,
+  hll_sketch(user_id) AS users_hll
+FROM mock_events
+WHERE step IS NOT NULL
+GROUP BY 1,2;
+
+WITH counts AS (
+  SELECT step, hll_estimate(hll_merge(users_hll)) AS users_remaining
+  FROM funnel_day_hll
+  GROUP BY step
+),
+base AS (
+  SELECT MAX(users_remaining) AS total_signups FROM counts
+)
+SELECT
+  c.step,
+  c.users_remaining,
+  ROUND(100.0 * c.users_remaining / b.total_signups, 2) AS conversion_pct_from_start,
+  floor(c.users_remaining * (1 - 2 * hll_rse()))::BIGINT AS users_low,
+  ceil(c.users_remaining * (1 + 2 * hll_rse()))::BIGINT AS users_high
+FROM counts c
+CROSS JOIN base b
+ORDER BY CASE c.step
+           WHEN 'Signup Completed' THEN 1
+           WHEN 'Scale Selected' THEN 2
+           WHEN 'Assessment Completed' THEN 3
+           WHEN 'Report Generated (Activated)' THEN 4
+         END;
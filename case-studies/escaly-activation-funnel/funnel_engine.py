@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+funnel_engine.py
+
+Single-scan activation funnel for Escaly events.
+
+Steps are tracking-plan predicates, given in funnel order:
+
+    signup_completed
+    select_scale
+    submit_assessment:status=complete
+    generate_report:format=pdf,scale_name=Barthel
+
+Each step is validated against tracking-plan-escaly/events.json (event exists, the
+property is defined for it, enum/boolean/integer values are valid).
+
+Every event is tagged with a step bitmask in one scan (bit i = matches step i) and
+events matching no step are dropped before aggregation. Per user, the furthest step
+reached is then folded from the time-ordered masks, so an N-step funnel costs one
+pass over the events instead of N.
+
+  - mode "ordered": steps must happen in sequence (step i+1 after step i).
+  - mode "any":     steps may happen in any order after step 1; a user reaches step k
+                    when steps 1..k were all seen.
+  - window_minutes: later steps only count within N minutes of the user's first step 1
+                    (e.g. "activated within 24h of signup").
+  - session_timeout_minutes: later steps only count in the same computed session as the
+                    first step 1 (a session ends after N minutes of inactivity, see
+                    sessionize.py), e.g. 30 for "activated in the first session".
+
+Two backends give the same counts:
+  - duckdb: list aggregation + list_reduce over a table, CSV or Parquet.
+  - python: streaming pass over a time-sorted CSV/Parquet file; memory is O(users).
+
+Usage:
+  python case-studies/escaly-activation-funnel/funnel_engine.py
+  python case-studies/escaly-activation-funnel/funnel_engine.py --window_minutes 30 \
+      --steps signup_completed select_scale submit_assessment:status=complete generate_report
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+PLAN_PATH = Path("tracking-plan-escaly/events.json")
+DATA_PATH = Path("case-studies/escaly-activation-funnel/mock_data.csv")
+MODES = ("ordered", "any")
+ENGINES = ("duckdb", "python")
+
+# Same steps and labels as funnel.sql
+DEFAULT_STEPS = [
+    "signup_completed",
+    "select_scale",
+    "submit_assessment:status=complete",
+    "generate_report",
+]
+DEFAULT_LABELS = [
+    "Signup Completed",
+    "Scale Selected",
+    "Assessment Completed",
+    "Report Generated (Activated)",
+]
+
+
+# -------------------------
+# Step specs (validated against the tracking plan)
+# -------------------------
+
+@dataclass(frozen=True)
+class Step:
+    event: str
+    filters: Tuple[Tuple[str, str, str], ...] = ()  # (property, type, raw value)
+    label: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        if self.label:
+            return self.label
+        return self.event + "".join(f" {p}={v}" for p, _, v in self.filters)
+
+
+def load_plan(path: Path = PLAN_PATH) -> Dict[str, Dict[str, dict]]:
+    """Return {event: {property: definition}} with cross-event property references resolved."""
+    plan = json.loads(Path(path).read_text(encoding="utf-8"))
+    cross = plan.get("cross_event_properties", {})
+    events = {}
+    for ev in plan["events"]:
+        props = {}
+        for name, spec in ev.get("properties", {}).items():
+            props[name] = cross.get(name, spec) if "use" in spec else spec
+        events[ev["event"]] = props
+    return events
+
+
+def parse_step(spec: str, plan: Mapping[str, Mapping[str, dict]], label: Optional[str] = None) -> Step:
+    """Parse "event[:prop=value,...]" and check it against the tracking plan."""
+    event, _, rest = spec.partition(":")
+    event = event.strip()
+    if event not in plan:
+        raise ValueError(f"Unknown event {event!r} in step {spec!r}; not in the tracking plan.")
+    filters = []
+    for cond in filter(None, (c.strip() for c in rest.split(","))):
+        prop, eq, value = cond.partition("=")
+        prop, value = prop.strip(), value.strip()
+        if not eq or not prop:
+            raise ValueError(f"Malformed condition {cond!r} in step {spec!r}; expected prop=value.")
+        definition = plan[event].get(prop)
+        if definition is None:
+            raise ValueError(f"Property {prop!r} is not defined for {event!r} in the tracking plan.")
+        ptype = definition.get("type", "string")
+        if ptype == "enum" and value not in definition.get("enum", []):
+            raise ValueError(f"{event}.{prop}={value!r} is not one of {definition.get('enum')}.")
+        if ptype == "boolean" and value.lower() not in ("true", "false"):
+            raise ValueError(f"{event}.{prop} is boolean; got {value!r}.")
+        if ptype == "integer":
+            try:
+                int(value)
+            except ValueError:
+                raise ValueError(f"{event}.{prop} is integer; got {value!r}.") from None
+        filters.append((prop, ptype, value))
+    return Step(event, tuple(filters), label)
+
+
+def parse_steps(specs: Sequence[str], plan_path: Path = PLAN_PATH,
+                labels: Optional[Sequence[str]] = None) -> List[Step]:
+    if not specs:
+        raise ValueError("A funnel needs at least one step.")
+    if labels is not None and len(labels) != len(specs):
+        raise ValueError(f"Got {len(labels)} labels for {len(specs)} steps.")
+    plan = load_plan(plan_path)
+    return [parse_step(s, plan, labels[i] if labels else None) for i, s in enumerate(specs)]
+
+
+# -------------------------
+# DuckDB backend
+# -------------------------
+
+def _sql_literal(ptype: str, value: str) -> str:
+    if ptype == "boolean":
+        return value.upper()
+    if ptype == "integer":
+        return str(int(value))
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _step_predicate(step: Step, event_col: str) -> str:
+    conds = [f"{event_col} = {_sql_literal('string', step.event)}"]
+    conds += [f"{p} = {_sql_literal(t, v)}" for p, t, v in step.filters]
+    return " AND ".join(conds)
+
+
+def source_sql(source: str) -> str:
+    """Table name as-is; CSV / Parquet files (or a Parquet directory) as a table function."""
+    p = Path(source)
+    if p.is_dir():
+        return f"read_parquet('{p.as_posix()}/**/*.parquet', hive_partitioning=true)"
+    if p.suffix.lower() in (".parquet", ".pq"):
+        return f"read_parquet('{p.as_posix()}')"
+    if p.suffix.lower() == ".csv":
+        return f"read_csv_auto('{p.as_posix()}', HEADER=TRUE)"
+    return source
+
+
+def funnel_sql(
+    steps: Sequence[Step],
+    source: str = "mock_events",
+    mode: str = "ordered",
+    window_minutes: Optional[float] = None,
+    user_col: str = "user_id",
+    event_col: str = "event",
+    time_col: str = "occurred_at",
+    session_timeout_minutes: Optional[float] = None,
+) -> str:
+    """SQL returning one row per step: step_n, step, users_remaining, conversion percentages."""
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode {mode!r}; expected one of {MODES}.")
+    n = len(steps)
+    mask = " | ".join(
+        f"(CASE WHEN {_step_predicate(s, event_col)} THEN {1 << i} ELSE 0 END)" for i, s in enumerate(steps)
+    )
+    in_window = "TRUE" if window_minutes is None else f"e.t - acc.t0 <= {float(window_minutes) * 60.0}"
+    if session_timeout_minutes is not None:
+        in_window += " AND e.s = acc.s0"
+    if mode == "ordered":
+        # Advance one step per event, in time order, starting at the first step-1 event
+        fold = f"""CASE
+              WHEN acc.step = 0 AND (e.m & 1) > 0 THEN {{'step': 1, 'seen': 1, 't0': e.t, 's0': e.s}}
+              WHEN acc.step > 0 AND acc.step < {n} AND (e.m & (1 << acc.step)) > 0 AND {in_window}
+                THEN {{'step': acc.step + 1, 'seen': acc.seen, 't0': acc.t0, 's0': acc.s0}}
+              ELSE acc END"""
+        reached = "st.step"
+    else:
+        # Collect every step seen after the first step 1; furthest = leading run of set bits
+        fold = f"""CASE
+              WHEN acc.step = 0 AND (e.m & 1) > 0 THEN {{'step': 1, 'seen': e.m, 't0': e.t, 's0': e.s}}
+              WHEN acc.step > 0 AND {in_window} THEN {{'step': 1, 'seen': acc.seen | e.m, 't0': acc.t0, 's0': acc.s0}}
+              ELSE acc END"""
+        reached = "CASE WHEN st.step = 0 THEN 0 ELSE bit_count(xor(st.seen, st.seen + 1)) - 1 END"
+    labels = ", ".join(f"({i + 1}, {_sql_literal('string', s.name)})" for i, s in enumerate(steps))
+    scan = f"""
+  -- single scan: tag each event with the steps it satisfies
+  SELECT {user_col} AS user_id, epoch({time_col}) AS t, ({mask})::BIGINT AS m
+  FROM {source_sql(source)}
+  WHERE {user_col} IS NOT NULL"""
+    if session_timeout_minutes is None:
+        tagged = f"""tagged AS (
+  SELECT *, 0::BIGINT AS s FROM ({scan}
+  )
+),"""
+    else:
+        # Session number per event from gaps over ALL of the user's events (one window pass);
+        # RANGE frame so events with equal timestamps share a session
+        gap = float(session_timeout_minutes) * 60.0
+        tagged = f"""scanned AS ({scan}
+),
+gaps AS (
+  SELECT *, COALESCE(t - lag(t) OVER (PARTITION BY user_id ORDER BY t) > {gap}, FALSE)::INTEGER AS brk
+  FROM scanned
+),
+tagged AS (
+  SELECT user_id, t, m, (SUM(brk) OVER (PARTITION BY user_id ORDER BY t))::BIGINT AS s
+  FROM gaps
+),"""
+    return f"""
+WITH {tagged}
+per_user AS (
+  SELECT
+    user_id,
+    list_reduce(
+      list({{'t': t, 'm': m, 's': s}} ORDER BY t, m),
+      (acc, e) -> {fold},
+      {{'step': 0, 'seen': 0::BIGINT, 't0': NULL::DOUBLE, 's0': 0::BIGINT}}
+    ) AS st
+  FROM tagged
+  WHERE m > 0
+  GROUP BY user_id
+),
+furthest AS (
+  SELECT {reached} AS reached FROM per_user
+),
+labels(step_n, step) AS (VALUES {labels}),
+counts AS (
+  SELECT l.step_n, l.step, COUNT(f.reached) AS users_remaining
+  FROM labels l
+  LEFT JOIN furthest f ON f.reached >= l.step_n
+  GROUP BY 1,2
+)
+SELECT
+  step_n,
+  step,
+  users_remaining,
+  ROUND(100.0 * users_remaining / NULLIF(FIRST(users_remaining) OVER (ORDER BY step_n), 0), 2) AS conversion_pct_from_start,
+  ROUND(100.0 * users_remaining / NULLIF(LAG(users_remaining, 1, users_remaining) OVER (ORDER BY step_n), 0), 2) AS conversion_pct_from_previous
+FROM counts
+ORDER BY step_n
+"""
+
+
+def run_funnel(con, steps: Sequence[Step], source: str = "mock_events", mode: str = "ordered",
+               window_minutes: Optional[float] = None, **columns):
+    """Run the funnel in DuckDB; returns a DataFrame (one row per step)."""
+    return con.execute(funnel_sql(steps, source, mode, window_minutes, **columns)).fetchdf()
+
+
+# -------------------------
+# Streaming Python backend
+# -------------------------
+
+def _matches(step: Step, row: Mapping[str, str], event_col: str) -> bool:
+    if row.get(event_col) != step.event:
+        return False
+    for prop, ptype, value in step.filters:
+        got = row.get(prop)
+        got = "" if got is None else str(got)
+        if ptype == "boolean":
+            if got.lower() != value.lower():
+                return False
+        elif ptype == "integer":
+            try:
+                if int(float(got)) != int(value):
+                    return False
+            except ValueError:
+                return False
+        elif got != value:
+            return False
+    return True
+
+
+def _parse_ts(value) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def iter_rows(path: Path, columns: Optional[Sequence[str]] = None, batch_rows: int = 100_000) -> Iterator[Mapping]:
+    """Stream rows (dicts) from a CSV or Parquet file in file order."""
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq") or path.is_dir():
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(str(path), format="parquet", partitioning="hive")
+        for batch in dataset.to_batches(columns=list(columns) if columns else None, batch_size=batch_rows):
+            yield from batch.to_pylist()
+    else:
+        with path.open(newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def furthest_steps_stream(
+    rows: Iterable[Mapping],
+    steps: Sequence[Step],
+    mode: str = "ordered",
+    window_minutes: Optional[float] = None,
+    user_col: str = "user_id",
+    event_col: str = "event",
+    time_col: str = "occurred_at",
+    session_timeout_minutes: Optional[float] = None,
+) -> Dict[str, int]:
+    """One pass over time-sorted rows; returns {user_id: furthest step reached (1-based)}. Raises on unsorted rows."""
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode {mode!r}; expected one of {MODES}.")
+    n = len(steps)
+    win = None if window_minutes is None else float(window_minutes) * 60.0
+    by_event: Dict[str, List[int]] = {}
+    for i, s in enumerate(steps):
+        by_event.setdefault(s.event, []).append(i)
+    gap = None if session_timeout_minutes is None else float(session_timeout_minutes) * 60.0
+    last_t: Dict[str, float] = {}  # user -> time of their previous event (any event)
+    session: Dict[str, int] = {}   # user -> current session number
+    state: Dict[str, list] = {}  # user -> [step, seen_mask, t0, session at step 1]
+    full = (1 << n) - 1
+    now = float("-inf")
+    for row in rows:
+        idx = by_event.get(row.get(event_col))
+        user = row.get(user_col)
+        if not user:
+            continue
+        t = _parse_ts(row[time_col])
+        if t < now:
+            raise ValueError(f"Events are not sorted by {time_col} (sort the file or use --engine duckdb).")
+        now = t
+        s = 0
+        if gap is not None:
+            prev = last_t.get(user)
+            if prev is not None and t - prev > gap:
+                session[user] = session.get(user, 0) + 1
+            last_t[user] = t
+            s = session.get(user, 0)
+        if not idx:
+            continue
+        m = 0
+        for i in idx:
+            if _matches(steps[i], row, event_col):
+                m |= 1 << i
+        if not m:
+            continue
+        st = state.get(user)
+        if st is None:
+            if m & 1:
+                state[user] = [1, m if mode == "any" else 1, t, s]
+            continue
+        if (win is not None and t - st[2] > win) or s != st[3]:
+            continue
+        if mode == "ordered":
+            if st[0] < n and m & (1 << st[0]):
+                st[0] += 1
+        else:
+            st[1] |= m
+    if mode == "any":
+        out = {}
+        for user, st in state.items():
+            seen, k = st[1] & full, 0
+            while seen & (1 << k):
+                k += 1
+            out[user] = k
+        return out
+    return {user: st[0] for user, st in state.items()}
+
+
+def run_funnel_stream(path: Path, steps: Sequence[Step], mode: str = "ordered",
+                      window_minutes: Optional[float] = None, **columns) -> List[dict]:
+    """Streaming backend over a time-sorted file; same rows as run_funnel (as dicts)."""
+    reached = furthest_steps_stream(iter_rows(path), steps, mode, window_minutes, **columns)
+    counts = [0] * len(steps)
+    for k in reached.values():
+        for i in range(k):
+            counts[i] += 1
+    out = []
+    for i, s in enumerate(steps):
+        prev = counts[i - 1] if i else counts[0]
+        out.append({
+            "step_n": i + 1,
+            "step": s.name,
+            "users_remaining": counts[i],
+            "conversion_pct_from_start": round(100.0 * counts[i] / counts[0], 2) if counts[0] else None,
+            "conversion_pct_from_previous": round(100.0 * counts[i] / prev, 2) if prev else None,
+        })
+    return out
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-scan N-step activation funnel over Escaly events.")
+    parser.add_argument("--data", type=str, default=str(DATA_PATH),
+                        help="Events as CSV, Parquet file or partitioned Parquet directory")
+    parser.add_argument("--plan", type=str, default=str(PLAN_PATH), help="Tracking plan used to validate steps")
+    parser.add_argument("--steps", nargs="+", default=None,
+                        help="Ordered step specs: event[:prop=value,...] (default: the funnel.sql steps)")
+    parser.add_argument("--labels", nargs="+", default=None, help="Display label per step")
+    parser.add_argument("--mode", choices=MODES, default="ordered",
+                        help="ordered = steps in sequence; any = steps in any order after step 1")
+    parser.add_argument("--window_minutes", type=float, default=None,
+                        help="Only count later steps within N minutes of the first step")
+    parser.add_argument("--session_timeout_min", type=float, default=None,
+                        help="Only count later steps in step 1's session (ends after N idle minutes, e.g. 30)")
+    parser.add_argument("--engine", choices=ENGINES, default="duckdb",
+                        help="duckdb (single SQL pass) or python (streaming pass over a time-sorted file)")
+    args = parser.parse_args()
+
+    specs = args.steps or DEFAULT_STEPS
+    labels = args.labels if args.labels else (DEFAULT_LABELS if args.steps is None else None)
+    try:
+        steps = parse_steps(specs, Path(args.plan), labels)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.engine == "duckdb":
+        import duckdb
+        rows = run_funnel(duckdb.connect(), steps, args.data, args.mode, args.window_minutes,
+                          session_timeout_minutes=args.session_timeout_min)
+    else:
+        import pandas as pd
+        rows = pd.DataFrame(run_funnel_stream(Path(args.data), steps, args.mode, args.window_minutes,
+                                              session_timeout_minutes=args.session_timeout_min))
+
+    window = f", within {args.window_minutes:g} min of step 1" if args.window_minutes is not None else ""
+    if args.session_timeout_min is not None:
+        window += f", same session ({args.session_timeout_min:g} min timeout)"
+    print(f"=== Activation funnel ({args.mode}{window}) ===")
+    print(rows.to_markdown(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,15 @@
 #!/usr/bin/env python3
-import argparse, csv, random, uuid
+import argparse, hashlib, math, random, sys, tempfile
 from datetime import datetime, timedelta, timezone
+from itertools import chain
+from operator import itemgetter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from event_io import (DEFAULT_CHUNK_ROWS, FORMATS, INT, TIMESTAMP, Column, EventWriter, epoch,  # noqa: E402
+                      external_sort_events, merge_runs, read_compact_rows, resolve_format,
+                      write_compact_rows)
+from sharding import DEFAULT_SHARD_SIZE, map_shards, shard_ranges, shard_seed  # noqa: E402
 
 # -------------------------
 # Config (distributions)
@@ -39,6 +48,55 @@ DELTA_REPORT = (9, 30)  # from signup
 
 SESSION_TIMEOUT_MIN = 30
 
+# exp_onboarding_flow: users are bucketed by a hash of user_id (stable, and no draws from
+# `random`, so the behavioral stream of a one-variant run is unchanged). A variant's lift
+# scales the step-through probability of a funnel step, e.g. variant_a:generate_report=0.2
+# makes activation 20% more likely than in control.
+EXPERIMENT = "exp_onboarding_flow"
+EXPERIMENT_STEPS = ("select_scale", "submit_assessment", "generate_report")
+
+# Load profile (--load_profile): traffic shaped like production instead of one tidy session
+# per user. Signups and later sessions follow an hour-of-day (UTC) and day-of-week (Mon..Sun)
+# profile; every account gets a Pareto-distributed activity level that sets how often it
+# comes back and how long it stays, so event counts per account are heavy-tailed; events
+# within a return session come in bursts (lognormal gaps). A share of events arrives late
+# or twice (at-least-once delivery): received_at records the arrival and orders the stream.
+DIURNAL = [0.15, 0.1, 0.08, 0.08, 0.1, 0.2, 0.45, 0.8, 1.2, 1.5, 1.6, 1.55,
+           1.3, 1.45, 1.6, 1.55, 1.4, 1.15, 0.9, 0.7, 0.55, 0.45, 0.3, 0.2]
+WEEKLY = [1.0, 1.05, 1.05, 1.0, 0.85, 0.35, 0.25]
+PROFILE_MEAN = sum(DIURNAL) / 24 / max(DIURNAL) * sum(WEEKLY) / 7 / max(WEEKLY)
+LP_RETURN = {True: 0.85, False: 0.35}   # P(any return session | activated in session 1)
+LP_ACTIONS_ALPHA = 2.0                  # Pareto tail of assessments per return session
+LP_MAX_ACTIONS = 40
+LP_REPORT = 0.6                         # P(report | assessment) in return sessions
+LP_BURST_GAP_S = (45, 1.1)              # lognormal (median s, sigma) between events in a session
+LP_LATE_DELAY_S = (600, 1.5)            # lognormal (median s, sigma) of late arrivals
+LP_DUP_DELAY_S = (1, 300)               # redelivery delay of duplicates (uniform s)
+
+# Opaque ids (session/assessment/report) come from their own seeded stream, so they are
+# reproducible without shifting the behavioral draws made through `random`.
+_ID_RNG = random.Random()
+
+# Events are compact tuples until written (event_io.EventBuffer): epoch-second timestamps,
+# integer ids formatted on write, and every other column a dictionary-encoded categorical.
+USER_ID = "u_{:05d}"
+COLUMNS = [
+    Column("occurred_at", TIMESTAMP), Column("event"), Column("anonymous_id"),
+    Column("user_id", INT, USER_ID), Column("account_id", INT, "a_{:05d}"),
+    Column("session_id", INT, "s_{:08x}"), Column("scale_id"),
+    Column("assessment_id", INT, "as_{:010x}"), Column("report_id", INT, "r_{:010x}"),
+    Column("channel"), Column("plan_tier"), Column("utm_source"), Column("utm_medium"),
+    Column("utm_campaign"), Column("method"), Column("is_email_verified"), Column("status"),
+    Column("format"), Column("generation_ms", INT), Column("device_type"), Column("locale"),
+    Column("exp_onboarding_flow"),
+]
+FIELDNAMES = [c.name for c in COLUMNS]
+LOAD_COLUMNS = COLUMNS + [Column("received_at", TIMESTAMP)]
+
+def stream_columns(load=False):
+    """(columns, order field) of the output: load-profile streams add received_at and are ordered by it."""
+    return (LOAD_COLUMNS, "received_at") if load else (COLUMNS, "occurred_at")
+
 def choice_from_dist(d):
     r = random.random()
     cum = 0
@@ -48,17 +106,64 @@ def choice_from_dist(d):
             return k
     return list(d.keys())[-1]
 
-def iso(dt):
-    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+def rand_id(n):
+    """Random id of n hex digits from the seeded id stream, as an int (formatted on write)."""
+    return _ID_RNG.getrandbits(4 * n)
+
+def assign_variant(user_id, variants, weights=None):
+    """Deterministic variant for user_id: hash bucket in [0, 1) against the cumulative weights."""
+    if len(variants) == 1:
+        return variants[0]
+    digest = hashlib.sha256(f"{EXPERIMENT}:{user_id}".encode()).digest()
+    bucket = int.from_bytes(digest[:8], "big") / 2**64
+    weights = weights or [1] * len(variants)
+    cum = 0.0
+    for variant, w in zip(variants, weights):
+        cum += w / sum(weights)
+        if bucket < cum:
+            return variant
+    return variants[-1]
+
+def parse_lifts(specs, variants):
+    """{variant: {step: relative lift}} from variant:step=lift strings."""
+    lifts = {}
+    for spec in specs:
+        variant, _, rest = spec.partition(":")
+        step, _, value = rest.partition("=")
+        try:
+            if variant not in variants or step not in EXPERIMENT_STEPS:
+                raise ValueError
+            lifts.setdefault(variant, {})[step] = float(value)
+        except ValueError:
+            raise ValueError(f"--exp_lift expects <variant>:<step>=<lift> with a variant from {variants} "
+                             f"and a step from {list(EXPERIMENT_STEPS)}, got {spec!r}.") from None
+    return lifts
 
-def generate_users(n_users, start_date, end_date):
-    """Yield user dicts with signup timestamp and attributes."""
+def lifted(p, lift, step):
+    return max(0.0, min(0.99, p * (1 + lift.get(step, 0.0)))) if lift else p
+
+def profile_weight(t):
+    """Relative traffic at time t (diurnal x weekly, max 1): the acceptance rate used for thinning."""
+    return DIURNAL[t.hour] / max(DIURNAL) * WEEKLY[t.weekday()] / max(WEEKLY)
+
+def profile_time(day):
+    """A time on `day` (midnight) with the hour drawn from the diurnal profile."""
+    hour = random.choices(range(24), weights=DIURNAL)[0]
+    return day + timedelta(hours=hour, minutes=random.randint(0, 59), seconds=random.randint(0, 59))
+
+def generate_users(n_users, start_date, end_date, first_user=0, load=False):
+    """Yield user dicts with signup timestamp and attributes (user/account ids first_user..)."""
     span = (end_date - start_date).days
-    for i in range(n_users):
-        signup_day = start_date + timedelta(days=random.randint(0, max(0, span)))
-        signup_time = signup_day + timedelta(
-            hours=random.randint(8, 20), minutes=random.randint(0, 59), seconds=random.randint(0, 59)
-        )
+    days = [start_date + timedelta(days=d) for d in range(max(0, span) + 1)]
+    day_weights = [WEEKLY[d.weekday()] for d in days]
+    for i in range(first_user, first_user + n_users):
+        if load:
+            signup_time = profile_time(random.choices(days, weights=day_weights)[0])
+        else:
+            signup_day = start_date + timedelta(days=random.randint(0, max(0, span)))
+            signup_time = signup_day + timedelta(
+                hours=random.randint(8, 20), minutes=random.randint(0, 59), seconds=random.randint(0, 59)
+            )
         channel = choice_from_dist(CHANNEL_DIST)
         plan = choice_from_dist(PLAN_DIST)
         device = choice_from_dist(DEVICE_DIST)
@@ -67,8 +172,8 @@ def generate_users(n_users, start_date, end_date):
         email_verified = True if method != "email_password" else (random.random() < 0.95)
 
         yield {
-            "user_id": f"u_{i:05d}",
-            "account_id": f"a_{i:05d}",
+            "user_id": i,
+            "account_id": i,
             "signup_at": signup_time.replace(tzinfo=timezone.utc),
             "channel": channel,
             "plan_tier": plan,
@@ -90,99 +195,233 @@ def within_session(t0, t_next):
     return (t_next - t0).total_seconds() <= SESSION_TIMEOUT_MIN * 60
 
 def emit_event(rows, occurred_at, event, base, **kwargs):
-    row = {
-        "occurred_at": iso(occurred_at),
-        "event": event,
-        "anonymous_id": "",
-        "user_id": base["user_id"],
-        "account_id": base["account_id"],
-        "session_id": base["session_id"],
-        "scale_id": kwargs.get("scale_id", ""),
-        "assessment_id": kwargs.get("assessment_id", ""),
-        "report_id": kwargs.get("report_id", ""),
-        "channel": base["channel"],
-        "plan_tier": base["plan_tier"],
-        "utm_source": kwargs.get("utm_source", ""),
-        "utm_medium": kwargs.get("utm_medium", ""),
-        "utm_campaign": kwargs.get("utm_campaign", ""),
-        "method": kwargs.get("method", ""),
-        "is_email_verified": kwargs.get("is_email_verified", ""),
-        "status": kwargs.get("status", ""),
-        "format": kwargs.get("format", ""),
-        "generation_ms": kwargs.get("generation_ms", ""),
-        "device_type": base["device_type"],
-        "locale": base["locale"],
-        "exp_onboarding_flow": "control",
-    }
-    rows.append(row)
-
-def generate(args):
-    random.seed(args.seed)
-    start_date = datetime.fromisoformat(args.start + "T00:00:00+00:00")
-    end_date = datetime.fromisoformat(args.end + "T00:00:00+00:00")
+    """Append one compact event tuple in COLUMNS order (ints: -1 = empty)."""
+    rows.append((
+        epoch(occurred_at),
+        event,
+        "",  # anonymous_id
+        base["user_id"],
+        base["account_id"],
+        base["session_id"],
+        kwargs.get("scale_id", ""),
+        kwargs.get("assessment_id", -1),
+        kwargs.get("report_id", -1),
+        base["channel"],
+        base["plan_tier"],
+        kwargs.get("utm_source", ""),
+        kwargs.get("utm_medium", ""),
+        kwargs.get("utm_campaign", ""),
+        kwargs.get("method", ""),
+        str(kwargs.get("is_email_verified", "")),
+        kwargs.get("status", ""),
+        kwargs.get("format", ""),
+        kwargs.get("generation_ms", -1),
+        base["device_type"],
+        base["locale"],
+        base.get("variant", "control"),
+    ))
 
+def user_events(u, lift=None):
+    """Return the time-unordered funnel events of one user (signup → report); lift: {step: relative lift}."""
     rows = []
-    for u in generate_users(args.n_users, start_date, end_date):
-        session_id = f"s_{uuid.uuid4().hex[:8]}"
-        u["session_id"] = session_id
+    session_id = rand_id(8)
+    u["session_id"] = session_id
+
+    # Signup
+    emit_event(rows, u["signup_at"], "signup_completed", u,
+               method=u["method"], is_email_verified=u["is_email_verified"])
+
+    # Step: select_scale
+    if random.random() < lifted(P_SELECT, lift, "select_scale"):
+        scale_id, _ = random.choice(SCALES)
+        t_select = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_SELECT))
+        if not within_session(u["signup_at"], t_select):
+            return rows  # session ended before step
+        u["scale_id"] = scale_id
+        emit_event(rows, t_select, "select_scale", u, scale_id=scale_id)
 
-        # Signup
-        emit_event(rows, u["signup_at"], "signup_completed", u,
-                   method=u["method"], is_email_verified=u["is_email_verified"])
+        # Step: submit_assessment (complete) — optionally emit started/in_progress
+        reached_complete = random.random() < lifted(P_ASSESS_COMPLETE, lift, "submit_assessment")
+        if reached_complete:
+            assess_id = rand_id(10)
+            # started
+            t_started = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_ASSESS_STARTED))
+            if within_session(u["signup_at"], t_started):
+                emit_event(rows, t_started, "submit_assessment", u,
+                           scale_id=scale_id, assessment_id=assess_id, status="started")
+            # in_progress
+            t_inprog = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_ASSESS_INPROG))
+            if within_session(u["signup_at"], t_inprog):
+                emit_event(rows, t_inprog, "submit_assessment", u,
+                           scale_id=scale_id, assessment_id=assess_id, status="in_progress")
+            # complete
+            t_complete = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_ASSESS_COMPLETE))
+            if not within_session(u["signup_at"], t_complete):
+                return rows
+            emit_event(rows, t_complete, "submit_assessment", u,
+                       scale_id=scale_id, assessment_id=assess_id, status="complete")
 
-        # Step: select_scale
-        if random.random() < P_SELECT:
+            # Step: generate_report (activation) — channel/plan adjusted
+            p_act = lifted(activation_probability(P_ACTIVATE, u["channel"], u["plan_tier"]), lift, "generate_report")
+            if random.random() < p_act:
+                t_report = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_REPORT))
+                if within_session(u["signup_at"], t_report):
+                    report_id = rand_id(10)
+                    generation_ms = random.randint(500, 4000)
+                    fmt = "web" if random.random() < 0.8 else "pdf"
+                    emit_event(rows, t_report, "generate_report", u,
+                               scale_id=scale_id, assessment_id=assess_id,
+                               report_id=report_id, format=fmt, generation_ms=generation_ms)
+    return rows
+
+def burst_gap():
+    """Seconds to the next event of a burst (heavy-tailed, but inside the session timeout)."""
+    median, sigma = LP_BURST_GAP_S
+    return timedelta(seconds=min(SESSION_TIMEOUT_MIN * 60 - 60, random.lognormvariate(math.log(median), sigma)))
+
+def return_sessions(u, after, activated, end_at, alpha, gap_days, churn):
+    """
+    Compact events of a user's sessions after `after` (load profile). The account's activity level
+    a ~ Pareto(alpha) divides the mean gap between sessions and the per-session churn, so
+    power users come back often and for long; each session is a burst of assessments.
+    """
+    rows = []
+    activity = random.paretovariate(alpha)
+    t = after
+    if random.random() >= LP_RETURN[activated]:
+        return rows
+    while True:
+        # Session starts: a Poisson process thinned by the traffic profile (rejected draws are
+        # skipped), sped up by 1 / PROFILE_MEAN so gap_days stays the mean gap after thinning
+        gap = random.expovariate(activity / (gap_days * PROFILE_MEAN))
+        t += timedelta(days=gap, minutes=SESSION_TIMEOUT_MIN + 1)
+        if t >= end_at:
+            return rows
+        if random.random() >= profile_weight(t):
+            continue
+        u["session_id"] = rand_id(8)
+        for _ in range(min(LP_MAX_ACTIONS, int(random.paretovariate(LP_ACTIONS_ALPHA)))):
             scale_id, _ = random.choice(SCALES)
-            t_select = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_SELECT))
-            if not within_session(u["signup_at"], t_select):
-                continue  # session ended before step
-            u["scale_id"] = scale_id
-            emit_event(rows, t_select, "select_scale", u, scale_id=scale_id)
-
-            # Step: submit_assessment (complete) — optionally emit started/in_progress
-            reached_complete = random.random() < P_ASSESS_COMPLETE
-            if reached_complete:
-                assess_id = f"as_{uuid.uuid4().hex[:10]}"
-                # started
-                t_started = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_ASSESS_STARTED))
-                if within_session(u["signup_at"], t_started):
-                    emit_event(rows, t_started, "submit_assessment", u,
-                               scale_id=scale_id, assessment_id=assess_id, status="started")
-                # in_progress
-                t_inprog = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_ASSESS_INPROG))
-                if within_session(u["signup_at"], t_inprog):
-                    emit_event(rows, t_inprog, "submit_assessment", u,
-                               scale_id=scale_id, assessment_id=assess_id, status="in_progress")
-                # complete
-                t_complete = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_ASSESS_COMPLETE))
-                if not within_session(u["signup_at"], t_complete):
-                    continue
-                emit_event(rows, t_complete, "submit_assessment", u,
-                           scale_id=scale_id, assessment_id=assess_id, status="complete")
-
-                # Step: generate_report (activation) — channel/plan adjusted
-                p_act = activation_probability(P_ACTIVATE, u["channel"], u["plan_tier"])
-                if random.random() < p_act:
-                    t_report = u["signup_at"] + timedelta(minutes=random.randint(*DELTA_REPORT))
-                    if within_session(u["signup_at"], t_report):
-                        report_id = f"r_{uuid.uuid4().hex[:10]}"
-                        generation_ms = random.randint(500, 4000)
-                        fmt = "web" if random.random() < 0.8 else "pdf"
-                        emit_event(rows, t_report, "generate_report", u,
-                                   scale_id=scale_id, assessment_id=assess_id,
-                                   report_id=report_id, format=fmt, generation_ms=generation_ms)
-
-    # Sort and write
-    rows.sort(key=lambda r: r["occurred_at"])
-    fieldnames = ["occurred_at","event","anonymous_id","user_id","account_id","session_id",
-                  "scale_id","assessment_id","report_id","channel","plan_tier","utm_source",
-                  "utm_medium","utm_campaign","method","is_email_verified","status","format",
-                  "generation_ms","device_type","locale","exp_onboarding_flow"]
-    with open(args.out, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        w.writerows(rows)
-    print(f"Wrote {len(rows)} rows to {args.out}")
+            assess_id = rand_id(10)
+            emit_event(rows, t, "select_scale", u, scale_id=scale_id)
+            t += burst_gap()
+            emit_event(rows, t, "submit_assessment", u, scale_id=scale_id, assessment_id=assess_id, status="started")
+            t += burst_gap()
+            emit_event(rows, t, "submit_assessment", u, scale_id=scale_id, assessment_id=assess_id, status="complete")
+            if random.random() < LP_REPORT:
+                t += burst_gap()
+                emit_event(rows, t, "generate_report", u, scale_id=scale_id, assessment_id=assess_id,
+                           report_id=rand_id(10), format="web" if random.random() < 0.8 else "pdf",
+                           generation_ms=random.randint(500, 4000))
+            t += burst_gap()
+        if random.random() < churn / activity:
+            return rows
+
+def arrivals(rows, late_rate, dup_rate):
+    """Events with their received_at: most on time, some late (lognormal delay), some delivered twice."""
+    median, sigma = LP_LATE_DELAY_S
+    for row in rows:
+        received = row[0]
+        if random.random() < late_rate:
+            received += int(random.lognormvariate(math.log(median), sigma))
+        yield row + (received,)
+        if random.random() < dup_rate:
+            yield row + (received + random.randint(*LP_DUP_DELAY_S),)
+
+def user_stream(u, lift, profile, end_at):
+    """Load-profile events of one user: the onboarding session, later sessions, arrival times."""
+    rows = user_events(u, lift)
+    activated = any(r[1] == "generate_report" for r in rows)
+    last = datetime.fromtimestamp(max(r[0] for r in rows), timezone.utc)
+    rows += return_sessions(u, last, activated, end_at, profile["alpha"], profile["gap_days"], profile["churn"])
+    return arrivals(rows, profile["late_rate"], profile["dup_rate"])
+
+def shard_tasks(args):
+    """Fixed-size user shards; the layout depends on --shard_size only, never on --workers."""
+    experiment = dict(variants=args.exp_variants, weights=args.exp_split,
+                      lifts=parse_lifts(args.exp_lift, args.exp_variants))
+    profile = dict(alpha=args.lp_alpha, gap_days=args.lp_gap_days, churn=args.lp_churn,
+                   late_rate=args.lp_late_rate, dup_rate=args.lp_dup_rate) if args.load_profile else None
+    return [dict(shard=k, first_user=lo, n_users=hi - lo, seed=args.seed, start=args.start, end=args.end,
+                 profile=profile, **experiment)
+            for k, lo, hi in shard_ranges(args.n_users, args.shard_size)]
+
+def iter_events(task):
+    """Yield one shard's compact events in stream_columns() order (not yet time-ordered)."""
+    seed = shard_seed(task["seed"], task["shard"])
+    random.seed(seed)
+    _ID_RNG.seed(f"ids:{seed}")
+    start_date = datetime.fromisoformat(task["start"] + "T00:00:00+00:00")
+    end_date = datetime.fromisoformat(task["end"] + "T00:00:00+00:00")
+    profile = task.get("profile")
+    for u in generate_users(task["n_users"], start_date, end_date, task["first_user"], load=bool(profile)):
+        u["variant"] = assign_variant(USER_ID.format(u["user_id"]), task["variants"], task["weights"])
+        lift = task["lifts"].get(u["variant"])
+        if profile:
+            yield from user_stream(u, lift, profile, end_at=end_date + timedelta(days=1))
+        else:
+            yield from user_events(u, lift)
+
+def time_sorted(rows, chunk_rows, load=False):
+    columns, order = stream_columns(load)
+    return external_sort_events(rows, columns, by=order, chunk_rows=chunk_rows)
+
+def open_writer(out, fmt, chunk_rows, partition_by_date, part_name="part-00000", load=False):
+    columns, _ = stream_columns(load)
+    return EventWriter(
+        Path(out), [c.name for c in columns], fmt=fmt, chunk_rows=chunk_rows,
+        partition_field="occurred_at" if partition_by_date else None,
+        timestamp_fields=["occurred_at", "received_at"], part_name=part_name, columns=columns,
+    )
+
+def run_shard(task):
+    """Process-pool entry point: time-sort one shard and write it to task["out"]."""
+    load = bool(task.get("profile"))
+    rows = time_sorted(iter_events(task), task["chunk_rows"], load)
+    if task.get("compact"):
+        # Merge run for the parent process: compact rows, no header, nothing formatted yet
+        write_compact_rows(task["out"], rows)
+        return None
+    with open_writer(task["out"], task["fmt"], task["chunk_rows"], task["partition_by_date"],
+                     part_name=f"part-{task['shard']:05d}", load=load) as w:
+        for r in rows:
+            w.append(r)
+    return w.rows_written
+
+def generate(args):
+    out = Path(args.out)
+    fmt = resolve_format(out, args.format)
+    tasks = shard_tasks(args)
+    for t in tasks:
+        t.update(chunk_rows=args.chunk_rows, fmt=fmt, partition_by_date=args.partition_by_date)
+
+    if args.shard_files:
+        # One time-ordered file per shard (per day with --partition_by_date), no merge
+        for t in tasks:
+            t["out"] = str(out if args.partition_by_date else out / f"part-{t['shard']:05d}.{fmt}")
+        n = sum(map_shards(run_shard, tasks, args.workers))
+        print(f"Wrote {n} rows to {args.out} ({len(tasks)} shards)")
+        return
+
+    with tempfile.TemporaryDirectory(prefix="shards_", dir=out.resolve().parent) as tmp:
+        columns, order = stream_columns(args.load_profile)
+        if args.workers <= 1 or len(tasks) <= 1:
+            # Time-order with a bounded-memory external merge sort over all shards
+            rows = time_sorted(chain.from_iterable(iter_events(t) for t in tasks), args.chunk_rows,
+                               args.load_profile)
+        else:
+            # Each worker time-sorts its shard into a compact run; merge them in shard order (bounded fan-in)
+            for t in tasks:
+                t.update(compact=True, out=str(Path(tmp) / f"part-{t['shard']:05d}.csv"))
+            list(map_shards(run_shard, tasks, args.workers))
+            by_time = itemgetter([c.name for c in columns].index(order))
+            rows = merge_runs([Path(t["out"]) for t in tasks], lambda p: read_compact_rows(p, columns), by_time,
+                              Path(tmp))
+
+        with open_writer(out, fmt, args.chunk_rows, args.partition_by_date, load=args.load_profile) as writer:
+            for r in rows:
+                writer.append(r)
+    print(f"Wrote {writer.rows_written} rows to {args.out}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate Escaly activation funnel mock events.")
@@ -190,6 +429,41 @@ if __name__ == "__main__":
     parser.add_argument("--seed", type=int, default=42)
     parser.add_argument("--start", type=str, default="2025-08-01", help="YYYY-MM-DD (UTC)")
     parser.add_argument("--end", type=str, default="2025-09-15", help="YYYY-MM-DD (UTC)")
-    parser.add_argument("--out", type=str, default="mock_data.csv")
+    parser.add_argument("--out", type=str, default="mock_data.csv", help="Output file (directory with --partition_by_date)")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="csv | parquet (default: from --out suffix)")
+    parser.add_argument("--chunk_rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows held in memory per sort run / write chunk")
+    parser.add_argument("--partition_by_date", action="store_true",
+                        help="Write one file per event date under --out (event_date=YYYY-MM-DD/)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes generating shards in parallel")
+    parser.add_argument("--shard_size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="Users per shard, each with its own derived seed (output is identical for any --workers)")
+    parser.add_argument("--shard_files", action="store_true",
+                        help="Keep one time-ordered file per shard under --out instead of merging")
+    parser.add_argument("--exp_variants", nargs="+", default=["control"],
+                        help=f"{EXPERIMENT} variants, users split by a hash of user_id (first = control)")
+    parser.add_argument("--exp_split", nargs="+", type=float, default=None,
+                        help="Relative traffic per variant (default: equal split)")
+    parser.add_argument("--exp_lift", nargs="+", default=[],
+                        help="Relative lift of a step's probability, e.g. variant_a:generate_report=0.2 "
+                             f"(steps: {', '.join(EXPERIMENT_STEPS)})")
+    parser.add_argument("--load_profile", action="store_true",
+                        help="Production-like stream for load tests: diurnal/weekly seasonality, heavy-tailed "
+                             "return sessions over weeks, late and duplicate events; adds received_at and "
+                             "orders the output by it (replay with case-studies/scripts/replay_stream.py)")
+    parser.add_argument("--lp_alpha", type=float, default=1.5,
+                        help="Pareto tail index of per-account activity (lower = heavier tail)")
+    parser.add_argument("--lp_gap_days", type=float, default=7.0,
+                        help="Mean days between sessions of an account with activity 1 (divided by activity)")
+    parser.add_argument("--lp_churn", type=float, default=0.3,
+                        help="Chance to stop returning after a session, for activity 1 (divided by activity)")
+    parser.add_argument("--lp_late_rate", type=float, default=0.02, help="Share of events that arrive late")
+    parser.add_argument("--lp_dup_rate", type=float, default=0.01, help="Share of events delivered twice")
     args = parser.parse_args()
-    generate(args)
\ No newline at end of file
+    if args.exp_split and len(args.exp_split) != len(args.exp_variants):
+        parser.error("--exp_split needs one weight per --exp_variants entry.")
+    try:
+        parse_lifts(args.exp_lift, args.exp_variants)
+    except ValueError as e:
+        parser.error(str(e))
+    generate(args)
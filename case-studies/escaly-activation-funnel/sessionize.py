@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+sessionize.py
+
+Assign sessions to Escaly events from gaps in each user's event times.
+
+A session ends after SESSION_TIMEOUT_MIN (30) minutes of inactivity (business-logic.md §6):
+consecutive events of a user more than --timeout_min apart start a new session. The output
+is one row per session:
+
+    user_id, session_n (1 = first session), session_start, session_end, n_events
+
+Two engines give the same sessions:
+  - duckdb: runs sessions_stage.sql (one window pass; DuckDB spills to disk when the
+            events do not fit in memory).
+  - python: one streaming pass over a file that is sorted by time (the generator's output,
+            --order time) or by user then time (--order user). Per-user state is only kept
+            for sessions that are still open: in time order a session is closed as soon as
+            the stream has moved more than the timeout past its last event.
+
+The session table is what time-to-activation (tta_stage.sql) and funnel_engine.py
+(--session_timeout_min) key on instead of the generator's session_id column.
+
+Usage:
+  python case-studies/escaly-activation-funnel/sessionize.py --out sessions.parquet
+  python case-studies/escaly-activation-funnel/sessionize.py --engine python --timeout_min 45 --out sessions.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Mapping
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from event_io import ISO_TS_FORMAT, EventWriter, resolve_format  # noqa: E402
+
+from funnel_engine import DATA_PATH, _parse_ts, iter_rows  # noqa: E402
+
+SESSION_TIMEOUT_MIN = 30
+STAGE_SQL = Path(__file__).resolve().parent / "sessions_stage.sql"
+ENGINES = ("duckdb", "python")
+ORDERS = ("time", "user")
+SESSION_FIELDS = ["user_id", "session_n", "session_start", "session_end", "n_events"]
+
+
+# -------------------------
+# Streaming Python engine
+# -------------------------
+
+def _session_row(user: str, st: list) -> dict:
+    n, start, end, count = st
+    return {
+        "user_id": user,
+        "session_n": n,
+        "session_start": datetime.fromtimestamp(start, timezone.utc).strftime(ISO_TS_FORMAT),
+        "session_end": datetime.fromtimestamp(end, timezone.utc).strftime(ISO_TS_FORMAT),
+        "n_events": count,
+    }
+
+
+def sessions_stream(
+    rows: Iterable[Mapping],
+    timeout_min: float = SESSION_TIMEOUT_MIN,
+    order: str = "time",
+    user_col: str = "user_id",
+    time_col: str = "occurred_at",
+    sweep_every: int = 100_000,
+) -> Iterator[dict]:
+    """
+    Yield one dict per session (SESSION_FIELDS) from rows sorted by time or by (user, time).
+
+      - order="time": open sessions are swept every `sweep_every` rows and closed once the
+        stream is more than the timeout past their last event; only the per-user session
+        count outlives a closed session.
+      - order="user": a user's sessions are complete when the next user starts (O(1) state).
+    Sessions are yielded as they close, so the output is not sorted.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unsupported order {order!r}; expected one of {ORDERS}.")
+    gap = float(timeout_min) * 60.0
+    open_: Dict[str, list] = {}   # user -> [session_n, start, end, n_events]
+    closed_n: Dict[str, int] = {}  # user -> sessions already emitted (time order only)
+    now, seen = float("-inf"), 0
+    for row in rows:
+        user = row.get(user_col)
+        if not user:
+            continue
+        t = _parse_ts(row[time_col])
+        st = open_.get(user)
+        if order == "user" and st is None and open_:
+            # a new user begins: the previous user's last session is complete
+            (prev, prev_st), = open_.items()
+            yield _session_row(prev, prev_st)
+            open_.clear()
+        if st is not None and t < st[2]:
+            raise ValueError(f"Events for {user!r} are not sorted by {time_col} (use --order or sort the file).")
+        if st is not None and t - st[2] <= gap:
+            st[2] = t
+            st[3] += 1
+        else:
+            if st is not None:
+                yield _session_row(user, st)
+                n = st[0] + 1
+            else:
+                n = closed_n.pop(user, 0) + 1
+            open_[user] = [n, t, t, 1]
+        if order == "time":
+            if t < now:
+                raise ValueError(f"Events are not sorted by {time_col} (use --order user for user-sorted files).")
+            now = t
+            seen += 1
+            if seen % sweep_every == 0:
+                for u in [u for u, s in open_.items() if now - s[2] > gap]:
+                    s = open_.pop(u)
+                    closed_n[u] = s[0]
+                    yield _session_row(u, s)
+    for u, s in open_.items():
+        yield _session_row(u, s)
+
+
+# -------------------------
+# DuckDB engine
+# -------------------------
+
+def sessions_duckdb(con, data: Path, timeout_min: float = SESSION_TIMEOUT_MIN) -> int:
+    """Build the `sessions` table (and `event_sessions` view) in `con` from a file; returns #sessions."""
+    from run_duckdb import source_sql
+
+    con.execute("SET TimeZone = 'UTC'")
+    con.execute(f"CREATE OR REPLACE VIEW mock_events AS "
+                f"SELECT * REPLACE (occurred_at::TIMESTAMP AS occurred_at) FROM ({source_sql(Path(data))})")
+    con.execute("SET VARIABLE session_timeout_min = ?", [timeout_min])
+    con.execute(STAGE_SQL.read_text(encoding="utf-8"))
+    return con.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def write_sessions_duckdb(con, out: Path, fmt: str) -> None:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        opts = "FORMAT parquet"
+    else:
+        opts = f"FORMAT csv, HEADER, TIMESTAMPFORMAT '{ISO_TS_FORMAT}'"
+    con.execute(f"COPY (SELECT {', '.join(SESSION_FIELDS)} FROM sessions) TO '{out.as_posix()}' ({opts})")
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Sessionize Escaly events by inactivity gaps.")
+    parser.add_argument("--data", type=str, default=str(DATA_PATH),
+                        help="Events as CSV, Parquet file or partitioned Parquet directory")
+    parser.add_argument("--out", type=str, default=None, help="Write the session table to CSV / Parquet")
+    parser.add_argument("--timeout_min", type=float, default=SESSION_TIMEOUT_MIN,
+                        help="Minutes of inactivity that end a session")
+    parser.add_argument("--engine", choices=ENGINES, default="duckdb",
+                        help="duckdb (window pass) or python (streaming pass over a sorted file)")
+    parser.add_argument("--order", choices=ORDERS, default="time",
+                        help="python engine: input sorted by time (generator output) or by user then time")
+    args = parser.parse_args()
+
+    data = Path(args.data)
+    out = Path(args.out) if args.out else None
+    t0 = time.perf_counter()
+    if args.engine == "duckdb":
+        import duckdb
+        con = duckdb.connect()
+        n_sessions = sessions_duckdb(con, data, args.timeout_min)
+        n_users, n_events, n_multi = con.execute(
+            "SELECT COUNT(DISTINCT user_id), SUM(n_events), COUNT(DISTINCT user_id) FILTER (WHERE session_n > 1) "
+            "FROM sessions"
+        ).fetchone()
+        if out:
+            write_sessions_duckdb(con, out, resolve_format(out))
+    else:
+        n_sessions = n_events = n_users = n_multi = 0
+        writer = EventWriter(out, SESSION_FIELDS, timestamp_fields=["session_start", "session_end"]) if out else None
+        for s in sessions_stream(iter_rows(data, columns=["user_id", "occurred_at"]), args.timeout_min, args.order):
+            n_sessions += 1
+            n_events += s["n_events"]
+            n_users += s["session_n"] == 1
+            n_multi += s["session_n"] == 2
+            if writer:
+                writer.write(s)
+        if writer:
+            writer.close()
+
+    secs = time.perf_counter() - t0
+    print(f"🧭 {n_sessions:,} sessions for {n_users:,} users ({int(n_events or 0):,} events, "
+          f"timeout {args.timeout_min:g} min) in {secs:.2f}s [{args.engine}]")
+    print(f"   {n_multi:,} users have more than one session")
+    if out:
+        print(f"💾 Wrote sessions: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+-- sessions_stage.sql
+-- Sessionization stage: sessions computed from gaps in each user's event times (DuckDB)
+-- A session ends after session_timeout_min minutes of inactivity (business-logic.md §6; default 30,
+-- override with: python ../scripts/run_duckdb.py --set session_timeout_min=45 ...).
+-- One window pass over mock_events (already sorted by user_id, occurred_at) flags each event as a
+-- session start (gap before it > timeout) and/or end (gap after it > timeout); only those boundary
+-- rows are kept and paired, so the output is one compact row per session.
+--   sessions:       user_id, session_n (1 = first session), session_start, session_end, n_events
+--   event_sessions: mock_events + session_n, mapped with an ASOF join (a view; nothing re-scanned
+--                   until a query reads it)
+
+CREATE OR REPLACE TABLE sessions AS
+WITH params AS (
+  SELECT to_seconds(CAST(COALESCE(getvariable('session_timeout_min'), 30) * 60 AS BIGINT)) AS timeout
+),
+flagged AS (
+  SELECT
+    user_id,
+    occurred_at,
+    row_number() OVER w AS rn,
+    COALESCE(occurred_at - lag(occurred_at) OVER w > p.timeout, TRUE) AS is_start,
+    COALESCE(lead(occurred_at) OVER w - occurred_at > p.timeout, TRUE) AS is_end
+  FROM mock_events, params p
+  WHERE user_id IS NOT NULL
+  WINDOW w AS (PARTITION BY user_id ORDER BY occurred_at)
+),
+bounds AS (
+  -- boundary rows alternate start, end (a single-event session is both)
+  SELECT
+    user_id,
+    occurred_at,
+    rn,
+    is_start,
+    (SUM(is_start::INTEGER) OVER b)::BIGINT AS session_n,
+    CASE WHEN is_end THEN occurred_at ELSE lead(occurred_at) OVER b END AS end_at,
+    CASE WHEN is_end THEN rn ELSE lead(rn) OVER b END AS end_rn
+  FROM flagged
+  WHERE is_start OR is_end
+  WINDOW b AS (PARTITION BY user_id ORDER BY rn)
+)
+SELECT
+  user_id,
+  session_n,
+  occurred_at AS session_start,
+  end_at AS session_end,
+  end_rn - rn + 1 AS n_events
+FROM bounds
+WHERE is_start
+ORDER BY user_id, session_n;
+
+CREATE OR REPLACE VIEW event_sessions AS
+SELECT e.*, s.session_n, s.session_start
+FROM mock_events e
+ASOF JOIN sessions s
+  ON e.user_id = s.user_id AND e.occurred_at >= s.session_start;
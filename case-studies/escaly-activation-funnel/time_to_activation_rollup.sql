@@ -0,0 +1,21 @@
+-- time_to_activation_rollup.sql
+-- Time-to-activation for every single-dimension breakdown plus the overall row, in one pass (DuckDB)
+-- requires: tta_stage.sql
+
+SELECT
+  CASE
+    WHEN GROUPING(channel) = 0     THEN 'channel'
+    WHEN GROUPING(plan_tier) = 0   THEN 'plan_tier'
+    WHEN GROUPING(device_type) = 0 THEN 'device_type'
+    WHEN GROUPING(locale) = 0      THEN 'locale'
+    ELSE 'overall'
+  END AS dimension,
+  COALESCE(channel, plan_tier, device_type, locale, 'all') AS segment,
+  COUNT(*) AS signups,
+  COUNT(*) FILTER (WHERE is_activated) AS activated_users,
+  ROUND(100.0 * COUNT(*) FILTER (WHERE is_activated) / COUNT(*), 2) AS activation_rate_pct,
+  ROUND(median(tta_minutes), 2) AS median_tta_minutes,
+  ROUND(avg(tta_minutes), 2) AS mean_tta_minutes
+FROM tta_users
+GROUP BY GROUPING SETS ((), (channel), (plan_tier), (device_type), (locale))
+ORDER BY dimension = 'overall' DESC, dimension, segment;
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+tta_bootstrap.py
+
+Median time to activation per segment with Poisson-bootstrap confidence intervals.
+
+The point estimates are those of time_to_activation_by_segment.sql (median of tta_minutes
+over first-session activations, tta_stage.sql). Small segments, such as direct/business with
+a handful of activated users, swing a lot between samples; the interval shows by how much.
+
+  - mock_events and tta_users are built (or reused) like run_duckdb.py does, in the same
+    <data>.duckdb cache.
+  - DuckDB groups activated users by segment and tta_minutes, so the resampling cost grows with
+    the number of distinct times, not users; resamples run in batches over --workers processes
+    (case-studies/scripts/bootstrap.py) and do not depend on the worker count.
+
+Usage:
+  python case-studies/escaly-activation-funnel/tta_bootstrap.py
+  python case-studies/escaly-activation-funnel/tta_bootstrap.py --by channel --resamples 10000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from bootstrap import DEFAULT_LEVEL, DEFAULT_RESAMPLES, DEFAULT_SEED, median_ci  # noqa: E402
+from run_duckdb import DEFAULT_DATA, TABLE, load_events  # noqa: E402
+from sql_dag import run_dag  # noqa: E402
+
+TTA_STAGE = Path(__file__).resolve().parent / "tta_stage.sql"
+DEFAULT_BY = ["channel", "plan_tier"]
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def tta_groups_sql(by) -> str:
+    """Activated users counted per segment and tta_minutes, ordered for bootstrap.median_ci."""
+    cols = ", ".join(by)
+    return f"""
+SELECT {cols}, tta_minutes, COUNT(*) AS n_users
+FROM tta_users
+WHERE is_activated
+GROUP BY ALL
+ORDER BY {cols}, tta_minutes
+"""
+
+
+def tta_median_ci(con, by=DEFAULT_BY, n_resamples: int = DEFAULT_RESAMPLES, level: float = DEFAULT_LEVEL,
+                  seed: int = DEFAULT_SEED, workers: int = 1):
+    """DataFrame with one row per segment: activated users, median TTA and its interval."""
+    bad = [c for c in by if not _IDENT.match(c)]
+    if bad:
+        raise ValueError(f"Invalid segment column(s) {bad}.")
+    rows = con.execute(tta_groups_sql(by)).fetchdf()
+    keys = rows.groupby(list(by), sort=False, dropna=False)  # NULL segments are groups too
+    point, low, high = median_ci(keys.ngroup().to_numpy(), rows["tta_minutes"].to_numpy(),
+                                 rows["n_users"].to_numpy(), n_resamples=n_resamples, level=level,
+                                 seed=seed, workers=workers)
+    out = keys["n_users"].sum().reset_index().rename(columns={"n_users": "activated_users"})
+    out["median_tta_minutes"] = point.round(2)
+    out["ci_low"] = low.round(2)
+    out["ci_high"] = high.round(2)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for median time to activation.")
+    parser.add_argument("--data", type=str, default=str(DEFAULT_DATA),
+                        help="Events CSV, Parquet file or partitioned Parquet directory")
+    parser.add_argument("--db", type=str, default=None,
+                        help="DuckDB file holding mock_events (default: <data>.duckdb next to the data)")
+    parser.add_argument("--memory", action="store_true", help="Use an in-memory database (no cache)")
+    parser.add_argument("--by", nargs="+", default=DEFAULT_BY, help="tta_users columns to segment by")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES, help="Bootstrap resamples")
+    parser.add_argument("--ci_level", type=float, default=DEFAULT_LEVEL, help="Confidence level in percent")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes sharing the resamples (intervals do not depend on it)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed of the resamples")
+    parser.add_argument("--session_timeout_min", type=float, default=None,
+                        help="Session inactivity timeout for first-session activation (default 30)")
+    parser.add_argument("--out", type=str, default=None, help="Also write the table to CSV")
+    args = parser.parse_args()
+
+    data = Path(args.data)
+    db = ":memory:" if args.memory else (args.db or str(data.with_suffix(".duckdb")))
+    con = duckdb.connect(db)
+    con.execute("SET TimeZone = 'UTC'")
+    load_events(con, data)
+    manifest = con.execute("SELECT path, size_bytes, mtime_ns FROM source_manifest").fetchone()
+    variables = {} if args.session_timeout_min is None else {"session_timeout_min": args.session_timeout_min}
+    run_dag(con, [TTA_STAGE], variables=variables, inputs={TABLE: ":".join(map(str, manifest))})
+
+    t0 = time.perf_counter()
+    df = tta_median_ci(con, args.by, args.resamples, args.ci_level, args.seed, args.workers)
+    secs = time.perf_counter() - t0
+    print(f"=== Median TTA (min) with {args.ci_level:g}% bootstrap intervals "
+          f"({args.resamples:,} resamples, {secs:.2f}s) ===")
+    print(df.to_markdown(index=False))
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"💾 Wrote CSV: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
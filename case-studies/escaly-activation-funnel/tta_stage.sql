@@ -0,0 +1,49 @@
+-- tta_stage.sql
+-- Shared time-to-activation stage: one row per signed-up user (DuckDB)
+-- requires: sessions_stage.sql
+-- Sessions are the computed ones from sessions_stage.sql (30 min inactivity timeout), not the
+-- session_id column. Each signup is mapped to its session with an ASOF join and a user activates
+-- when generate_report happens after signup and before that session ends; one pass over the
+-- report events, no self-join back onto all of mock_events.
+-- Queries that read tta_users declare "-- requires: tta_stage.sql" so run_duckdb.py runs this first.
+
+CREATE OR REPLACE TABLE tta_users AS
+WITH signups AS (
+  SELECT
+    user_id,
+    MIN(occurred_at) AS signup_at,
+    arg_min(channel, occurred_at) AS channel,
+    arg_min(plan_tier, occurred_at) AS plan_tier,
+    arg_min(device_type, occurred_at) AS device_type,
+    arg_min(locale, occurred_at) AS locale
+  FROM mock_events
+  WHERE event = 'signup_completed'
+  GROUP BY user_id
+),
+signup_session AS (
+  SELECT g.*, s.session_n, s.session_end
+  FROM signups g
+  ASOF JOIN sessions s
+    ON g.user_id = s.user_id AND g.signup_at >= s.session_start
+),
+reports AS (
+  SELECT r.user_id, MIN(r.occurred_at) AS report_at
+  FROM mock_events r
+  JOIN signup_session g USING (user_id)
+  WHERE r.event = 'generate_report'
+    AND r.occurred_at BETWEEN g.signup_at AND g.session_end
+  GROUP BY r.user_id
+)
+SELECT
+  g.user_id,
+  g.session_n AS signup_session_n,
+  g.signup_at,
+  r.report_at,
+  r.report_at IS NOT NULL AS is_activated,
+  EXTRACT(EPOCH FROM (r.report_at - g.signup_at)) / 60.0 AS tta_minutes,
+  g.channel,
+  g.plan_tier,
+  g.device_type,
+  g.locale
+FROM signup_session g
+LEFT JOIN reports r USING (user_id);
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+analyze_experiment.py
+
+Per-variant results of an exp_* experiment (default exp_onboarding_flow) from the
+metrics-layer rollups.
+
+  - refresh_rollups.py keeps experiment_users up to date by partition: one row per signed-up
+    user with the variant and the user's outcomes. New event days only touch the users who
+    had events on them, so results never re-scan history.
+  - sql/experiments/experiment_cells.sql reduces experiment_users in one grouped pass to
+    n / sum / sum of squares per variant x stratum (channel/plan tier) x metric:
+        selected_scale, completed_assessment, activated_session1  (funnel conversion)
+        tta_minutes                                               (activated users only)
+        active_w1                                                 (week-1 return, matured users)
+  - CUPED-style adjustment: the covariate is the pooled (all variants, same period) mean of
+    the metric in the user's signup stratum, so this is post-stratification on channel and
+    plan tier rather than a pre-period covariate. The regression removes the variance
+    explained by the strata; the stratum is set at signup, but the covariate's value is
+    computed from the outcomes being compared.
+  - Sequential testing: mSPRT with a normal mixture over the effect (sd --tau_rel x the
+    control mean). Each run is stored in experiment_results with its settings (control, CUPED,
+    tau_rel) and the always-valid p-value is the running minimum over the experiment's earlier
+    runs with the same settings, so the results can be checked
+    after every refresh without inflating false positives. cs_low..cs_high is the matching
+    always-valid confidence sequence for the difference.
+
+Usage:
+  python case-studies/escaly-metrics-layer/scripts/refresh_rollups.py --data exp_events.csv
+  python case-studies/escaly-metrics-layer/scripts/analyze_experiment.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from refresh_rollups import DEFAULT_DB, INIT_SQL, SQL_DIR, run_file
+
+CELLS_SQL = SQL_DIR / "experiments" / "experiment_cells.sql"
+DEFAULT_EXPERIMENT = "exp_onboarding_flow"
+METRICS = ["selected_scale", "completed_assessment", "activated_session1", "tta_minutes", "active_w1"]
+RESULT_COLS = ["experiment", "as_of", "metric", "variant", "n", "mean", "control_n", "control_mean", "delta",
+               "lift_pct", "variance_reduction_pct", "p_fixed", "p_always_valid", "cs_low", "cs_high",
+               "cuped", "tau_rel", "control"]
+
+
+# -------------------------
+# Statistics
+# -------------------------
+
+def variant_moments(cells: pd.DataFrame, cuped: bool = True) -> pd.DataFrame:
+    """
+    Per variant: n, raw and CUPED-adjusted mean and variance of one metric, from its
+    variant x stratum cells (n, s1, s2). The covariate x is the pooled stratum mean.
+    """
+    cells = cells.copy()
+    strata = cells.groupby("stratum")[["n", "s1"]].sum()
+    cells["x"] = cells["stratum"].map(strata["s1"] / strata["n"])
+    cells["nx"] = cells["n"] * cells["x"]
+    cells["nxx"] = cells["nx"] * cells["x"]
+    cells["xy"] = cells["x"] * cells["s1"]
+    v = cells.groupby("variant")[["n", "s1", "s2", "nx", "nxx", "xy"]].sum()
+    v["y_mean"] = v["s1"] / v["n"]
+    v["x_mean"] = v["nx"] / v["n"]
+    v["syy"] = v["s2"] - v["n"] * v["y_mean"] ** 2
+    v["sxx"] = v["nxx"] - v["n"] * v["x_mean"] ** 2
+    v["sxy"] = v["xy"] - v["n"] * v["x_mean"] * v["y_mean"]
+    theta = v["sxy"].sum() / v["sxx"].sum() if cuped and v["sxx"].sum() > 0 else 0.0
+    x_all = strata["s1"].sum() / strata["n"].sum()
+    dof = (v["n"] - 1).clip(lower=1)
+    v["raw_var"] = v["syy"] / dof
+    v["mean"] = v["y_mean"] - theta * (v["x_mean"] - x_all)
+    v["var"] = ((v["syy"] - 2 * theta * v["sxy"] + theta ** 2 * v["sxx"]) / dof).clip(lower=0)
+    return v[["n", "y_mean", "raw_var", "mean", "var"]]
+
+
+def msprt(delta: float, var: float, tau: float, alpha: float):
+    """(1 / mixture likelihood ratio capped at 1, confidence-sequence half-width) for a normal estimate."""
+    if var <= 0 or tau <= 0:
+        return (0.0 if delta else 1.0), 0.0
+    t2 = tau ** 2
+    log_lr = 0.5 * math.log(var / (var + t2)) + t2 * delta ** 2 / (2 * var * (var + t2))
+    half = math.sqrt(var * (var + t2) / t2 * (2 * math.log(1 / alpha) + math.log((var + t2) / var)))
+    return min(1.0, math.exp(-log_lr)), half
+
+
+def compare(cells: pd.DataFrame, control: str, cuped: bool = True, tau_rel: float = 0.1, alpha: float = 0.05):
+    """One row per metric and treatment variant: effect vs control with fixed and sequential tests."""
+    rows = []
+    for metric, mcells in cells[cells["stratum"] != "*"].groupby("metric", sort=False):
+        m = variant_moments(mcells, cuped)
+        if control not in m.index:
+            continue
+        c = m.loc[control]
+        for variant, t in m.drop(index=control).iterrows():
+            var = t["var"] / t["n"] + c["var"] / c["n"]
+            raw_var = t["raw_var"] / t["n"] + c["raw_var"] / c["n"]
+            delta = t["mean"] - c["mean"]
+            tau = tau_rel * abs(c["y_mean"]) or math.sqrt(c["raw_var"])
+            p_seq, half = msprt(delta, var, tau, alpha)
+            rows.append({
+                "metric": metric, "variant": variant, "n": int(t["n"]), "mean": t["mean"],
+                "control_n": int(c["n"]), "control_mean": c["mean"], "delta": delta,
+                "lift_pct": 100 * delta / c["mean"] if c["mean"] else float("nan"),
+                "variance_reduction_pct": 100 * (1 - var / raw_var) if raw_var > 0 else 0.0,
+                "p_fixed": math.erfc(abs(delta) / math.sqrt(2 * var)) if var > 0 else float(delta == 0),
+                "p_always_valid": p_seq, "cs_low": delta - half, "cs_high": delta + half,
+            })
+    return pd.DataFrame(rows)
+
+
+# -------------------------
+# Runs
+# -------------------------
+
+def analyze(con, experiment: str = DEFAULT_EXPERIMENT, control: str = "control", cuped: bool = True,
+            tau_rel: float = 0.1, alpha: float = 0.05):
+    """Compute, store (experiment_results) and return (comparison DataFrame, cells DataFrame)."""
+    as_of = con.execute("SELECT MAX(event_date) FROM partition_manifest").fetchone()[0]
+    con.execute("SET VARIABLE experiment = ?", [experiment])
+    cells = con.execute(CELLS_SQL.read_text(encoding="utf-8")).fetchdf()
+    result = compare(cells, control, cuped, tau_rel, alpha)
+    if result.empty:
+        return result, cells
+    # Always-valid p-values may be monitored continuously: keep the smallest seen so far
+    # among earlier runs of the same test (a different control, CUPED or tau is another test)
+    settings = [control, cuped, tau_rel]
+    same_run = "experiment = ? AND control = ? AND cuped = ? AND tau_rel = ?"
+    earlier = con.execute(f"""
+        SELECT metric, variant, MIN(p_always_valid) AS p_min
+        FROM experiment_results
+        WHERE {same_run} AND as_of < ?
+        GROUP BY ALL
+    """, [experiment, *settings, as_of]).fetchdf()
+    result = result.merge(earlier, on=["metric", "variant"], how="left")
+    result["p_always_valid"] = result[["p_always_valid", "p_min"]].min(axis=1)
+    result = result.drop(columns="p_min").assign(experiment=experiment, as_of=as_of, cuped=cuped,
+                                                 tau_rel=tau_rel, control=control)[RESULT_COLS]
+
+    con.begin()
+    con.execute(f"DELETE FROM experiment_results WHERE {same_run} AND as_of = ?", [experiment, *settings, as_of])
+    con.register("_experiment_run", result)
+    con.execute("INSERT INTO experiment_results BY NAME SELECT *, now()::TIMESTAMP AS computed_at "
+                "FROM _experiment_run")
+    con.unregister("_experiment_run")
+    con.commit()
+    return result, cells
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze an exp_* experiment from the metrics-layer rollups.")
+    parser.add_argument("--db", type=str, default=str(DEFAULT_DB), help="DuckDB file holding the rollups")
+    parser.add_argument("--experiment", type=str, default=DEFAULT_EXPERIMENT, help="Experiment property")
+    parser.add_argument("--control", type=str, default="control", help="Control variant")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level of the confidence sequence")
+    parser.add_argument("--tau_rel", type=float, default=0.1,
+                        help="mSPRT mixture sd as a fraction of the control mean (the effect size you care about)")
+    parser.add_argument("--no_cuped", action="store_true", help="Compare raw means (no stratum covariate)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        raise SystemExit(f"No rollups at {args.db}; run refresh_rollups.py first.")
+    con = duckdb.connect(args.db)
+    con.execute("SET TimeZone = 'UTC'")
+    run_file(con, SQL_DIR / INIT_SQL)  # adds the run-settings columns to older databases
+    result, cells = analyze(con, args.experiment, args.control, not args.no_cuped, args.tau_rel, args.alpha)
+    if result.empty:
+        variants = sorted(cells["variant"].unique())
+        raise SystemExit(f"Nothing to compare for {args.experiment}: variants {variants}, control {args.control!r}.")
+
+    as_of = result["as_of"].iloc[0]
+    medians = cells[(cells["stratum"] == "*") & (cells["metric"] == "tta_minutes")]
+    print(f"🧪 {args.experiment} as of {as_of} ({'CUPED' if not args.no_cuped else 'raw means'}, "
+          f"mSPRT tau = {args.tau_rel:g} x control mean)")
+    print("\n=== Median TTA (min) ===")
+    print(medians[["variant", "n", "median"]].rename(columns={"n": "activated_users"}).to_markdown(index=False))
+    for metric in METRICS:
+        df = result[result["metric"] == metric]
+        if df.empty:
+            continue
+        print(f"\n=== {metric} ===")
+        print(df[["variant", "n", "mean", "control_mean", "lift_pct", "cs_low", "cs_high",
+                  "variance_reduction_pct", "p_fixed", "p_always_valid"]].to_markdown(index=False, floatfmt=".4g"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+query_metrics.py
+
+Serve the documented Escaly metrics (business-logic.md §4-5) from the metrics-layer rollups.
+
+Each metric is one SQL file in sql/metrics/<metric_id>.sql that reads period_rollup (or
+user_activation for medians) and never the raw events. The grain and segmentation are DuckDB
+variables, so the same file serves:
+  - --grain month | week
+  - --segment total | channel | plan_tier
+
+Run refresh_rollups.py first.
+
+Usage:
+  python case-studies/escaly-metrics-layer/scripts/query_metrics.py
+  python case-studies/escaly-metrics-layer/scripts/query_metrics.py nsm_monthly_assessments --grain week --segment plan_tier
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import duckdb
+
+from refresh_rollups import DEFAULT_DB, SQL_DIR
+
+METRICS_SQL_DIR = SQL_DIR / "metrics"
+GRAINS = ("month", "week")
+SEGMENTS = ("total", "channel", "plan_tier")
+
+
+def metric_ids():
+    return sorted(p.stem for p in METRICS_SQL_DIR.glob("*.sql"))
+
+
+def query_metric(con, metric_id: str, grain: str = "month", segment: str = None):
+    """Run sql/metrics/<metric_id>.sql; returns (DataFrame, seconds)."""
+    path = METRICS_SQL_DIR / f"{metric_id}.sql"
+    if not path.exists():
+        raise ValueError(f"Unknown metric {metric_id!r}; expected one of {metric_ids()}.")
+    con.execute("SET VARIABLE grain = ?", [grain])
+    if segment is None:
+        con.execute("RESET VARIABLE segment")
+    else:
+        con.execute("SET VARIABLE segment = ?", [segment])
+    t0 = time.perf_counter()
+    df = con.execute(path.read_text(encoding="utf-8")).fetchdf()
+    return df, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query Escaly metrics from the rollup tables.")
+    parser.add_argument("metrics", nargs="*", help=f"Metric ids (default: all of {', '.join(metric_ids())})")
+    parser.add_argument("--grain", choices=GRAINS, default="month")
+    parser.add_argument("--segment", choices=SEGMENTS, default=None,
+                        help="Segmentation (default: each metric's own, usually total)")
+    parser.add_argument("--db", type=str, default=str(DEFAULT_DB), help="DuckDB file holding the rollups")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        raise SystemExit(f"No rollups at {args.db}; run refresh_rollups.py first.")
+    con = duckdb.connect(args.db, read_only=True)
+    total = 0.0
+    for metric_id in args.metrics or metric_ids():
+        df, secs = query_metric(con, metric_id, args.grain, args.segment)
+        total += secs
+        print(f"\n=== {metric_id} ({args.grain}, {secs * 1000:.1f} ms) ===")
+        print(df.to_markdown(index=False))
+    print(f"\n⏱ {len(args.metrics or metric_ids())} metrics in {total * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
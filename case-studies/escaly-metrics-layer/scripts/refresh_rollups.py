@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+refresh_rollups.py
+
+Build / incrementally refresh the Escaly metrics-layer rollups (sql/00_init.sql) in a
+persistent DuckDB database.
+
+Refresh is by partition (event date):
+  - Every source partition gets a fingerprint: file count + size + mtime for a Hive
+    directory (event_date=YYYY-MM-DD/, as written by generate_mock_data.py
+    --partition_by_date), or row count + XOR of row hashes per day for a single CSV /
+    Parquet file (skipped entirely while the file's size and mtime are unchanged).
+  - Only days whose fingerprint changed (new, late or rewritten partitions) and days
+    that disappeared are refreshed. Their events, plus one neighbouring day on each side
+    (sessions that cross midnight), are read once into `events_slice`. Directory sources
+    are pruned to those partitions.
+  - sql/01..05 then rebuild daily_rollup for those days, merge assessment_firsts, upsert
+    user_activation for the affected signups, recompute period_rollup for the weeks
+    and months that contain a touched day, and upsert experiment_users for the users with
+    events on a refreshed day. All rollup writes run in one transaction.
+  - --full clears the rollups and rebuilds them from every partition.
+
+Sessions longer than a day and partitions rewritten to *remove* assessment retries are not
+tracked incrementally; use --full after such backfills.
+
+Usage:
+  python case-studies/escaly-metrics-layer/scripts/refresh_rollups.py
+  python case-studies/escaly-metrics-layer/scripts/refresh_rollups.py --data events_by_day/ --full
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import duckdb
+
+METRICS_DIR = Path(__file__).resolve().parents[1]
+SQL_DIR = METRICS_DIR / "sql"
+DEFAULT_DATA = METRICS_DIR.parent / "escaly-activation-funnel" / "mock_data.csv"
+DEFAULT_DB = METRICS_DIR / "data" / "metrics.duckdb"
+INIT_SQL = "00_init.sql"
+REFRESH_SQL = ["01_daily_rollup.sql", "02_assessment_firsts.sql", "03_user_activation.sql", "04_period_rollup.sql",
+               "05_experiment_users.sql"]
+ROLLUP_TABLES = ["daily_rollup", "assessment_firsts", "user_activation", "period_rollup",
+                 "experiment_assignment", "experiment_users", "partition_manifest"]
+SCRATCH_TABLES = ["refresh_days", "touched_days", "events_slice", "mock_events", "refresh_periods",
+                  "assessment_delta", "assessment_merged", "tta_users", "sessions", "experiment_touched"]
+
+sys.path.insert(0, str(METRICS_DIR.parent / "scripts"))
+from run_duckdb import run_file, source_fingerprint, stage_order  # noqa: E402
+
+
+# -------------------------
+# Source partitions
+# -------------------------
+
+def source_sql(path: Path) -> str:
+    """Events with occurred_at as UTC TIMESTAMP and an event_date column (Hive partition or derived)."""
+    if path.is_dir():
+        return (f"SELECT * REPLACE (occurred_at::TIMESTAMP AS occurred_at) "
+                f"FROM read_parquet('{path.as_posix()}/**/*.parquet', hive_partitioning=true, "
+                f"hive_types={{'event_date': DATE}})")
+    if path.suffix.lower() in (".parquet", ".pq"):
+        src = f"read_parquet('{path.as_posix()}')"
+    else:
+        src = f"read_csv('{path.as_posix()}', header=true, types={{'occurred_at': 'TIMESTAMP'}})"
+    return f"SELECT *, occurred_at::DATE AS event_date FROM (SELECT * REPLACE (occurred_at::TIMESTAMP AS occurred_at) FROM {src})"
+
+
+def partition_fingerprints(con, path: Path) -> Dict[date, str]:
+    """{event_date: fingerprint} for every partition of the source."""
+    if path.is_dir():
+        out = {}
+        for part in sorted(path.glob("event_date=*")):
+            files = sorted(part.rglob("*.parquet"))
+            if files:
+                stats = [f.stat() for f in files]
+                out[date.fromisoformat(part.name.split("=", 1)[1])] = (
+                    f"files={len(files)};bytes={sum(s.st_size for s in stats)};"
+                    f"mtime={max(s.st_mtime_ns for s in stats)}")
+        return out
+    rows = con.execute(f"""
+        SELECT event_date, COUNT(*), bit_xor(hash(e))
+        FROM ({source_sql(path)}) e
+        GROUP BY event_date
+    """).fetchall()
+    return {d: f"rows={n};hash={h}" for d, n, h in rows}
+
+
+def source_unchanged(con, path: Path) -> bool:
+    """True when a single-file source has the same path, size and mtime as at the last refresh."""
+    if path.is_dir():
+        return False
+    row = con.execute("SELECT path, size_bytes, mtime_ns FROM source_manifest").fetchone()
+    return row is not None and tuple(row) == source_fingerprint(path)
+
+
+# -------------------------
+# Refresh
+# -------------------------
+
+def _days_sql(days) -> str:
+    return ", ".join(f"DATE '{d.isoformat()}'" for d in sorted(days)) or "NULL"
+
+
+def refresh(con, data: Path, full: bool = False) -> List[date]:
+    """Refresh the rollups from `data`; returns the event dates that were rebuilt."""
+    con.execute("SET TimeZone = 'UTC'")
+    run_file(con, SQL_DIR / INIT_SQL)
+    con.execute("CREATE TABLE IF NOT EXISTS source_manifest (path VARCHAR, size_bytes BIGINT, mtime_ns BIGINT)")
+    if not full and source_unchanged(con, data):
+        return []
+
+    fps = partition_fingerprints(con, data)
+    loaded = dict(con.execute("SELECT event_date, fingerprint FROM partition_manifest").fetchall())
+    if full:
+        loaded = {}
+    days = sorted({d for d, fp in fps.items() if loaded.get(d) != fp} | (set(loaded) - set(fps)))
+
+    if days:
+        _stage_slice(con, data, days, full)
+    con.begin()
+    try:
+        if full:
+            for t in ROLLUP_TABLES:
+                con.execute(f"DELETE FROM {t}")
+        if days:
+            for name in REFRESH_SQL:
+                run_file(con, SQL_DIR / name)
+            _update_manifest(con, days, fps)
+        if not data.is_dir():
+            con.execute("DELETE FROM source_manifest")
+            con.execute("INSERT INTO source_manifest VALUES (?, ?, ?)", list(source_fingerprint(data)))
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        con.execute("DROP VIEW IF EXISTS event_sessions")
+        for t in SCRATCH_TABLES:
+            con.execute(f"DROP TABLE IF EXISTS {t}")
+    return days
+
+
+def _stage_slice(con, data: Path, days: List[date], full: bool) -> None:
+    """
+    Scratch inputs of sql/01..05, built before the refresh transaction: DuckDB plans the
+    stages' joins much better over committed tables than over transaction-local ones.
+    The `-- requires:` stages of sql/01..05 (sessions, tta_users) run here.
+    """
+    one = timedelta(days=1)
+    slice_days = {d + k * one for d in days for k in (-1, 0, 1)}
+    signup_days = {d + k * one for d in days for k in (-1, 0)}
+    where = "" if full else f"WHERE event_date IN ({_days_sql(slice_days)})"
+
+    con.execute(f"CREATE OR REPLACE TEMP TABLE refresh_days AS SELECT UNNEST([{_days_sql(days)}]) AS event_date")
+    con.execute("CREATE OR REPLACE TEMP TABLE touched_days (event_date DATE)")
+    con.execute(f"CREATE OR REPLACE TEMP TABLE events_slice AS SELECT * FROM ({source_sql(data)}) {where}")
+    # The funnel's sessions/TTA stages read mock_events: the events of users who signed up in
+    # scope, materialized and sorted like run_duckdb.py's table
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE mock_events AS
+        SELECT e.* FROM events_slice e
+        SEMI JOIN (SELECT user_id FROM events_slice
+                   WHERE event = 'signup_completed' AND event_date IN ({_days_sql(signup_days)})) s
+          USING (user_id)
+        ORDER BY e.user_id, e.occurred_at
+    """)
+    done: set = set()
+    for name in REFRESH_SQL:
+        for stage in stage_order(SQL_DIR / name, done):
+            run_file(con, stage)
+
+
+def _update_manifest(con, days: List[date], fps: Dict[date, str]) -> None:
+    con.execute(f"DELETE FROM partition_manifest WHERE event_date IN ({_days_sql(days)})")
+    con.execute("""
+        INSERT INTO partition_manifest
+        SELECT r.event_date, f.fingerprint, COALESCE(n.n_rows, 0), now()::TIMESTAMP
+        FROM refresh_days r
+        JOIN (SELECT UNNEST(?::DATE[]) AS event_date, UNNEST(?::VARCHAR[]) AS fingerprint) f USING (event_date)
+        LEFT JOIN (SELECT event_date, COUNT(*) AS n_rows FROM events_slice GROUP BY 1) n USING (event_date)
+    """, [list(fps), list(fps.values())])
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Build / incrementally refresh the Escaly metrics rollups.")
+    parser.add_argument("--data", type=str, default=str(DEFAULT_DATA),
+                        help="Events CSV, Parquet file or Hive-partitioned (event_date=) Parquet directory")
+    parser.add_argument("--db", type=str, default=str(DEFAULT_DB), help="DuckDB file holding the rollups")
+    parser.add_argument("--full", action="store_true", help="Clear the rollups and rebuild every partition")
+    args = parser.parse_args()
+
+    db = Path(args.db)
+    db.parent.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(str(db))
+    t0 = time.perf_counter()
+    days = refresh(con, Path(args.data), full=args.full)
+    secs = time.perf_counter() - t0
+
+    n_parts = con.execute("SELECT COUNT(*) FROM partition_manifest").fetchone()[0]
+    if days:
+        span = f"{days[0]} … {days[-1]}" if len(days) > 1 else f"{days[0]}"
+        print(f"🔄 Refreshed {len(days)} of {n_parts} partitions ({span}) in {secs:.2f}s [{db}]")
+    else:
+        print(f"✅ Rollups up to date ({n_parts} partitions) in {secs:.2f}s [{db}]")
+    for t in ROLLUP_TABLES[:-1]:
+        n = con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+        print(f"   {t}: {n:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+-- 00_init.sql
+-- Escaly metrics layer: rollup tables (created once, refreshed incrementally by partition)
+--   partition_manifest: one row per loaded event_date with the source fingerprint it was built from
+--   daily_rollup:       events per day x account x user x event x scale_id x channel x plan_tier
+--   assessment_firsts:  one row per assessment with its first start / first completion (retries count once)
+--   user_activation:    one row per signed-up user: signup, first-session activation, time to activation
+--   period_rollup:      week / month totals per channel x plan_tier, with '*' rows for the totals
+--                       (GROUPING SETS), so distinct counts stay exact at every level
+--   experiment_assignment / experiment_users: variant and per-user outcomes of each exp_* experiment
+--   experiment_results: one row per analysis run and settings (analyze_experiment.py), kept for sequential p-values
+
+CREATE TABLE IF NOT EXISTS partition_manifest (
+  event_date   DATE,
+  fingerprint  VARCHAR,
+  n_rows       BIGINT,
+  refreshed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS daily_rollup (
+  event_date DATE,
+  account_id VARCHAR,
+  user_id    VARCHAR,
+  event      VARCHAR,
+  scale_id   VARCHAR,
+  channel    VARCHAR,
+  plan_tier  VARCHAR,
+  n_events   BIGINT,
+  first_at   TIMESTAMP,
+  last_at    TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS assessment_firsts (
+  assessment_id VARCHAR,
+  account_id    VARCHAR,
+  user_id       VARCHAR,
+  scale_id      VARCHAR,
+  channel       VARCHAR,
+  plan_tier     VARCHAR,
+  started_at    TIMESTAMP,
+  completed_at  TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_activation (
+  user_id      VARCHAR,
+  account_id   VARCHAR,
+  signup_date  DATE,
+  signup_at    TIMESTAMP,
+  channel      VARCHAR,
+  plan_tier    VARCHAR,
+  activated_at TIMESTAMP,   -- first report in the signup session (NULL = not activated)
+  tta_minutes  DOUBLE
+);
+
+CREATE TABLE IF NOT EXISTS period_rollup (
+  grain                 VARCHAR,   -- 'week' | 'month'
+  period_start          DATE,
+  period_end            DATE,      -- exclusive
+  channel               VARCHAR,   -- '*' = all channels
+  plan_tier             VARCHAR,   -- '*' = all plan tiers
+  active_accounts       BIGINT,
+  active_users          BIGINT,
+  n_events              BIGINT,
+  signups_started       BIGINT,
+  signups               BIGINT,
+  activated_session1    BIGINT,
+  reports               BIGINT,
+  assessments_started   BIGINT,
+  assessments_completed BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS experiment_assignment (
+  experiment  VARCHAR,     -- tracking-plan property, e.g. exp_onboarding_flow
+  user_id     VARCHAR,
+  variant     VARCHAR,     -- value on the user's signup_completed event
+  assigned_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS experiment_users (
+  experiment           VARCHAR,
+  variant              VARCHAR,
+  user_id              VARCHAR,
+  signup_date          DATE,
+  channel              VARCHAR,
+  plan_tier            VARCHAR,
+  selected_scale       BOOLEAN,   -- select_scale on or after the signup day
+  completed_assessment BOOLEAN,   -- an assessment of the user was completed
+  activated_session1   BOOLEAN,   -- report in the signup session (user_activation)
+  tta_minutes          DOUBLE,    -- NULL = not activated
+  active_w1            BOOLEAN    -- any event 7..13 days after the signup day
+);
+
+CREATE TABLE IF NOT EXISTS experiment_results (
+  experiment     VARCHAR,
+  as_of          DATE,      -- latest loaded event date
+  metric         VARCHAR,
+  variant        VARCHAR,
+  n              BIGINT,
+  mean           DOUBLE,    -- CUPED-adjusted unless the run disabled it
+  control_n      BIGINT,
+  control_mean   DOUBLE,
+  delta          DOUBLE,
+  lift_pct       DOUBLE,
+  variance_reduction_pct DOUBLE,
+  p_fixed        DOUBLE,    -- fixed-horizon z-test, valid at one pre-planned look only
+  p_always_valid DOUBLE,    -- mSPRT, running minimum over this experiment's earlier runs
+  cs_low         DOUBLE,    -- always-valid confidence sequence for delta
+  cs_high        DOUBLE,
+  computed_at    TIMESTAMP,
+  cuped          BOOLEAN,   -- run settings: p_always_valid is a running minimum over runs
+  tau_rel        DOUBLE,    -- with the same control, cuped and tau_rel only
+  control        VARCHAR
+);
+-- Databases created before the run settings were stored
+ALTER TABLE experiment_results ADD COLUMN IF NOT EXISTS cuped BOOLEAN;
+ALTER TABLE experiment_results ADD COLUMN IF NOT EXISTS tau_rel DOUBLE;
+ALTER TABLE experiment_results ADD COLUMN IF NOT EXISTS control VARCHAR;
+
+-- Metric queries read one grain and one segmentation level:
+--   seg = 'total' (the '*' x '*' rows), 'channel' or 'plan_tier'.
+-- is_final: the period ended at least 5 days before the latest loaded event date
+-- (business-logic.md §8, late data).
+CREATE OR REPLACE MACRO period_slice(g, seg) AS TABLE
+SELECT
+  r.*,
+  CASE seg WHEN 'channel' THEN r.channel WHEN 'plan_tier' THEN r.plan_tier ELSE 'total' END AS segment,
+  m.max_day >= r.period_end + INTERVAL 5 DAY AS is_final
+FROM period_rollup r, (SELECT MAX(event_date) AS max_day FROM partition_manifest) m
+WHERE r.grain = g
+  AND CASE seg
+        WHEN 'channel'   THEN r.channel <> '*' AND r.plan_tier = '*'
+        WHEN 'plan_tier' THEN r.channel = '*' AND r.plan_tier <> '*'
+        ELSE r.channel = '*' AND r.plan_tier = '*'
+      END;
@@ -0,0 +1,24 @@
+-- 01_daily_rollup.sql
+-- Rebuild daily_rollup for the refreshed partitions only.
+-- Expects (from refresh_rollups.py): refresh_days(event_date), events_slice (events of the
+-- refreshed days and their neighbours, with event_date), touched_days(event_date).
+
+DELETE FROM daily_rollup WHERE event_date IN (SELECT event_date FROM refresh_days);
+
+INSERT INTO daily_rollup
+SELECT
+  event_date,
+  account_id,
+  user_id,
+  event,
+  scale_id,
+  channel,
+  plan_tier,
+  COUNT(*) AS n_events,
+  MIN(occurred_at) AS first_at,
+  MAX(occurred_at) AS last_at
+FROM events_slice
+WHERE event_date IN (SELECT event_date FROM refresh_days)
+GROUP BY ALL;
+
+INSERT INTO touched_days SELECT event_date FROM refresh_days;
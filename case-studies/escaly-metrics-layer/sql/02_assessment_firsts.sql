@@ -0,0 +1,45 @@
+-- 02_assessment_firsts.sql
+-- Merge the refreshed partitions' assessments into assessment_firsts.
+-- Each assessment counts once (business-logic.md §4): the earliest start and the earliest
+-- completion win, so retries and late-arriving duplicates never add to the counts.
+-- Days whose counts move (old and new first dates) are recorded in touched_days.
+
+CREATE OR REPLACE TEMP TABLE assessment_delta AS
+SELECT
+  assessment_id,
+  arg_min(account_id, occurred_at) AS account_id,
+  arg_min(user_id, occurred_at) AS user_id,
+  arg_min(scale_id, occurred_at) AS scale_id,
+  arg_min(channel, occurred_at) AS channel,
+  arg_min(plan_tier, occurred_at) AS plan_tier,
+  MIN(occurred_at) FILTER (WHERE status = 'started') AS started_at,
+  MIN(occurred_at) FILTER (WHERE status = 'complete') AS completed_at
+FROM events_slice
+WHERE event = 'submit_assessment'
+  AND assessment_id IS NOT NULL
+  AND event_date IN (SELECT event_date FROM refresh_days)
+GROUP BY assessment_id;
+
+CREATE OR REPLACE TEMP TABLE assessment_merged AS
+SELECT
+  d.assessment_id,
+  COALESCE(f.account_id, d.account_id) AS account_id,
+  COALESCE(f.user_id, d.user_id) AS user_id,
+  COALESCE(f.scale_id, d.scale_id) AS scale_id,
+  COALESCE(f.channel, d.channel) AS channel,
+  COALESCE(f.plan_tier, d.plan_tier) AS plan_tier,
+  LEAST(f.started_at, d.started_at) AS started_at,
+  LEAST(f.completed_at, d.completed_at) AS completed_at
+FROM assessment_delta d
+LEFT JOIN assessment_firsts f USING (assessment_id);
+
+INSERT INTO touched_days
+SELECT unnest([started_at::DATE, completed_at::DATE])
+FROM assessment_firsts
+WHERE assessment_id IN (SELECT assessment_id FROM assessment_delta);
+
+DELETE FROM assessment_firsts WHERE assessment_id IN (SELECT assessment_id FROM assessment_delta);
+INSERT INTO assessment_firsts SELECT * FROM assessment_merged;
+
+INSERT INTO touched_days
+SELECT unnest([started_at::DATE, completed_at::DATE]) FROM assessment_merged;
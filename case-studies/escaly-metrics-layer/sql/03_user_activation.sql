@@ -0,0 +1,36 @@
+-- 03_user_activation.sql
+-- Upsert user_activation for users who signed up on a refreshed day (or the day before, whose
+-- first session may run into a refreshed day).
+-- requires: ../../escaly-activation-funnel/tta_stage.sql
+-- refresh_rollups.py points mock_events at those users' events in events_slice; the funnel's
+-- sessions_stage.sql / tta_stage.sql then compute sessions and first-session activation, so the
+-- metric uses exactly the time-to-activation definition of the activation case study.
+
+INSERT INTO touched_days
+SELECT signup_date FROM user_activation WHERE user_id IN (SELECT user_id FROM tta_users);
+
+DELETE FROM user_activation WHERE user_id IN (SELECT user_id FROM tta_users);
+
+INSERT INTO user_activation
+SELECT
+  t.user_id,
+  a.account_id,
+  t.signup_at::DATE AS signup_date,
+  t.signup_at,
+  t.channel,
+  t.plan_tier,
+  t.report_at AS activated_at,
+  t.tta_minutes
+FROM tta_users t
+LEFT JOIN (
+  SELECT user_id, arg_min(account_id, occurred_at) AS account_id
+  FROM mock_events
+  WHERE event = 'signup_completed'
+  GROUP BY user_id
+) a USING (user_id);
+
+INSERT INTO touched_days SELECT DISTINCT signup_at::DATE FROM tta_users;
+
+DROP VIEW event_sessions;
+DROP TABLE sessions;
+DROP TABLE tta_users;
@@ -0,0 +1,113 @@
+-- 04_period_rollup.sql
+-- Recompute period_rollup for every week / month containing a touched day.
+-- Reads only the daily tables of those periods; each source is grouped with GROUPING SETS so
+-- the '*' (all channels / all plan tiers) rows carry exact distinct counts.
+
+CREATE OR REPLACE TEMP TABLE refresh_periods AS
+SELECT DISTINCT
+  g.grain,
+  date_trunc(g.grain, d.event_date)::DATE AS period_start,
+  (date_trunc(g.grain, d.event_date) + CASE g.grain WHEN 'week' THEN INTERVAL 7 DAY ELSE INTERVAL 1 MONTH END)::DATE AS period_end
+FROM touched_days d
+CROSS JOIN (VALUES ('week'), ('month')) AS g(grain)
+WHERE d.event_date IS NOT NULL;
+
+DELETE FROM period_rollup r
+USING refresh_periods p
+WHERE r.grain = p.grain AND r.period_start = p.period_start;
+
+INSERT INTO period_rollup
+WITH activity AS (
+  SELECT p.grain, p.period_start, p.period_end,
+         COALESCE(r.channel, 'unknown') AS channel, COALESCE(r.plan_tier, 'unknown') AS plan_tier,
+         r.account_id, r.user_id, r.event, r.n_events
+  FROM daily_rollup r
+  JOIN refresh_periods p ON r.event_date >= p.period_start AND r.event_date < p.period_end
+),
+act AS (
+  SELECT
+    grain, period_start, period_end,
+    CASE WHEN GROUPING(channel) = 1 THEN '*' ELSE channel END AS channel,
+    CASE WHEN GROUPING(plan_tier) = 1 THEN '*' ELSE plan_tier END AS plan_tier,
+    COUNT(DISTINCT account_id) AS active_accounts,
+    COUNT(DISTINCT user_id) AS active_users,
+    SUM(n_events) AS n_events,
+    COALESCE(SUM(n_events) FILTER (WHERE event = 'signup_started'), 0) AS signups_started,
+    COALESCE(SUM(n_events) FILTER (WHERE event = 'generate_report'), 0) AS reports
+  FROM activity
+  GROUP BY GROUPING SETS (
+    (grain, period_start, period_end, channel, plan_tier),
+    (grain, period_start, period_end, channel),
+    (grain, period_start, period_end, plan_tier),
+    (grain, period_start, period_end)
+  )
+),
+signups AS (
+  SELECT p.grain, p.period_start, p.period_end,
+         COALESCE(u.channel, 'unknown') AS channel, COALESCE(u.plan_tier, 'unknown') AS plan_tier,
+         u.activated_at
+  FROM user_activation u
+  JOIN refresh_periods p ON u.signup_date >= p.period_start AND u.signup_date < p.period_end
+),
+sig AS (
+  SELECT
+    grain, period_start, period_end,
+    CASE WHEN GROUPING(channel) = 1 THEN '*' ELSE channel END AS channel,
+    CASE WHEN GROUPING(plan_tier) = 1 THEN '*' ELSE plan_tier END AS plan_tier,
+    COUNT(*) AS signups,
+    COUNT(activated_at) AS activated_session1
+  FROM signups
+  GROUP BY GROUPING SETS (
+    (grain, period_start, period_end, channel, plan_tier),
+    (grain, period_start, period_end, channel),
+    (grain, period_start, period_end, plan_tier),
+    (grain, period_start, period_end)
+  )
+),
+assessment_days AS (
+  SELECT started_at::DATE AS day, 1 AS started, 0 AS completed, channel, plan_tier
+  FROM assessment_firsts WHERE started_at IS NOT NULL
+  UNION ALL
+  SELECT completed_at::DATE, 0, 1, channel, plan_tier
+  FROM assessment_firsts WHERE completed_at IS NOT NULL
+),
+assessments AS (
+  SELECT p.grain, p.period_start, p.period_end,
+         COALESCE(a.channel, 'unknown') AS channel, COALESCE(a.plan_tier, 'unknown') AS plan_tier,
+         a.started, a.completed
+  FROM assessment_days a
+  JOIN refresh_periods p ON a.day >= p.period_start AND a.day < p.period_end
+),
+asm AS (
+  SELECT
+    grain, period_start, period_end,
+    CASE WHEN GROUPING(channel) = 1 THEN '*' ELSE channel END AS channel,
+    CASE WHEN GROUPING(plan_tier) = 1 THEN '*' ELSE plan_tier END AS plan_tier,
+    SUM(started) AS assessments_started,
+    SUM(completed) AS assessments_completed
+  FROM assessments
+  GROUP BY GROUPING SETS (
+    (grain, period_start, period_end, channel, plan_tier),
+    (grain, period_start, period_end, channel),
+    (grain, period_start, period_end, plan_tier),
+    (grain, period_start, period_end)
+  )
+)
+SELECT
+  grain,
+  period_start,
+  period_end,
+  channel,
+  plan_tier,
+  COALESCE(act.active_accounts, 0),
+  COALESCE(act.active_users, 0),
+  COALESCE(act.n_events, 0),
+  COALESCE(act.signups_started, 0),
+  COALESCE(sig.signups, 0),
+  COALESCE(sig.activated_session1, 0),
+  COALESCE(act.reports, 0),
+  COALESCE(asm.assessments_started, 0),
+  COALESCE(asm.assessments_completed, 0)
+FROM act
+FULL JOIN sig USING (grain, period_start, period_end, channel, plan_tier)
+FULL JOIN asm USING (grain, period_start, period_end, channel, plan_tier);
@@ -0,0 +1,64 @@
+-- 05_experiment_users.sql
+-- Upsert experiment assignments and per-user experiment outcomes for the refreshed partitions.
+-- The variant is the exp_onboarding_flow value on the user's signup_completed event. Outcomes are
+-- recomputed for every user with events on a refreshed day (new signups, and later activity such
+-- as a week-1 return), from the rollups built by sql/01..03 rather than from the raw events.
+
+DELETE FROM experiment_assignment
+WHERE user_id IN (SELECT user_id FROM events_slice
+                  WHERE event = 'signup_completed' AND event_date IN (SELECT event_date FROM refresh_days));
+
+INSERT INTO experiment_assignment
+SELECT
+  'exp_onboarding_flow' AS experiment,
+  user_id,
+  arg_min(exp_onboarding_flow, occurred_at) AS variant,
+  MIN(occurred_at) AS assigned_at
+FROM events_slice
+WHERE event = 'signup_completed'
+  AND event_date IN (SELECT event_date FROM refresh_days)
+  AND exp_onboarding_flow IS NOT NULL
+GROUP BY user_id;
+
+CREATE OR REPLACE TEMP TABLE experiment_touched AS
+SELECT DISTINCT user_id FROM events_slice WHERE event_date IN (SELECT event_date FROM refresh_days);
+
+DELETE FROM experiment_users WHERE user_id IN (SELECT user_id FROM experiment_touched);
+
+INSERT INTO experiment_users
+WITH users AS (
+  SELECT a.experiment, a.variant, u.user_id, u.signup_date, u.channel, u.plan_tier, u.activated_at, u.tta_minutes
+  FROM user_activation u
+  JOIN experiment_assignment a USING (user_id)
+  WHERE u.user_id IN (SELECT user_id FROM experiment_touched)
+),
+activity AS (
+  SELECT
+    d.user_id,
+    bool_or(d.event = 'select_scale' AND d.event_date >= u.signup_date) AS selected_scale,
+    bool_or(d.event_date BETWEEN u.signup_date + 7 AND u.signup_date + 13) AS active_w1
+  FROM daily_rollup d
+  JOIN users u USING (user_id)
+  GROUP BY d.user_id
+),
+assessments AS (
+  SELECT user_id, bool_or(completed_at IS NOT NULL) AS completed_assessment
+  FROM assessment_firsts
+  WHERE user_id IN (SELECT user_id FROM users)
+  GROUP BY user_id
+)
+SELECT
+  u.experiment,
+  u.variant,
+  u.user_id,
+  u.signup_date,
+  u.channel,
+  u.plan_tier,
+  COALESCE(a.selected_scale, FALSE),
+  COALESCE(s.completed_assessment, FALSE),
+  u.activated_at IS NOT NULL,
+  u.tta_minutes,
+  COALESCE(a.active_w1, FALSE)
+FROM users u
+LEFT JOIN activity a USING (user_id)
+LEFT JOIN assessments s USING (user_id);
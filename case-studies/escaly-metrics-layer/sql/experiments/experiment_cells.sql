@@ -0,0 +1,39 @@
+-- experiment_cells.sql
+-- Sufficient statistics of every experiment metric in one grouped pass over experiment_users.
+-- One row per variant x stratum (channel / plan_tier at signup) x metric with n, sum(y) and
+-- sum(y^2); analyze_experiment.py derives means, variances, CUPED adjustments and tests from them.
+-- The GROUPING SETS rollup adds stratum '*' rows per variant, which carry the median.
+-- Users only count towards active_w1 once their week-1 window (days 7..13) is fully loaded.
+-- Variables: experiment (default exp_onboarding_flow).
+
+WITH as_of AS (
+  SELECT MAX(event_date) AS as_of FROM partition_manifest
+),
+users AS (
+  SELECT
+    e.variant,
+    e.channel || '/' || e.plan_tier AS stratum,
+    e.selected_scale::DOUBLE AS selected_scale,
+    e.completed_assessment::DOUBLE AS completed_assessment,
+    e.activated_session1::DOUBLE AS activated_session1,
+    e.tta_minutes,
+    CASE WHEN e.signup_date + 13 <= a.as_of THEN e.active_w1::DOUBLE END AS active_w1
+  FROM experiment_users e, as_of a
+  WHERE e.experiment = COALESCE(getvariable('experiment'), 'exp_onboarding_flow')
+),
+long AS (
+  UNPIVOT users
+  ON selected_scale, completed_assessment, activated_session1, tta_minutes, active_w1
+  INTO NAME metric VALUE y
+)
+SELECT
+  variant,
+  CASE WHEN GROUPING(stratum) = 1 THEN '*' ELSE stratum END AS stratum,
+  metric,
+  COUNT(*) AS n,
+  SUM(y) AS s1,
+  SUM(y * y) AS s2,
+  CASE WHEN GROUPING(stratum) = 1 THEN median(y) END AS median
+FROM long
+GROUP BY GROUPING SETS ((variant, metric, stratum), (variant, metric))
+ORDER BY metric, variant, stratum;
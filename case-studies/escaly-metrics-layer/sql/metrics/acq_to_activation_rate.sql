@@ -0,0 +1,13 @@
+-- acq_to_activation_rate.sql
+-- Newly acquired users who reach the first value moment within session 1, by signup period.
+-- Same ratio as activation_rate_session1, read by acquisition channel unless segment is set.
+
+SELECT
+  period_start,
+  segment,
+  signups,
+  activated_session1,
+  ROUND(100.0 * activated_session1 / NULLIF(signups, 0), 2) AS acq_to_activation_rate,
+  is_final
+FROM period_slice(COALESCE(getvariable('grain'), 'month'), COALESCE(getvariable('segment'), 'channel'))
+ORDER BY period_start, segment;
@@ -0,0 +1,12 @@
+-- activation_rate_session1.sql
+-- New users who generate a report during their first session (30 min inactivity), by signup period.
+
+SELECT
+  period_start,
+  segment,
+  signups,
+  activated_session1,
+  ROUND(100.0 * activated_session1 / NULLIF(signups, 0), 2) AS activation_rate_session1,
+  is_final
+FROM period_slice(COALESCE(getvariable('grain'), 'month'), COALESCE(getvariable('segment'), 'total'))
+ORDER BY period_start, segment;
@@ -0,0 +1,12 @@
+-- assessments_per_active_account_m1.sql
+-- Completed assessments per active account (any event in the period).
+
+SELECT
+  period_start,
+  segment,
+  assessments_completed,
+  active_accounts,
+  ROUND(assessments_completed / NULLIF(active_accounts, 0), 3) AS assessments_per_active_account_m1,
+  is_final
+FROM period_slice(COALESCE(getvariable('grain'), 'month'), COALESCE(getvariable('segment'), 'total'))
+ORDER BY period_start, segment;
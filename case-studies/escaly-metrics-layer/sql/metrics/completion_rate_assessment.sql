@@ -0,0 +1,12 @@
+-- completion_rate_assessment.sql
+-- Assessments completed / assessments started per period.
+
+SELECT
+  period_start,
+  segment,
+  assessments_started,
+  assessments_completed,
+  ROUND(100.0 * assessments_completed / NULLIF(assessments_started, 0), 2) AS completion_rate_assessment,
+  is_final
+FROM period_slice(COALESCE(getvariable('grain'), 'month'), COALESCE(getvariable('segment'), 'total'))
+ORDER BY period_start, segment;
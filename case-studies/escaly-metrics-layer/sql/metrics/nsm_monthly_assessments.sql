@@ -0,0 +1,11 @@
+-- nsm_monthly_assessments.sql
+-- North Star: assessments completed across all users and scales per period
+-- (each assessment counts once, at its first completion; business-logic.md §4).
+
+SELECT
+  period_start,
+  segment,
+  assessments_completed AS nsm_monthly_assessments,
+  is_final
+FROM period_slice(COALESCE(getvariable('grain'), 'month'), COALESCE(getvariable('segment'), 'total'))
+ORDER BY period_start, segment;
@@ -0,0 +1,12 @@
+-- signup_channel_share.sql
+-- Distribution of new signups by acquisition channel per period.
+
+SELECT
+  c.period_start,
+  c.channel,
+  c.signups,
+  ROUND(100.0 * c.signups / NULLIF(t.signups, 0), 2) AS signup_channel_share,
+  c.is_final
+FROM period_slice(COALESCE(getvariable('grain'), 'month'), 'channel') c
+JOIN period_slice(COALESCE(getvariable('grain'), 'month'), 'total') t USING (period_start)
+ORDER BY c.period_start, c.signups DESC;
@@ -0,0 +1,12 @@
+-- signup_completion_rate.sql
+-- Signups completed / signups started per period (NULL when no signup_started events are tracked).
+
+SELECT
+  period_start,
+  segment,
+  signups_started,
+  signups,
+  ROUND(100.0 * signups / NULLIF(signups_started, 0), 2) AS signup_completion_rate,
+  is_final
+FROM period_slice(COALESCE(getvariable('grain'), 'month'), COALESCE(getvariable('segment'), 'total'))
+ORDER BY period_start, segment;
@@ -0,0 +1,16 @@
+-- tta_median_minutes.sql
+-- Median minutes from signup to the first-session report, by signup period.
+-- A median does not add up across periods, so this reads user_activation (one row per user).
+
+WITH params AS (
+  SELECT COALESCE(getvariable('grain'), 'month') AS g, COALESCE(getvariable('segment'), 'total') AS seg
+)
+SELECT
+  date_trunc(p.g, u.signup_date)::DATE AS period_start,
+  CASE p.seg WHEN 'channel' THEN u.channel WHEN 'plan_tier' THEN u.plan_tier ELSE 'total' END AS segment,
+  COUNT(u.tta_minutes) AS activated_users,
+  ROUND(MEDIAN(u.tta_minutes), 2) AS tta_median_minutes
+FROM user_activation u, params p
+WHERE u.tta_minutes IS NOT NULL
+GROUP BY ALL
+ORDER BY period_start, segment;
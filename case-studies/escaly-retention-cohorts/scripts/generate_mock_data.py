@@ -28,18 +28,54 @@ Usage:
       --seed 7 \
       --out case-studies/escaly-retention-cohorts/data/events.csv
 
+  For load tests (1M+ accounts), switch to the batched NumPy engine:
+
+  python generate_mock_data.py --accounts 1000000 --weeks 52 --engine numpy
+
+  The NumPy engine uses the same decay/probability parameters but draws every
+  outcome as an array, so its output is statistically (not byte-for-byte)
+  equivalent to the default pure-Python engine for the same seed.
+
+  Events are streamed to disk in --chunk-rows blocks (CSV or Parquet, see
+  case-studies/scripts/event_io.py), optionally partitioned by event date:
+
+  python generate_mock_data.py --accounts 1000000 --engine numpy \
+      --out data/events_parquet --format parquet --partition-by-date
+
+  Accounts are generated in fixed-size shards (--shard-size), each with its own
+  derived seed, so --workers N spreads them over a process pool and the output
+  is byte-identical for any N:
+
+  python generate_mock_data.py --accounts 10000000 --engine numpy --workers 32
+
+  Both engines emit compact events (event_io.EventBuffer): accounts, users and
+  assessment/report ids are integers, timestamps epoch seconds, and the id strings
+  ("a12", "ua12_2", "as_a12_3_ua12_2") are only formatted when a chunk is written.
+
 """
 
 from __future__ import annotations
 
 import argparse
-import csv
 import math
 import random
-from dataclasses import dataclass
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass, field
 from datetime import date, datetime, time, timedelta
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # only needed for --engine numpy
+    np = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from event_io import (DEFAULT_CHUNK_ROWS, FORMATS, INT, TIMESTAMP, Column, EventWriter,  # noqa: E402
+                      epoch, resolve_format)
+from sharding import DEFAULT_SHARD_SIZE, concat_rows, map_shards, shard_ranges, shard_seed  # noqa: E402
 
 
 # ----------------------------
@@ -48,17 +84,64 @@ from typing import List
 
 SCALES = ["sc_barthel", "sc_gencat", "sc_cope", "sc_quality_of_life"]
 
+# Team size distribution for multi-user orgs (skewed towards 2–3 users)
+MULTI_SIZES = [2, 3, 4, 5]
+MULTI_SIZE_WEIGHTS = [0.55, 0.30, 0.10, 0.05]
+
+# Compact ids (formatted only on write):
+#   account a{n}            -> n
+#   user    ua{n}_{j}       -> n * USER_SLOTS + j          (j = 1..5)
+#   as_/r_  a{n}_{w}_ua{n}_{j} -> n << 20 | w << 3 | j     (w < 2**17 weeks)
+USER_SLOTS = 8
+
+
+def user_num(account: int, j: int) -> int:
+    return account * USER_SLOTS + j
+
+
+def format_user(u: int) -> str:
+    return f"ua{u // USER_SLOTS}_{u % USER_SLOTS}"
+
+
+def activity_num(account: int, week: int, u: int) -> int:
+    return account << 20 | week << 3 | u % USER_SLOTS
+
+
+def _activity_suffix(a: int) -> str:
+    n, w, j = a >> 20, (a >> 3) & 0x1FFFF, a & 0x7
+    return f"a{n}_{w}_ua{n}_{j}"
+
+
+def format_assessment(a: int) -> str:
+    return f"as_{_activity_suffix(a)}"
+
+
+def format_report(a: int) -> str:
+    return f"r_{_activity_suffix(a)}"
+
+
+COLUMNS = [
+    Column("account_id", INT, "a{}"),
+    Column("user_id", INT, format_user),
+    Column("event_name"),
+    Column("event_ts", TIMESTAMP),
+    Column("report_id", INT, format_report),
+    Column("assessment_id", INT, format_assessment),
+    Column("scale_id"),
+]
+FIELDNAMES = [c.name for c in COLUMNS]
+
 @dataclass
 class OrgConfig:
-    account_id: str
+    account_id: int     # a{account_id}
     signup: date
-    users: List[str]
+    users: List[int]    # user_num(account_id, 1..size)
     is_multi: bool
 
 
-def iso_dt(d: date, hour: int = 9, minute: int = 0) -> str:
-    """Return ISO8601 UTC-like timestamp with trailing Z (no tz calc needed for mock)."""
-    return datetime.combine(d, time(hour, minute)).isoformat() + "Z"
+def epoch_dt(d: date, hour: int = 9, minute: int = 0) -> int:
+    """Epoch seconds of d at hour:minute UTC (written as ISO8601 with trailing Z)."""
+    return epoch(datetime.combine(d, time(hour, minute)))
 
 
 def week_start(d: date, weeks: int) -> datetime:
@@ -79,27 +162,27 @@ def build_orgs(
     start_date: date,
     signup_span_days: int,
     multi_share: float,
+    first_account: int = 1,
 ) -> List[OrgConfig]:
     """
-    Create base orgs:
+    Create base orgs (numbered a{first_account}..; shards pass their own offset):
       - Distribute signups uniformly across signup_span_days.
       - Decide if org is multi-user (prob = multi_share).
       - Assign 1..5 users (single-user = 1; multi-user = 2..5 with skew to 2–3).
     """
     orgs = []
-    for i in range(1, n_accounts + 1):
-        acc = f"a{i}"
+    for i in range(first_account, first_account + n_accounts):
         signup = start_date + timedelta(days=random.randint(0, max(0, signup_span_days)))
         is_multi = random.random() < multi_share
 
         if is_multi:
             # Skew towards 2–3 users; occasionally 4–5
-            size = random.choices([2, 3, 4, 5], weights=[0.55, 0.30, 0.10, 0.05], k=1)[0]
+            size = random.choices(MULTI_SIZES, weights=MULTI_SIZE_WEIGHTS, k=1)[0]
         else:
             size = 1
 
-        users = [f"u{acc}_{j}" for j in range(1, size + 1)]
-        orgs.append(OrgConfig(account_id=acc, signup=signup, users=users, is_multi=is_multi))
+        users = [user_num(i, j) for j in range(1, size + 1)]
+        orgs.append(OrgConfig(account_id=i, signup=signup, users=users, is_multi=is_multi))
     return orgs
 
 
@@ -111,28 +194,18 @@ def emit_events(
     decay_single: float = 0.78,
     decay_multi: float = 0.95,
     report_prob: float = 0.65,
-) -> List[dict]:
+) -> Iterator[tuple]:
     """
-    Emit events per org across weeks:
+    Yield compact events (COLUMNS order, -1 = no id) per org across weeks (streamed):
       - Week 0..weeks-1 relative to org.signup.
       - Per week, compute activity probability with decay; multi-user has higher base and slower decay.
       - If week in 0..4 and org is multi, encourage 2nd user activity (collaboration onset).
       - When active: emit submit_assessment, maybe generate_report.
     """
-    rows: List[dict] = []
-
     for org in orgs:
         # 1) signup_completed by first user
         first_user = org.users[0]
-        rows.append(dict(
-            account_id=org.account_id,
-            user_id=first_user,
-            event_name="signup_completed",
-            event_ts=iso_dt(org.signup, 9, 0),
-            report_id="",
-            assessment_id="",
-            scale_id=""
-        ))
+        yield (org.account_id, first_user, "signup_completed", epoch_dt(org.signup, 9, 0), -1, -1, "")
 
         # Changed range to include the final week
         for w in range(weeks + 1):
@@ -143,7 +216,7 @@ def emit_events(
                 p = base_p_single * (decay_single ** w)
 
             # Decide which users might be active
-            wk_start = week_start(org.signup, w)
+            wk_start = epoch(week_start(org.signup, w))
 
             candidate_users = [first_user]
             if org.is_multi and w <= 4:
@@ -162,36 +235,261 @@ def emit_events(
             for u in candidate_users:
                 if random.random() < p:
                     # submit_assessment
-                    as_id = f"as_{org.account_id}_{w}_{u}"
+                    as_id = activity_num(org.account_id, w, u)
                     scale_id = choice(SCALES)
-                    rows.append(dict(
-                        account_id=org.account_id,
-                        user_id=u,
-                        event_name="submit_assessment",
-                        event_ts=(wk_start + timedelta(minutes=random.randint(5, 120))).isoformat() + "Z",
-                        report_id="",
-                        assessment_id=as_id,
-                        scale_id=scale_id
-                    ))
+                    yield (org.account_id, u, "submit_assessment", wk_start + 60 * random.randint(5, 120),
+                           -1, as_id, scale_id)
                     # Maybe generate_report (value moment)
                     if random.random() < report_prob:
-                        rows.append(dict(
-                            account_id=org.account_id,
-                            user_id=u,
-                            event_name="generate_report",
-                            event_ts=(wk_start + timedelta(minutes=random.randint(121, 220))).isoformat() + "Z",
-                            report_id=f"r_{org.account_id}_{w}_{u}",
-                            assessment_id=as_id,
-                            scale_id=scale_id
-                        ))
+                        yield (org.account_id, u, "generate_report", wk_start + 60 * random.randint(121, 220),
+                               as_id, as_id, scale_id)
+
+
+# ----------------------------
+# Vectorized (NumPy) engine
+# ----------------------------
+
+@dataclass
+class OrgArrays:
+    """Columnar counterpart of List[OrgConfig]: one array slot per org."""
+    account_num: "np.ndarray"   # 1-based org number (account_id = f"a{n}")
+    signup: "np.ndarray"        # datetime64[D]
+    is_multi: "np.ndarray"      # bool
+    size: "np.ndarray"          # users per org (1..5)
+
+    def __len__(self) -> int:
+        return len(self.account_num)
+
+
+def build_orgs_numpy(
+    n_accounts: int,
+    start_date: date,
+    signup_span_days: int,
+    multi_share: float,
+    rng: "np.random.Generator",
+    first_account: int = 1,
+) -> OrgArrays:
+    """
+    Array version of build_orgs (same distributions, drawn in one shot):
+      - Signup day uniform over 0..signup_span_days.
+      - Multi-user with prob = multi_share; size drawn from MULTI_SIZES/MULTI_SIZE_WEIGHTS.
+    """
+    offsets = rng.integers(0, max(0, signup_span_days) + 1, size=n_accounts)
+    is_multi = rng.random(n_accounts) < multi_share
+    multi_size = rng.choice(MULTI_SIZES, size=n_accounts, p=MULTI_SIZE_WEIGHTS)
+    return OrgArrays(
+        account_num=np.arange(first_account, first_account + n_accounts, dtype=np.int64),
+        signup=np.datetime64(start_date, "D") + offsets,
+        is_multi=is_multi,
+        size=np.where(is_multi, multi_size, 1).astype(np.int64),
+    )
 
-    return rows
+
+def _emit_batch_numpy(
+    orgs: OrgArrays,
+    lo: int,
+    hi: int,
+    weeks: int,
+    rng: "np.random.Generator",
+    base_p_single: float,
+    base_p_multi: float,
+    decay_single: float,
+    decay_multi: float,
+    report_prob: float,
+) -> Dict[str, "np.ndarray"]:
+    """Emit the events of orgs[lo:hi] as a columnar table (see emit_events_numpy)."""
+    n = hi - lo
+    n_weeks = weeks + 1
+    is_multi = orgs.is_multi[lo:hi, None]
+    size = orgs.size[lo:hi, None]
+    w = np.arange(n_weeks)[None, :]
+
+    # Per org-week activity probability with exponential decay
+    p = np.where(is_multi, base_p_multi * decay_multi ** w, base_p_single * decay_single ** w)
+
+    # Candidate users per org-week: slot 0 = first user, slot 1 = early collaborator (w <= 4),
+    # slot 2 = occasional third user (w >= 2, teams of 3+). Slots 1/2 pick one of users[1:].
+    present = np.empty((n, n_weeks, 3), dtype=bool)
+    present[:, :, 0] = True
+    present[:, :, 1] = is_multi & (w <= 4) & (rng.random((n, n_weeks)) < 0.50)
+    present[:, :, 2] = is_multi & (size >= 3) & (w >= 2) & (rng.random((n, n_weeks)) < 0.25)
+
+    user_idx = np.zeros((n, n_weeks, 3), dtype=np.int64)
+    extra = np.maximum(size - 1, 1)
+    user_idx[:, :, 1] = 1 + (rng.random((n, n_weeks)) * extra).astype(np.int64)
+    user_idx[:, :, 2] = 1 + (rng.random((n, n_weeks)) * extra).astype(np.int64)
+    # De-duplicate: the third-user draw may land on the early collaborator
+    present[:, :, 2] &= ~(present[:, :, 1] & (user_idx[:, :, 2] == user_idx[:, :, 1]))
+
+    active = present & (rng.random((n, n_weeks, 3)) < p[:, :, None])
+    org_i, wk, slot = np.nonzero(active)
+    m = len(org_i)
+    u_i = user_idx[org_i, wk, slot]
+    submit_min = rng.integers(5, 121, size=m)
+    has_report = rng.random(m) < report_prob
+    report_min = rng.integers(121, 221, size=m)
+    scale = rng.integers(0, len(SCALES), size=m)
+
+    # Stack signup + submit + report rows, then order them like the Python engine:
+    # per org (signup first), then per week, per candidate slot, submit before report.
+    r = np.nonzero(has_report)[0]
+    stride = 2 * 3 * n_weeks + 1
+    seq = 1 + 2 * (wk * 3 + slot)
+    row_org = np.concatenate([np.arange(n), org_i, org_i[r]])
+    row_user = np.concatenate([np.zeros(n, dtype=np.int64), u_i, u_i[r]])
+    row_week = np.concatenate([np.zeros(n, dtype=np.int64), wk, wk[r]])
+    row_kind = np.concatenate([np.zeros(n, dtype=np.int8), np.ones(m, dtype=np.int8), np.full(len(r), 2, dtype=np.int8)])
+    row_min = np.concatenate([np.zeros(n, dtype=np.int64), submit_min, report_min[r]])
+    row_scale = np.concatenate([np.zeros(n, dtype=np.int64), scale, scale[r]])
+    order = np.argsort(
+        row_org * stride + np.concatenate([np.zeros(n, dtype=np.int64), seq, seq[r] + 1]),
+        kind="stable",
+    )
+    row_org, row_user, row_week, row_kind, row_min, row_scale = (
+        a[order] for a in (row_org, row_user, row_week, row_kind, row_min, row_scale)
+    )
+
+    # Timestamps: signup day 09:00 + n weeks + sampled minutes (signup itself at 09:00 sharp)
+    signup_09 = orgs.signup[lo:hi].astype("datetime64[m]") + np.timedelta64(9 * 60, "m")
+    ts = signup_09[row_org] + (row_week * 7 * 24 * 60 + row_min).astype("timedelta64[m]")
+
+    # Integer ids (see COLUMNS); strings are only formatted when the batch is written
+    acc = orgs.account_num[lo:hi][row_org]
+    j = row_user + 1
+    activity = acc << 20 | row_week << 3 | j
+    is_signup = row_kind == 0
+    is_report = row_kind == 2
+    return {
+        "account_id": acc,
+        "user_id": acc * USER_SLOTS + j,
+        "event_name": np.array(["signup_completed", "submit_assessment", "generate_report"])[row_kind],
+        "event_ts": ts,
+        "report_id": np.where(is_report, activity, -1),
+        "assessment_id": np.where(is_signup, -1, activity),
+        "scale_id": np.where(is_signup, "", np.array(SCALES)[row_scale]),
+    }
+
+
+def iter_event_batches_numpy(
+    orgs: OrgArrays,
+    weeks: int,
+    rng: "np.random.Generator",
+    base_p_single: float = 0.55,
+    base_p_multi: float = 0.78,
+    decay_single: float = 0.78,
+    decay_multi: float = 0.95,
+    report_prob: float = 0.65,
+    batch_size: int = 20_000,
+) -> Iterator[Dict[str, "np.ndarray"]]:
+    """
+    Vectorized emit_events with identical parameters and event schema:
+      - Activity, collaboration and report outcomes are drawn as (org, week, slot) arrays.
+      - Orgs are processed in batches of batch_size to bound the size of those arrays.
+      - Yields one columnar table {column: array} per batch, rows ordered per org exactly
+        like emit_events (signup, then week by week).
+    """
+    for lo in range(0, len(orgs), batch_size):
+        yield _emit_batch_numpy(orgs, lo, min(lo + batch_size, len(orgs)), weeks, rng,
+                                base_p_single, base_p_multi, decay_single, decay_multi, report_prob)
+
+
+def emit_events_numpy(orgs: OrgArrays, weeks: int, rng: "np.random.Generator", **params) -> Dict[str, "np.ndarray"]:
+    """Concatenate iter_event_batches_numpy into a single columnar event table."""
+    batches = list(iter_event_batches_numpy(orgs, weeks, rng, **params))
+    return {col: np.concatenate([b[col] for b in batches]) for col in FIELDNAMES}
 
 
 # ----------------------------
-# CLI
+# Sharded generation
 # ----------------------------
 
+@dataclass
+class ShardTask:
+    shard: int
+    first_account: int
+    n_accounts: int
+    seed: int
+    weeks: int
+    start_date: date
+    signup_span_days: int
+    multi_share: float
+    engine: str
+    out: Optional[str] = None          # where a pool worker writes this shard
+    fmt: Optional[str] = None
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
+    partition_by_date: bool = False
+
+
+@dataclass
+class ShardStats:
+    n_orgs: int = 0
+    multi: int = 0
+    counts: Dict[str, int] = field(default_factory=lambda: {
+        "signup_completed": 0, "submit_assessment": 0, "generate_report": 0})
+
+    def add(self, other: "ShardStats") -> None:
+        self.n_orgs += other.n_orgs
+        self.multi += other.multi
+        for k, v in other.counts.items():
+            self.counts[k] += v
+
+
+def open_writer(out: Path, fmt: Optional[str], chunk_rows: int, partition_by_date: bool,
+                part_name: str = "part-00000", compact: bool = True) -> EventWriter:
+    """Writer for compact events (compact=False: rows of already formatted strings)."""
+    return EventWriter(
+        out, FIELDNAMES, fmt=fmt, chunk_rows=chunk_rows,
+        partition_field="event_ts" if partition_by_date else None,
+        timestamp_fields=["event_ts"], part_name=part_name, columns=COLUMNS if compact else None,
+    )
+
+
+def write_shard(task: ShardTask, writer: EventWriter) -> ShardStats:
+    """Generate one shard of accounts from its own seed and stream its events into writer."""
+    stats = ShardStats(n_orgs=task.n_accounts)
+    seed = shard_seed(task.seed, task.shard)
+    if task.engine == "numpy":
+        rng = np.random.default_rng(seed)
+        org_arrays = build_orgs_numpy(
+            n_accounts=task.n_accounts,
+            start_date=task.start_date,
+            signup_span_days=task.signup_span_days,
+            multi_share=task.multi_share,
+            rng=rng,
+            first_account=task.first_account,
+        )
+        # One batch of integer / categorical columns is alive at a time
+        for table in iter_event_batches_numpy(org_arrays, weeks=task.weeks, rng=rng):
+            writer.append_columns(table)
+            for name in stats.counts:
+                stats.counts[name] += int(np.count_nonzero(table["event_name"] == name))
+        stats.multi = int(org_arrays.is_multi.sum())
+    else:
+        random.seed(seed)
+        orgs = build_orgs(
+            n_accounts=task.n_accounts,
+            start_date=task.start_date,
+            signup_span_days=task.signup_span_days,
+            multi_share=task.multi_share,
+            first_account=task.first_account,
+        )
+        for row in emit_events(orgs, weeks=task.weeks):
+            writer.append(row)
+            stats.counts[row[2]] += 1
+        stats.multi = sum(1 for o in orgs if o.is_multi)
+    return stats
+
+
+def run_shard(task: ShardTask) -> ShardStats:
+    """Process-pool entry point: write one shard to its own file (task.out)."""
+    with open_writer(Path(task.out), task.fmt, task.chunk_rows, task.partition_by_date,
+                     part_name=f"part-{task.shard:05d}") as writer:
+        return write_shard(task, writer)
+
+
+# ----------------------------
+# CLI
+# ----------------------------
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(
         description="Generate mock events for Escaly Activity 1.2 (Retention Cohorts: Team Adoption)."
@@ -202,46 +500,85 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--signup-span-days", type=int, default=21, help="Uniform spread (days) for signup window.")
     p.add_argument("--multi-share", type=float, default=0.45, help="Share of organizations that are multi-user.")
     p.add_argument("--seed", type=int, default=7, help="Random seed for reproducibility.")
-    p.add_argument("--out", type=str, default="case-studies/escaly-retention-cohorts/data/events.csv", help="Output CSV path.")
+    p.add_argument("--out", type=str, default="case-studies/escaly-retention-cohorts/data/events.csv",
+                   help="Output path (file, or directory with --partition-by-date).")
+    p.add_argument("--engine", choices=["python", "numpy"], default="python",
+                   help="Event engine: per-event Python loop (default) or batched NumPy arrays for large runs.")
+    p.add_argument("--format", choices=FORMATS, default=None,
+                   help="Output format (default: inferred from --out suffix, else csv).")
+    p.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                   help="Rows buffered before each flush (CSV block / Parquet row group).")
+    p.add_argument("--partition-by-date", action="store_true",
+                   help="Write one file per event date under --out (event_date=YYYY-MM-DD/).")
+    p.add_argument("--workers", type=int, default=1, help="Processes generating shards in parallel.")
+    p.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                   help="Accounts per shard (fixes the output; independent of --workers).")
+    p.add_argument("--shard-files", action="store_true",
+                   help="Keep one file per shard under --out (part-NNNNN.*) instead of merging.")
     return p.parse_args()
 
 
 def main():
     args = parse_args()
-    random.seed(args.seed)
+    if args.engine == "numpy" and np is None:
+        raise SystemExit("--engine numpy requires numpy (pip install numpy).")
 
     start_date = date.fromisoformat(args.start_date)
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
-
-    orgs = build_orgs(
-        n_accounts=args.accounts,
-        start_date=start_date,
-        signup_span_days=args.signup_span_days,
-        multi_share=args.multi_share,
-    )
-
-    rows = emit_events(orgs, weeks=args.weeks)
-
-    # Write CSV
-    with out.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(
-            f,
-            fieldnames=["account_id", "user_id", "event_name", "event_ts", "report_id", "assessment_id", "scale_id"]
-        )
-        w.writeheader()
-        w.writerows(rows)
+    fmt = resolve_format(out, args.format)
+
+    tasks = [
+        ShardTask(shard=k, first_account=lo + 1, n_accounts=hi - lo, seed=args.seed, weeks=args.weeks,
+                  start_date=start_date, signup_span_days=args.signup_span_days,
+                  multi_share=args.multi_share, engine=args.engine, chunk_rows=args.chunk_rows)
+        for k, lo, hi in shard_ranges(args.accounts, args.shard_size)
+    ]
+    stats = ShardStats()
+    n_rows = 0
+
+    if args.shard_files or args.partition_by_date:
+        # One file per shard (per date partition): no merge step needed
+        for t in tasks:
+            t.fmt = fmt
+            t.partition_by_date = args.partition_by_date
+            t.out = str(out if args.partition_by_date else out / f"part-{t.shard:05d}.{fmt}")
+        for s in map_shards(run_shard, tasks, args.workers):
+            stats.add(s)
+        n_rows = sum(stats.counts.values())
+    elif args.workers <= 1 or len(tasks) <= 1:
+        with open_writer(out, fmt, args.chunk_rows, False) as writer:
+            for t in tasks:
+                stats.add(write_shard(t, writer))
+        n_rows = writer.rows_written
+    else:
+        # Workers spill CSV shards; merge them in shard order into the final file
+        with tempfile.TemporaryDirectory(prefix="shards_", dir=out.parent) as tmp:
+            for t in tasks:
+                t.fmt = "csv"
+                t.out = str(Path(tmp) / f"part-{t.shard:05d}.csv")
+            for s in map_shards(run_shard, tasks, args.workers):
+                stats.add(s)
+            parts = [Path(t.out) for t in tasks]
+            if fmt == "csv":
+                with out.open("wb") as f:
+                    f.write((",".join(FIELDNAMES) + "\r\n").encode())
+                    for p in parts:
+                        with p.open("rb") as src:
+                            src.readline()  # shard header
+                            shutil.copyfileobj(src, f)
+            else:
+                with open_writer(out, fmt, args.chunk_rows, False, compact=False) as writer:
+                    for row in concat_rows(parts):
+                        writer.write(dict(zip(FIELDNAMES, row)))
+        n_rows = sum(stats.counts.values())
 
     # Small console summary
-    n_signup = sum(1 for r in rows if r["event_name"] == "signup_completed")
-    n_submit = sum(1 for r in rows if r["event_name"] == "submit_assessment")
-    n_report = sum(1 for r in rows if r["event_name"] == "generate_report")
-    multi = sum(1 for o in orgs if o.is_multi)
-    single = len(orgs) - multi
-
-    print(f"✅ Wrote {len(rows):,} events to {out}")
-    print(f"   Orgs: {len(orgs)}  (multi: {multi}, single: {single})")
-    print(f"   signup_completed: {n_signup:,} | submit_assessment: {n_submit:,} | generate_report: {n_report:,}")
+    single = stats.n_orgs - stats.multi
+
+    print(f"✅ Wrote {n_rows:,} events to {out}")
+    print(f"   Orgs: {stats.n_orgs}  (multi: {stats.multi}, single: {single})")
+    print(f"   signup_completed: {stats.counts['signup_completed']:,} | submit_assessment: {stats.counts['submit_assessment']:,} | generate_report: {stats.counts['generate_report']:,}")
 
 
 if __name__ == "__main__":
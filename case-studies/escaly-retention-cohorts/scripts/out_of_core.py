@@ -0,0 +1,108 @@
+"""
+out_of_core.py
+
+Out-of-core input for the Escaly retention pipeline (run_retention_experiment.py --parquet-log):
+a partitioned Parquet event log that can be much larger than memory.
+
+  - DuckDB runs under a fixed budget (memory_limit). Hash aggregates, DISTINCTs and sorts
+    spill to temp_directory, and preserve_insertion_order=false lets large
+    CREATE TABLE AS statements stream instead of buffering rows to keep their order.
+  - The log is never loaded. Each partition (a directory of Parquet files such as
+    event_date=2025-05-05/, or a single file such as events-2025-05.parquet) is reduced to
+    partial aggregates: its distinct user-weeks and first signup per account
+    (sql/external/01_partition_partials.sql).
+  - Partials are stored per partition with a file count + size + mtime fingerprint in
+    partition_log. With --db, later runs only reduce new or changed partitions and drop
+    the partials of partitions that disappeared.
+  - sql/external/02_merge_partials.sql merges them into user_weekly and signup_events
+    (DISTINCT user-weeks across partition boundaries, MIN signup); sql/02..06 then build
+    org_weekly_active -> retention_matrix exactly as from events.csv.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pathlib
+import time
+from typing import Dict, List, Optional, Tuple
+
+SQL_DIR = pathlib.Path("case-studies/escaly-retention-cohorts/sql/external")
+
+
+def apply_memory_budget(con, memory_limit: Optional[str] = None, temp_dir: Optional[str] = None) -> None:
+    """Cap DuckDB's memory and let large operators spill to temp_dir (None = DuckDB defaults)."""
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+    if temp_dir:
+        pathlib.Path(temp_dir).mkdir(parents=True, exist_ok=True)
+        con.execute(f"SET temp_directory = '{pathlib.Path(temp_dir).as_posix()}'")
+    if memory_limit or temp_dir:
+        con.execute("SET preserve_insertion_order = false")
+
+
+def events_glob(log: pathlib.Path) -> str:
+    """read_parquet() pattern covering the whole log (a single file or a directory tree)."""
+    return log.as_posix() if log.is_file() else f"{log.as_posix()}/**/*.parquet"
+
+
+def list_partitions(log: pathlib.Path) -> Dict[str, List[pathlib.Path]]:
+    """
+    {partition: files}: files directly under `log` are one partition each, files in
+    subdirectories are grouped by directory (e.g. event_date=YYYY-MM-DD/).
+    """
+    if log.is_file():
+        return {log.name: [log]}
+    parts: Dict[str, List[pathlib.Path]] = {}
+    for f in sorted(log.rglob("*.parquet")):
+        key = f.relative_to(log) if f.parent == log else f.parent.relative_to(log)
+        parts.setdefault(key.as_posix(), []).append(f)
+    if not parts:
+        raise SystemExit(f"No Parquet files under {log}.")
+    return parts
+
+
+def partition_fingerprint(files: List[pathlib.Path]) -> Tuple[int, int, int]:
+    stats = [f.stat() for f in files]
+    return len(files), sum(s.st_size for s in stats), max(s.st_mtime_ns for s in stats)
+
+
+def refresh_partials(con, log: pathlib.Path, force: bool = False) -> Tuple[int, int, int]:
+    """
+    Reduce new or changed partitions of `log` to partials (all of them with force) and drop
+    the partials of vanished partitions; returns (reduced, unchanged, dropped).
+    """
+    con.execute((SQL_DIR / "01_init_partials.sql").read_text())
+    partitions = list_partitions(log)
+    known = {row[0]: tuple(row[1:]) for row in
+             con.execute("SELECT part, n_files, size_bytes, mtime_ns FROM partition_log").fetchall()}
+    reduce_sql = (SQL_DIR / "01_partition_partials.sql").read_text()
+
+    reduced = 0
+    for part, files in partitions.items():
+        fp = partition_fingerprint(files)
+        if not force and known.get(part) == fp:
+            continue
+        t0 = time.perf_counter()
+        con.begin()
+        con.execute("SET VARIABLE part = ?", [part])
+        con.execute("SET VARIABLE part_files = ?", [[f.as_posix() for f in files]])
+        con.execute(reduce_sql)
+        con.execute("INSERT OR REPLACE INTO partition_log VALUES (?, ?, ?, ?, now()::TIMESTAMP)", [part, *fp])
+        con.commit()
+        reduced += 1
+        print(f"   ⚙️ Reduced partition {part} ({fp[0]} files, {fp[1] / 2**20:,.1f} MB) "
+              f"in {time.perf_counter() - t0:.2f}s")
+
+    dropped = [p for p in known if p not in partitions]
+    if dropped:
+        con.begin()
+        for table in ("part_user_weekly", "part_signups", "partition_log"):
+            con.execute(f"DELETE FROM {table} WHERE part IN (SELECT UNNEST(?))", [dropped])
+        con.commit()
+    return reduced, len(partitions) - reduced, len(dropped)
+
+
+def partials_fingerprint(con) -> str:
+    """Hash of partition_log: changes whenever any partition's partials are rebuilt or dropped."""
+    rows = con.execute("SELECT part, n_files, size_bytes, mtime_ns FROM partition_log ORDER BY part").fetchall()
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
@@ -0,0 +1,306 @@
+"""
+retention_matrix.py
+
+Parameterized retention matrix builder for the Escaly retention pipeline.
+
+Builds, in DuckDB and in one pass over the activity table:
+  - <name>_long:    one row per segment (and cohort) x period_n with orgs_active,
+                    cohort_size and retention_pct (cohort-size denominator).
+  - <name>:         the wide matrix, pivoted with DuckDB PIVOT (w0.., d0.., m0.. columns).
+  - <name>_summary: retention per segment and period weighted by cohort size
+                    (SUM(orgs_active) / SUM(cohort_size) across signup cohorts).
+
+bootstrap_matrix() adds Poisson-bootstrap intervals for both (<name>_ci and
+<name>_summary_ci, see case-studies/scripts/bootstrap.py). Accounts are resampled
+through their activity patterns: DuckDB groups accounts by segment, cohort and the set
+of reported periods they were active in, so the resampling cost does not grow with the
+number of accounts.
+
+Any horizon, granularity (day / week / month) and segmentation column keyed by
+account_id works without editing SQL, e.g. 52-week or 30-day retention.
+Expects the views/tables from sql/00_setup*.sql (or sql/external/) and sql/01..03 (signup_events,
+qualifying_events, org_weekly_active, team_segment).
+
+With approx=True the counts are HyperLogLog estimates merged from the sketches of
+sql/approx/05_retention_counts.sql (cohort_week_hll), which only cover weekly team_seg
+cohorts and weeks 0..APPROX_HORIZON (see check_approx).
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from typing import Optional, Sequence
+
+GRANULARITIES = {"day": "d", "week": "w", "month": "m"}
+DEFAULT_SEGMENT = "team_segment.team_seg"
+APPROX_HORIZON = 12  # cohort_week_hll is built from retention_long (weeks 0..12)
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@dataclass(frozen=True)
+class MatrixSpec:
+    """
+    What to build:
+      - horizon: last period_n reported (periods 0..horizon after the signup period).
+      - granularity: "day" | "week" | "month" (cohorts and activity are truncated to it).
+      - segment: "<table>.<column>" holding one segment label per account_id.
+      - periods: matrix columns to report (default: every period 0..horizon).
+      - by_cohort: one matrix row per segment *and* signup cohort instead of per segment.
+    """
+
+    horizon: int = 12
+    granularity: str = "week"
+    segment: str = DEFAULT_SEGMENT
+    periods: Optional[Sequence[int]] = None
+    by_cohort: bool = False
+
+    def __post_init__(self):
+        if self.granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity {self.granularity!r}; expected one of {sorted(GRANULARITIES)}.")
+        if self.horizon < 0:
+            raise ValueError("horizon must be >= 0.")
+        parts = self.segment.split(".")
+        if len(parts) != 2 or not all(_IDENT.match(p) for p in parts):
+            raise ValueError(f"segment must look like <table>.<column>, got {self.segment!r}.")
+        bad = [p for p in self.report_periods if not 0 <= p <= self.horizon]
+        if bad:
+            raise ValueError(f"periods {bad} fall outside the horizon 0..{self.horizon}.")
+
+    @property
+    def prefix(self) -> str:
+        return GRANULARITIES[self.granularity]
+
+    @property
+    def segment_table(self) -> str:
+        return self.segment.split(".")[0]
+
+    @property
+    def segment_col(self) -> str:
+        return self.segment.split(".")[1]
+
+    @property
+    def report_periods(self) -> list:
+        return sorted(set(self.periods)) if self.periods is not None else list(range(self.horizon + 1))
+
+    def label(self, period_n: int) -> str:
+        return f"{self.prefix}{period_n}"
+
+
+def _activity_sql(spec: MatrixSpec) -> str:
+    # Weekly activity is already materialized (and kept fresh by incremental runs)
+    if spec.granularity == "week":
+        return "SELECT account_id, week_start_at AS period_start FROM org_weekly_active WHERE is_active"
+    return (f"SELECT DISTINCT account_id, date_trunc('{spec.granularity}', event_ts) AS period_start "
+            f"FROM qualifying_events")
+
+
+def _cohort_sql(spec: MatrixSpec) -> str:
+    return (f"SELECT s.account_id, date_trunc('{spec.granularity}', s.signup_completed_at) AS cohort_start, "
+            f"t.{spec.segment_col} FROM signup_events s JOIN {spec.segment_table} t USING (account_id)")
+
+
+def long_sql(spec: MatrixSpec) -> str:
+    """SELECT producing the dense long matrix (segments [x cohorts] x report periods)."""
+    g, seg = spec.granularity, spec.segment_col
+    cohort_key = ", cohort_start" if spec.by_cohort else ""
+    c_cohort = ", c.cohort_start" if spec.by_cohort else ""
+    s_cohort = ", s.cohort_start" if spec.by_cohort else ""
+    periods = ", ".join(str(p) for p in spec.report_periods)
+    return f"""
+WITH cohort AS ({_cohort_sql(spec)}),
+sizes AS (
+  SELECT {seg}{cohort_key}, COUNT(*) AS cohort_size
+  FROM cohort
+  GROUP BY ALL
+),
+active AS (
+  SELECT c.{seg}{c_cohort},
+         date_diff('{g}', c.cohort_start, a.period_start) AS period_n,
+         COUNT(DISTINCT a.account_id) AS orgs_active
+  FROM ({_activity_sql(spec)}) a
+  JOIN cohort c USING (account_id)
+  WHERE date_diff('{g}', c.cohort_start, a.period_start) IN ({periods})
+  GROUP BY ALL
+)
+SELECT
+  s.{seg}{s_cohort},
+  s.cohort_size,
+  p.period_n,
+  '{spec.prefix}' || p.period_n AS period_label,
+  COALESCE(a.orgs_active, 0) AS orgs_active,
+  ROUND(100.0 * COALESCE(a.orgs_active, 0) / s.cohort_size, 1) AS retention_pct
+FROM sizes s
+CROSS JOIN (SELECT UNNEST([{periods}]) AS period_n) p
+LEFT JOIN active a USING ({seg}{cohort_key}, period_n)
+"""
+
+
+def approx_long_sql(spec: MatrixSpec) -> str:
+    """long_sql() from the cohort_week_hll sketches: the cohort size is the week-0 estimate."""
+    check_approx(spec)
+    cohort_key = ", cohort_start" if spec.by_cohort else ""
+    s_cohort = ", s.cohort_start" if spec.by_cohort else ""
+    w_cohort = ", signup_week AS cohort_start" if spec.by_cohort else ""
+    periods = ", ".join(str(p) for p in spec.report_periods)
+    return f"""
+WITH cells AS (
+  SELECT team_seg{w_cohort}, week_n AS period_n,
+         hll_estimate(hll_merge(accounts_hll)) AS n_accounts,
+         hll_estimate(hll_merge(active_hll)) AS orgs_active
+  FROM cohort_week_hll
+  WHERE week_n IN (0, {periods})
+  GROUP BY ALL
+),
+sizes AS (
+  SELECT team_seg{cohort_key}, n_accounts AS cohort_size
+  FROM cells
+  WHERE period_n = 0
+)
+SELECT
+  s.team_seg{s_cohort},
+  s.cohort_size,
+  p.period_n,
+  '{spec.prefix}' || p.period_n AS period_label,
+  COALESCE(c.orgs_active, 0) AS orgs_active,
+  ROUND(100.0 * COALESCE(c.orgs_active, 0) / s.cohort_size, 1) AS retention_pct
+FROM sizes s
+CROSS JOIN (SELECT UNNEST([{periods}]) AS period_n) p
+LEFT JOIN cells c USING (team_seg{cohort_key}, period_n)
+"""
+
+
+def check_approx(spec: MatrixSpec) -> None:
+    """Raise ValueError when spec needs counts the approximate sketches do not keep."""
+    if (spec.granularity, spec.segment) != ("week", DEFAULT_SEGMENT) or spec.horizon > APPROX_HORIZON:
+        raise ValueError(f"Approximate counts are kept per signup week and {DEFAULT_SEGMENT} for weeks "
+                         f"0..{APPROX_HORIZON}; use the exact build for other granularities, segments or horizons.")
+
+
+def pattern_sql(spec: MatrixSpec) -> str:
+    """
+    SELECT counting accounts per segment, cohort and activity pattern: `hits` holds one
+    boolean per report period (active or not). Ordered by segment, then cohort.
+    """
+    g, seg = spec.granularity, spec.segment_col
+    periods = ", ".join(str(p) for p in spec.report_periods)
+    return f"""
+WITH cohort AS ({_cohort_sql(spec)}),
+active AS (
+  SELECT DISTINCT a.account_id, date_diff('{g}', c.cohort_start, a.period_start) AS period_n
+  FROM ({_activity_sql(spec)}) a
+  JOIN cohort c USING (account_id)
+  WHERE date_diff('{g}', c.cohort_start, a.period_start) IN ({periods})
+),
+patterns AS (
+  SELECT c.account_id, c.{seg}, c.cohort_start,
+         COALESCE(list(a.period_n) FILTER (WHERE a.period_n IS NOT NULL), []) AS active_periods
+  FROM cohort c
+  LEFT JOIN active a USING (account_id)
+  GROUP BY ALL
+)
+SELECT
+  {seg},
+  cohort_start,
+  list_transform([{periods}], p -> list_contains(active_periods, p)) AS hits,
+  COUNT(*) AS n_accounts
+FROM patterns
+GROUP BY ALL
+ORDER BY {seg}, cohort_start
+"""
+
+
+def build_matrix(con, spec: MatrixSpec = MatrixSpec(), name: str = "cohort_matrix", approx: bool = False) -> str:
+    """Create <name>_long, <name> (wide) and <name>_summary in `con`; returns `name`."""
+    if not _IDENT.match(name):
+        raise ValueError(f"Invalid table name {name!r}.")
+    seg = spec.segment_col
+    group_cols = f"{seg}, cohort_start, cohort_size" if spec.by_cohort else f"{seg}, cohort_size"
+    labels = ", ".join(f"'{spec.label(p)}'" for p in spec.report_periods)
+
+    con.execute(f"CREATE OR REPLACE TABLE {name}_long AS {approx_long_sql(spec) if approx else long_sql(spec)}")
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {name} AS
+        SELECT * FROM (
+          PIVOT (SELECT {group_cols}, period_label, retention_pct FROM {name}_long)
+          ON period_label IN ({labels})
+          USING first(retention_pct)
+          GROUP BY {group_cols}
+        )
+        ORDER BY {group_cols}
+    """)
+    # Cohort-size-weighted retention across signup cohorts, per segment and period. Estimates
+    # do not add up across cohorts, so the approximate summary merges the cohorts' sketches.
+    source = f"{name}_long"
+    if approx and spec.by_cohort:
+        source = f"({approx_long_sql(replace(spec, by_cohort=False))})"
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {name}_summary AS
+        SELECT
+          {seg},
+          period_n,
+          period_label,
+          SUM(cohort_size) AS cohort_size,
+          ROUND(100.0 * SUM(orgs_active) / SUM(cohort_size), 1) AS retention_pct
+        FROM {source}
+        GROUP BY ALL
+        ORDER BY {seg}, period_n
+    """)
+    return name
+
+
+def summary_wide(con, spec: MatrixSpec, name: str = "cohort_matrix", periods: Optional[Sequence[int]] = None):
+    """Weighted summary pivoted to one row per segment (e.g. the README table); returns a DataFrame."""
+    periods = [p for p in (periods or spec.report_periods) if p in spec.report_periods]
+    labels = ", ".join(f"'{spec.label(p)}'" for p in periods)
+    return con.execute(f"""
+        SELECT * FROM (
+          PIVOT (SELECT {spec.segment_col}, period_label, retention_pct FROM {name}_summary)
+          ON period_label IN ({labels})
+          USING first(retention_pct)
+          GROUP BY {spec.segment_col}
+        )
+        ORDER BY 1
+    """).fetchdf()
+
+
+def bootstrap_matrix(con, spec: MatrixSpec = MatrixSpec(), name: str = "cohort_matrix",
+                     n_resamples: int = 2000, level: float = 95.0, seed: int = 42, workers: int = 1) -> str:
+    """
+    Create <name>_ci (one row per matrix cell) and <name>_summary_ci (per segment, pooled
+    across cohorts) with retention_pct and its bootstrap interval ci_low..ci_high; returns `name`.
+    """
+    if not _IDENT.match(name):
+        raise ValueError(f"Invalid table name {name!r}.")
+    import numpy as np
+    import pandas as pd
+    from bootstrap import ratio_ci
+
+    seg = spec.segment_col
+    patterns = con.execute(pattern_sql(spec)).fetchdf()
+    hits = np.array(patterns["hits"].tolist(), dtype=np.float64).reshape(len(patterns), -1)
+    counts = patterns["n_accounts"].to_numpy()
+    periods = spec.report_periods
+
+    def interval_table(keys):
+        groups = patterns.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+        point, low, high = ratio_ci(groups, counts, hits, n_resamples=n_resamples, level=level,
+                                    seed=seed, workers=workers)
+        sizes = patterns.groupby(keys, sort=False, dropna=False)["n_accounts"].sum()
+        return pd.DataFrame([
+            {**dict(zip(keys, key if isinstance(key, tuple) else (key,))),
+             "cohort_size": int(size), "period_n": p, "period_label": spec.label(p),
+             "retention_pct": round(100 * point[g, j], 1),
+             "ci_low": round(100 * low[g, j], 1), "ci_high": round(100 * high[g, j], 1)}
+            for g, (key, size) in enumerate(sizes.items()) for j, p in enumerate(periods)
+        ])
+
+    cells = interval_table([seg, "cohort_start"] if spec.by_cohort else [seg])
+    summary = cells if not spec.by_cohort else interval_table([seg])
+    con.register("_cells_ci", cells)
+    con.register("_summary_ci", summary)
+    con.execute(f"CREATE OR REPLACE TABLE {name}_ci AS SELECT * FROM _cells_ci")
+    con.execute(f"CREATE OR REPLACE TABLE {name}_summary_ci AS SELECT * FROM _summary_ci")
+    con.unregister("_cells_ci")
+    con.unregister("_summary_ci")
+    return name
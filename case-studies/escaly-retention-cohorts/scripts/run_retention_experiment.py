@@ -1,9 +1,77 @@
+import argparse
 import duckdb, pathlib
 import os
-import pandas as pd
+import sys
+import time
 
-# Create a single connection
-con = duckdb.connect()
+from out_of_core import apply_memory_budget, events_glob, partials_fingerprint, refresh_partials
+from retention_matrix import (DEFAULT_SEGMENT, GRANULARITIES, MatrixSpec, bootstrap_matrix, build_matrix,
+                              check_approx, summary_wide)
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "scripts"))
+from sql_dag import STATE_TABLE, inline_literals, plan, run_dag  # noqa: E402
+
+SQL_DIR = pathlib.Path('case-studies/escaly-retention-cohorts/sql')
+EVENTS_CSV = pathlib.Path('case-studies/escaly-retention-cohorts/data/events.csv')
+EVENTS_PARQUET = pathlib.Path('case-studies/escaly-retention-cohorts/data/events_parquet')
+
+# Where `events` lives: a DuckDB table (default) or typed Parquet partitioned by signup week
+SETUP_STAGE = {
+    "table": "00_setup.sql",
+    "parquet": "00_setup_parquet.sql",
+}
+APPEND_STAGE = {
+    "table": "incremental/02_append_events.sql",
+    "parquet": "incremental/02_append_events_parquet.sql",
+}
+
+# Full rebuild: every table is recreated from events.csv (CREATE OR REPLACE). The stages run
+# through case-studies/scripts/sql_dag.py, which orders them by the tables they create and read,
+# runs independent ones concurrently and, with --db, skips those whose inputs are unchanged.
+# retention_matrix itself is built by retention_matrix.py for the requested --horizon/--granularity.
+FULL_STAGES = [
+    "01_user_weekly_activity.sql",    # user_weekly
+    "02_org_weekly_active.sql",       # org_weekly_active
+    "03_team_segment_w4.sql",         # cohorts, team_size_w4, team_segment
+    "04_retention_long.sql",          # retention_long
+    "05_retention_matrix.sql",        # cohort_sizes, retention_counts
+]
+
+# Approximate-distinct mode (--approx-distinct): HyperLogLog sketches per account-week and
+# cohort-week replace the exact COUNT(DISTINCT ...) stages; rollups merge sketches.
+# The stages require case-studies/scripts/hll_macros.sql.
+APPROX_STAGES = [
+    "approx/01_account_week_hll.sql",  # account_week_hll (instead of user_weekly)
+    "approx/02_org_weekly_active.sql", # org_weekly_active
+    "approx/03_team_segment_w4.sql",   # cohorts, team_size_w4, team_segment
+    "04_retention_long.sql",           # retention_long
+    "approx/05_retention_counts.sql",  # cohort_week_hll, retention_rollup, retention_counts, cohort_sizes
+    "approx/07_error_report.sql",      # approx_error_report (exact vs approximate on a sample)
+]
+APPROX_TABLES = ["account_week_hll", "cohort_week_hll", "retention_rollup", "approx_error_report"]
+
+# Out-of-core build from a partitioned Parquet log (--parquet-log, see out_of_core.py): each
+# partition is reduced to partials (user-weeks, first signups), which replace stage 01.
+EXTERNAL_STAGES = [
+    "external/00_setup.sql",          # events, qualifying_events (views over the log)
+    "external/02_merge_partials.sql", # account_signups, signup_events, user_weekly
+] + FULL_STAGES[1:]
+
+# Incremental refresh: only events newer than pipeline_state.high_water_ts are read,
+# and only the account-weeks / accounts / matrix cells they touch are recomputed.
+INCREMENTAL_STAGES = [
+    "incremental/03_upsert_weekly.sql",
+    "incremental/04_refresh_accounts.sql",
+    "incremental/05_refresh_matrix.sql",
+]
+
+# Exported matrix: columns of the classic 12-week report and README headline periods per granularity
+REPORT_WEEKS = [0, 1, 2, 3, 4, 6, 8, 12]
+HEADLINE_PERIODS = {
+    "week": [1, 4, 8, 12],
+    "day": [1, 7, 14, 30],
+    "month": [1, 3, 6, 12],
+}
 
 # Print a specific table
 def print_table(connection, table_name, sort_by=None, ascending=True):
@@ -17,96 +85,309 @@ def print_table(connection, table_name, sort_by=None, ascending=True):
     except Exception as e:
         print(f"Error retrieving table {table_name}: {e}")
 
-# Run setup script
-setup_sql = pathlib.Path('case-studies/escaly-retention-cohorts/sql/00_setup.sql').read_text()
-con.execute(setup_sql)
-
-# Run weekly activity aggregation script
-weekly_activity_sql = pathlib.Path('case-studies/escaly-retention-cohorts/sql/01_user_weekly_activity.sql').read_text()
-con.execute(weekly_activity_sql)
-
-# Run organization-level weekly activity script
-org_weekly_active_sql = pathlib.Path('case-studies/escaly-retention-cohorts/sql/02_org_weekly_active.sql').read_text()
-con.execute(org_weekly_active_sql)
-
-# Run segmentation script
-segmentation_sql = pathlib.Path('case-studies/escaly-retention-cohorts/sql/03_team_segment_w4.sql').read_text()
-con.execute(segmentation_sql)
-
-# Run longitudinal retention script
-longitudinal_retention_sql = pathlib.Path('case-studies/escaly-retention-cohorts/sql/04_retention_long.sql').read_text()
-con.execute(longitudinal_retention_sql)
-
-# Run retention matrix script
-retention_matrix_sql = pathlib.Path('case-studies/escaly-retention-cohorts/sql/05_retention_matrix.sql').read_text()
-con.execute(retention_matrix_sql)
-print_table(con, "retention_matrix")  # Retention matrix table
-
-# 1) Create figs dir and export the raw retention matrix as CSV
-figs_dir = pathlib.Path("case-studies/escaly-retention-cohorts/figs")
-figs_dir.mkdir(parents=True, exist_ok=True)
-
-retention_matrix_df = con.execute("SELECT * FROM retention_matrix").fetchdf()
-retention_matrix_csv = figs_dir / "retention_matrix.csv"
-retention_matrix_df.to_csv(retention_matrix_csv, index=False)
-print(f"💾 Wrote CSV: {retention_matrix_csv}")
-
-# 2) Build a README-friendly summary table (weighted by cohort_size)
-# Expected columns in retention_matrix: signup_week, team_seg, cohort_size, w0, w1, w2, w3, w4, w6, w8, w12
-week_cols = [c for c in ["w1", "w4", "w8", "w12"] if c in retention_matrix_df.columns]
-if not week_cols:
-    print("⚠️ No week columns (w1/w4/w8/w12) found in retention_matrix; skipping README table/plot.")
-else:
-    def weighted_avg(group, col):
-        return (group[col] * group["cohort_size"]).sum() / group["cohort_size"].sum()
-
-    summary_rows = []
-    for seg, g in retention_matrix_df.groupby("team_seg"):
-        row = {"team_seg": seg}
-        for col in week_cols:
-            row[col] = round(weighted_avg(g, col), 1)
-        summary_rows.append(row)
-
-    summary_df = pd.DataFrame(summary_rows)
-    # Print as Markdown for easy copy-paste into README
-    print("=== README Table — Weighted Retention by Team Segment (paste into README) ===")
+def run_sql(connection, stage, literals=None):
+    connection.execute(inline_literals((SQL_DIR / stage).read_text(), literals))
+
+def events_parquet_dir(db=None):
+    """Parquet directory of --storage parquet: <db stem>_events_parquet next to --db, so databases never share files."""
+    if not db:
+        return EVENTS_PARQUET
+    db = pathlib.Path(db)
+    return db.with_name(f"{db.stem}_events_parquet")
+
+def has_table(connection, table_name):
+    return connection.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ? AND NOT temporary", [table_name]
+    ).fetchone()[0] > 0
+
+def source_fingerprint():
+    st = os.stat(EVENTS_CSV)
+    return str(EVENTS_CSV), st.st_size, st.st_mtime_ns
+
+def record_source(connection, storage):
+    """Remember which events.csv version (and storage) the database was built from."""
+    path, size, mtime_ns = source_fingerprint()
+    connection.execute(
+        "CREATE OR REPLACE TABLE source_manifest AS "
+        "SELECT ?::VARCHAR AS path, ?::BIGINT AS size_bytes, ?::BIGINT AS mtime_ns, ?::VARCHAR AS storage",
+        [path, size, mtime_ns, storage],
+    )
+
+def stored_manifest(connection):
+    if not has_table(connection, "source_manifest"):
+        return None
+    return connection.execute("SELECT path, size_bytes, mtime_ns, storage FROM source_manifest").fetchone()
+
+def build_full(connection, storage="table", approx=False, force=False, variables=None, jobs=1, literals=None):
+    if approx:
+        # Sketch-based build; keeps no user_weekly or incremental state (the next --incremental run rebuilds exactly)
+        connection.execute("DROP TABLE IF EXISTS user_weekly; DROP TABLE IF EXISTS pipeline_state")
+        stages = APPROX_STAGES
+    else:
+        for table in APPROX_TABLES:
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        stages = FULL_STAGES
+    runs = run_dag(connection, [SQL_DIR / s for s in [SETUP_STAGE[storage]] + stages],
+                   jobs=jobs, force=force, variables=variables, literals=literals)
+    n_cached = sum(r.status == "cached" for r in runs)
+    if n_cached:
+        print(f"♻️ {n_cached} of {len(runs)} stages unchanged since the last build; skipped.")
+    if not approx:
+        # Record the high-water mark so later runs can be incremental
+        run_sql(connection, "incremental/00_init_state.sql")
+    record_source(connection, storage)
+
+def build_external(connection, log, force=False, jobs=1):
+    for table in APPROX_TABLES + ["pipeline_state", "source_manifest"]:
+        # Not an events.csv build: --incremental must not reuse this database
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+    t0 = time.perf_counter()
+    reduced, unchanged, dropped = refresh_partials(connection, log, force=force)
+    print(f"🧩 Partials of {log}: {reduced} partitions reduced, {unchanged} unchanged, {dropped} dropped "
+          f"({time.perf_counter() - t0:.2f}s).")
+    runs = run_dag(connection, [SQL_DIR / s for s in EXTERNAL_STAGES], jobs=jobs, force=force,
+                   literals={"events_glob": events_glob(log.resolve())},
+                   inputs={t: partials_fingerprint(connection) for t in ("part_user_weekly", "part_signups")})
+    n_cached = sum(r.status == "cached" for r in runs)
+    if n_cached:
+        print(f"♻️ {n_cached} of {len(runs)} stages unchanged since the last build; skipped.")
+
+def build_incremental(connection, storage="table", literals=None):
+    manifest = stored_manifest(connection)
+    if not has_table(connection, "pipeline_state") or manifest is None:
+        print("ℹ️ No incremental state in this database yet; running a full rebuild.")
+        build_full(connection, storage, literals=literals)
+        return
+    storage = manifest[3]  # keep appending to whatever backs `events` in this database
+    hwm = connection.execute("SELECT high_water_ts FROM pipeline_state").fetchone()[0]
+    for stage in ["incremental/01_stage_new_events.sql", APPEND_STAGE[storage]] + INCREMENTAL_STAGES:
+        run_sql(connection, stage, literals)
+    # The tables no longer match the stored stage fingerprints of the last full build
+    if has_table(connection, STATE_TABLE):
+        connection.execute(f"DELETE FROM {STATE_TABLE}")
+    record_source(connection, storage)
+    n_new = connection.execute("SELECT COUNT(*) FROM new_events").fetchone()[0]
+    n_acc = connection.execute("SELECT COUNT(*) FROM affected_accounts").fetchone()[0]
+    print(f"🔁 Incremental refresh: {n_new:,} new events after {hwm}, {n_acc:,} accounts recomputed.")
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Run the Escaly retention cohorts pipeline and export results.")
+    p.add_argument("--db", type=str, default=None,
+                   help="Persistent DuckDB file (default: in-memory). Required for --incremental.")
+    p.add_argument("--storage", choices=sorted(SETUP_STAGE), default="table",
+                   help="Keep events as a DuckDB table or as typed Parquet partitioned by signup week "
+                        "(<db stem>_events_parquet next to --db; data/events_parquet in memory).")
+    p.add_argument("--incremental", action="store_true",
+                   help="Only ingest events newer than the stored high-water mark and update affected rows.")
+    p.add_argument("--parquet-log", type=str, default=None, metavar="PATH",
+                   help="Build from a partitioned Parquet event log (a file, or a directory with one "
+                        "file or directory per partition) out of core, instead of events.csv. "
+                        "With --db, later runs only reduce new or changed partitions.")
+    p.add_argument("--memory-limit", type=str, default=None,
+                   help="DuckDB memory budget, e.g. 12GB; larger joins, DISTINCTs and sorts spill to --temp-dir.")
+    p.add_argument("--temp-dir", type=str, default=None,
+                   help="Spill directory for --memory-limit (default: DuckDB's, next to --db).")
+    p.add_argument("--rebuild", action="store_true",
+                   help="Run every stage, even those whose SQL and inputs are unchanged since the last --db build.")
+    p.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1),
+                   help="SQL stages that do not depend on each other run concurrently.")
+    p.add_argument("--horizon", type=int, default=12,
+                   help="Last period reported in the exported matrix (periods 0..horizon after signup).")
+    p.add_argument("--granularity", choices=sorted(GRANULARITIES), default="week",
+                   help="Cohort/activity period for the exported matrix.")
+    p.add_argument("--segment", default=DEFAULT_SEGMENT,
+                   help="Segmentation column as <table>.<column>, one label per account_id.")
+    p.add_argument("--periods", type=lambda v: [int(x) for x in v.split(",")], default=None,
+                   help="Comma-separated matrix columns, e.g. 0,1,4,8,12 "
+                        "(default: 0,1,2,3,4,6,8,12 for 12 weeks, otherwise every period).")
+    p.add_argument("--by-cohort", action="store_true",
+                   help="One matrix row per segment and signup cohort instead of per segment.")
+    p.add_argument("--approx-distinct", action="store_true",
+                   help="Estimate active-user and retention counts from mergeable HyperLogLog sketches "
+                        "(about 1.6%% standard error) instead of exact COUNT(DISTINCT ...).")
+    p.add_argument("--approx-sample", type=float, default=10,
+                   help="Percent of accounts whose exact counts are compared with the estimates "
+                        "in --approx-distinct mode.")
+    p.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                   help="Add N Poisson-bootstrap resamples of accounts for confidence intervals on the "
+                        "matrix cells and the weighted summary (e.g. 2000; 0 = off).")
+    p.add_argument("--ci-level", type=float, default=95.0,
+                   help="Confidence level of the --bootstrap intervals, in percent.")
+    p.add_argument("--bootstrap-workers", type=int, default=os.cpu_count() or 1,
+                   help="Processes sharing the --bootstrap resamples (intervals do not depend on it).")
+    p.add_argument("--seed", type=int, default=42, help="Seed of the --bootstrap resamples.")
+    args = p.parse_args(argv)
+    if args.incremental and not args.db:
+        p.error("--incremental needs --db so state survives between runs.")
+    if args.parquet_log and (args.incremental or args.approx_distinct or args.storage != "table"):
+        p.error("--parquet-log refreshes changed partitions on every run and builds exact counts; "
+                "it cannot be combined with --incremental, --approx-distinct or --storage.")
+    if args.incremental and args.approx_distinct:
+        p.error("--approx-distinct always builds in full; it cannot be combined with --incremental.")
+    if args.bootstrap and args.approx_distinct:
+        p.error("--bootstrap resamples exact per-account activity; it cannot be combined with --approx-distinct.")
+    try:
+        args.spec = matrix_spec(args)
+        if args.approx_distinct:
+            check_approx(args.spec)
+    except ValueError as e:
+        p.error(str(e))
+    return args
+
+def pipeline_tables():
+    """Tables and views the pipeline stages create (candidates for --segment)."""
+    stages = {SETUP_STAGE[s] for s in SETUP_STAGE} | set(FULL_STAGES + APPROX_STAGES + EXTERNAL_STAGES)
+    return set().union(*(stage.creates for stage in plan([SQL_DIR / s for s in sorted(stages)])))
+
+def segment_columns(con, spec):
+    """Columns of the --segment table, or None when it does not exist (yet)."""
+    try:
+        return [r[0] for r in con.execute(f"DESCRIBE {spec.segment_table}").fetchall()]
+    except duckdb.CatalogException:
+        return None
+
+def check_segment(con, spec):
+    """Before building: the --segment table must be in the database or built by the pipeline."""
+    cols = segment_columns(con, spec)
+    if cols is None and spec.segment_table not in pipeline_tables():
+        raise SystemExit(f"--segment {spec.segment}: no table {spec.segment_table!r} in the database or "
+                         f"built by the pipeline (e.g. {DEFAULT_SEGMENT}).")
+    if cols is not None:
+        check_segment_column(con, spec)
+
+def check_segment_column(con, spec):
+    """Fail with a readable message when the --segment column is missing from its (built) table."""
+    cols = segment_columns(con, spec) or []
+    if spec.segment_col not in cols:
+        raise SystemExit(f"--segment {spec.segment}: {spec.segment_table} has no column {spec.segment_col!r}; "
+                         f"columns: {', '.join(cols)}.")
+
+def matrix_spec(args):
+    periods = args.periods
+    if periods is None and (args.horizon, args.granularity) == (12, "week"):
+        periods = REPORT_WEEKS
+    return MatrixSpec(horizon=args.horizon, granularity=args.granularity, segment=args.segment,
+                      periods=periods, by_cohort=args.by_cohort)
+
+def matrix_csv_name(spec, approx=False):
+    if spec == MatrixSpec(periods=REPORT_WEEKS) and not approx:
+        return "retention_matrix.csv"
+    parts = ["retention_matrix"]
+    if spec != MatrixSpec(periods=REPORT_WEEKS):
+        parts.append(f"{spec.granularity}{spec.horizon}")
+    if spec.segment != DEFAULT_SEGMENT:
+        parts.append(spec.segment_col)
+    if spec.by_cohort:
+        parts.append("by_cohort")
+    if approx:
+        parts.append("approx")
+    return "_".join(parts) + ".csv"
+
+def report(con, spec, approx=False):
+    # 1) Create figs dir, build the requested matrix in DuckDB and export it as CSV
+    figs_dir = pathlib.Path("case-studies/escaly-retention-cohorts/figs")
+    figs_dir.mkdir(parents=True, exist_ok=True)
+
+    build_matrix(con, spec, name="retention_matrix", approx=approx)
+    print_table(con, "retention_matrix")  # Retention matrix table
+    retention_matrix_csv = figs_dir / matrix_csv_name(spec, approx)
+    # Written by DuckDB: the matrix (e.g. --by-cohort over a long log) never goes through pandas
+    con.execute(f"COPY retention_matrix TO '{retention_matrix_csv.as_posix()}' (HEADER)")
+    print(f"💾 Wrote CSV: {retention_matrix_csv}")
+
+    # 2) README-friendly summary table (weighted by cohort_size, computed in SQL)
+    unit = spec.granularity.title()
+    headline = [p for p in HEADLINE_PERIODS[spec.granularity] if p in spec.report_periods] or spec.report_periods
+    summary_df = summary_wide(con, spec, name="retention_matrix", periods=headline)
+    seg_title = "Cohort Type" if spec.segment == DEFAULT_SEGMENT else spec.segment_col
+    print(f"=== README Table — Weighted Retention by {seg_title} (paste into README) ===")
     print(summary_df.rename(columns={
-        "team_seg": "Cohort Type",
-        "w1": "Week 1",
-        "w4": "Week 4",
-        "w8": "Week 8",
-        "w12": "Week 12"
+        spec.segment_col: seg_title,
+        **{spec.label(p): f"{unit} {p}" for p in headline},
     }).to_markdown(index=False))
     print("\n")
 
-    # 3) Plot retention curve (by team segment, using weighted points)
-    # Map available week columns to numeric x-axis
-    col_to_week = {"w0":0, "w1":1, "w2":2, "w3":3, "w4":4, "w6":6, "w8":8, "w12":12}
-    avail_weeks = sorted([col_to_week[c] for c in retention_matrix_df.columns if c in col_to_week])
-
-    # Compute weighted averages per week for each team segment
-    plot_rows = []
-    for seg, g in retention_matrix_df.groupby("team_seg"):
-        for col, wk in col_to_week.items():
-            if col in retention_matrix_df.columns:
-                val = weighted_avg(g, col)
-                plot_rows.append({"team_seg": seg, "week_n": wk, "retention_pct": val})
-    plot_df = pd.DataFrame(plot_rows)
-    plot_df = plot_df[plot_df["week_n"].isin(avail_weeks)].sort_values(["team_seg","week_n"])
+    # 3) Plot retention curve (by segment, using the weighted points)
+    plot_df = con.execute(
+        f"SELECT {spec.segment_col} AS segment, period_n, retention_pct FROM retention_matrix_summary ORDER BY 1, 2"
+    ).fetchdf()
 
     # Plot with matplotlib (no custom colors/styles)
     try:
         import matplotlib.pyplot as plt
         plt.figure()
-        for seg, seg_df in plot_df.groupby("team_seg"):
-            plt.plot(seg_df["week_n"], seg_df["retention_pct"], marker="o", label=seg)
-        plt.title("Escaly — 12-Week Retention by Team Segment")
-        plt.xlabel("Weeks Since Signup")
+        for seg, seg_df in plot_df.groupby("segment"):
+            plt.plot(seg_df["period_n"], seg_df["retention_pct"], marker="o", label=seg)
+        legend_title = "Team Segment" if spec.segment == DEFAULT_SEGMENT else spec.segment_col
+        plt.title(f"Escaly — {spec.horizon}-{unit} Retention by {legend_title}")
+        plt.xlabel(f"{unit}s Since Signup")
         plt.ylabel("% of Active Organizations")
         plt.grid(alpha=0.3)
-        plt.legend(title="Team Segment")
-        out_png = figs_dir / "retention_curve.png"
+        plt.legend(title=legend_title)
+        out_png = figs_dir / retention_matrix_csv.with_suffix(".png").name.replace("retention_matrix", "retention_curve")
         plt.savefig(out_png, bbox_inches="tight")
         print(f"📈 Saved figure: {out_png}")
     except Exception as e:
         print(f"⚠️ Could not generate plot (matplotlib missing?): {e}")
+
+
+def report_ci(con, spec, n_resamples=2000, level=95.0, seed=42, workers=1):
+    # Bootstrap intervals for every matrix cell (CSV) and the README summary (printed)
+    figs_dir = pathlib.Path("case-studies/escaly-retention-cohorts/figs")
+    bootstrap_matrix(con, spec, name="retention_matrix", n_resamples=n_resamples, level=level,
+                     seed=seed, workers=workers)
+    ci_csv = figs_dir / matrix_csv_name(spec).replace(".csv", "_ci.csv")
+    con.execute("SELECT * FROM retention_matrix_ci").fetchdf().to_csv(ci_csv, index=False)
+    print(f"💾 Wrote CSV: {ci_csv} ({n_resamples:,} resamples, {level:g}% intervals)")
+
+    unit = spec.granularity.title()
+    headline = [p for p in HEADLINE_PERIODS[spec.granularity] if p in spec.report_periods] or spec.report_periods
+    seg_title = "Cohort Type" if spec.segment == DEFAULT_SEGMENT else spec.segment_col
+    summary_df = con.execute(f"""
+        SELECT * FROM (
+          PIVOT (
+            SELECT {spec.segment_col}, period_label,
+                   printf('%.1f %% [%.1f–%.1f]', retention_pct, ci_low, ci_high) AS cell
+            FROM retention_matrix_summary_ci
+            WHERE period_n IN ({", ".join(map(str, headline))})
+          )
+          ON period_label IN ({", ".join(f"'{spec.label(p)}'" for p in headline)})
+          USING first(cell)
+          GROUP BY {spec.segment_col}
+        )
+        ORDER BY 1
+    """).fetchdf()
+    print(f"=== README Table — Weighted Retention by {seg_title} with {level:g}% Bootstrap Intervals ===")
+    print(summary_df.rename(columns={
+        spec.segment_col: seg_title,
+        **{spec.label(p): f"{unit} {p}" for p in headline},
+    }).to_markdown(index=False))
+    print("\n")
+
+
+def main():
+    args = parse_args()
+    con = duckdb.connect(args.db) if args.db else duckdb.connect()
+    apply_memory_budget(con, args.memory_limit, args.temp_dir)
+    literals = {"events_parquet_dir": events_parquet_dir(args.db).as_posix()}
+    check_segment(con, args.spec)
+    if args.parquet_log:
+        con.execute("SET TimeZone = 'UTC'")  # Parquet UTC timestamps -> the CSV's wall-clock TIMESTAMPs
+        build_external(con, pathlib.Path(args.parquet_log), force=args.rebuild, jobs=args.jobs)
+    elif args.incremental:
+        build_incremental(con, args.storage, literals)
+    else:
+        build_full(con, args.storage, args.approx_distinct, force=args.rebuild,
+                   variables={"approx_sample_pct": args.approx_sample}, jobs=args.jobs, literals=literals)
+    check_segment_column(con, args.spec)
+    spec = args.spec
+    report(con, spec, args.approx_distinct)
+    if args.approx_distinct:
+        print_table(con, "approx_error_report")  # Estimates vs exact counts on a sample
+    if args.bootstrap:
+        report_ci(con, spec, n_resamples=args.bootstrap, level=args.ci_level,
+                  seed=args.seed, workers=args.bootstrap_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,7 @@
--- Create event table from CSV (tiny dataset first; later overwrite)
+-- Create event table from CSV, typing event_ts at ingest (no post-load UPDATE rewrite)
 CREATE OR REPLACE TABLE events AS
-SELECT * FROM read_csv_auto('case-studies/escaly-retention-cohorts/data/events.csv', header=True);
-
--- Normalize types
-UPDATE events
-SET event_ts = CAST(event_ts AS TIMESTAMP);
+SELECT * FROM read_csv('case-studies/escaly-retention-cohorts/data/events.csv', header=True,
+                       types={'event_ts': 'TIMESTAMP'});
 
 -- Helpful views
 CREATE OR REPLACE VIEW signup_events AS
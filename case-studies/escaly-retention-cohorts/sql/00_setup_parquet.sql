@@ -0,0 +1,38 @@
+-- Parquet-backed alternative to 00_setup.sql (run_retention_experiment.py --storage parquet).
+-- The CSV is parsed and typed once, written as Parquet partitioned by account signup week,
+-- and `events` becomes a view over those files: later runs and ad-hoc queries never re-read the CSV.
+-- The directory (getvariable('events_parquet_dir'), one per --db) is written into the COPY and the
+-- view as a literal by run_dag(literals=...).
+COPY (
+  WITH raw AS (
+    SELECT * FROM read_csv('case-studies/escaly-retention-cohorts/data/events.csv', header=True,
+                           types={'event_ts': 'TIMESTAMP'})
+  ),
+  signup AS (
+    SELECT account_id, CAST(date_trunc('week', MIN(event_ts)) AS DATE) AS signup_week
+    FROM raw
+    WHERE event_name = 'signup_completed'
+    GROUP BY 1
+  )
+  SELECT raw.*, signup.signup_week
+  FROM raw
+  LEFT JOIN signup USING (account_id)
+) TO getvariable('events_parquet_dir')
+  (FORMAT parquet, PARTITION_BY (signup_week), OVERWRITE true);
+
+CREATE OR REPLACE VIEW events AS
+SELECT * EXCLUDE (signup_week)
+FROM read_parquet(getvariable('events_parquet_dir') || '/**/*.parquet', hive_partitioning=true);
+
+-- Helpful views (same definitions as 00_setup.sql)
+CREATE OR REPLACE VIEW signup_events AS
+SELECT account_id, MIN(event_ts) AS signup_completed_at
+FROM events
+WHERE event_name = 'signup_completed'
+GROUP BY account_id;
+
+CREATE OR REPLACE VIEW qualifying_events AS
+SELECT account_id, user_id, event_name, event_ts,
+       date_trunc('week', event_ts) AS week_start_at
+FROM events
+WHERE event_name IN ('submit_assessment','generate_report');
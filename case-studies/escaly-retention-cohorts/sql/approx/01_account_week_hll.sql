@@ -0,0 +1,7 @@
+-- Approximate mode: one HyperLogLog sketch of active users per account-week
+-- (replaces the exact user_weekly table)
+-- requires: ../../../scripts/hll_macros.sql
+CREATE OR REPLACE TABLE account_week_hll AS
+SELECT account_id, week_start_at, hll_sketch(user_id) AS users_hll
+FROM qualifying_events
+GROUP BY 1,2;
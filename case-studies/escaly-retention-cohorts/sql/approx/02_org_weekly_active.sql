@@ -0,0 +1,9 @@
+-- Warehouse-derived signal (org_weekly_active), active_user_count estimated from the sketch
+-- requires: ../../../scripts/hll_macros.sql
+CREATE OR REPLACE TABLE org_weekly_active AS
+SELECT
+  account_id,
+  week_start_at,
+  hll_estimate(users_hll) AS active_user_count,
+  active_user_count > 0 AS is_active
+FROM account_week_hll;
@@ -0,0 +1,27 @@
+-- Approximate mode: team size by week 4 from merged account-week sketches
+-- requires: ../../../scripts/hll_macros.sql
+
+-- Cohort by account signup week
+CREATE OR REPLACE TABLE cohorts AS
+SELECT
+  account_id,
+  date_trunc('week', signup_completed_at) AS signup_week
+FROM signup_events;
+
+-- Team size by end of week 4: the account-week sketches of weeks 0..4 are merged, not re-scanned
+CREATE OR REPLACE TABLE team_size_w4 AS
+SELECT
+  aw.account_id,
+  hll_estimate(hll_merge(
+    CASE WHEN date_diff('week', c.signup_week, aw.week_start_at) BETWEEN 0 AND 4 THEN aw.users_hll END
+  )) AS users_active_by_w4
+FROM account_week_hll aw
+JOIN cohorts c USING (account_id)
+GROUP BY 1;
+
+-- Segment label
+CREATE OR REPLACE TABLE team_segment AS
+SELECT
+  account_id,
+  CASE WHEN users_active_by_w4 >= 2 THEN 'multi_user' ELSE 'single_user' END AS team_seg
+FROM team_size_w4;
@@ -0,0 +1,33 @@
+-- Sketches of all / active accounts per signup-week cohort, team segment and week_n
+-- requires: ../../../scripts/hll_macros.sql
+CREATE OR REPLACE TABLE cohort_week_hll AS
+SELECT
+  r.signup_week,
+  ts.team_seg,
+  r.week_n,
+  hll_sketch(r.account_id) AS accounts_hll,
+  hll_sketch(CASE WHEN r.is_active THEN r.account_id END) AS active_hll
+FROM retention_long r
+JOIN team_segment ts USING (account_id)
+GROUP BY 1,2,3;
+
+-- Signup weeks and segments roll up by merging sketches; team_seg '*' = all segments
+CREATE OR REPLACE TABLE retention_rollup AS
+SELECT
+  CASE WHEN GROUPING(team_seg) = 1 THEN '*' ELSE team_seg END AS team_seg,
+  week_n,
+  hll_estimate(hll_merge(accounts_hll)) AS n_accounts,
+  hll_estimate(hll_merge(active_hll)) AS orgs_active
+FROM cohort_week_hll
+GROUP BY GROUPING SETS ((team_seg, week_n), (week_n));
+
+CREATE OR REPLACE TABLE retention_counts AS
+SELECT team_seg, week_n, n_accounts, orgs_active
+FROM retention_rollup
+WHERE team_seg <> '*';
+
+-- Every cohort account has a week 0 row, so the week-0 sketch counts the segment
+CREATE OR REPLACE TABLE cohort_sizes AS
+SELECT team_seg, n_accounts AS cohort_size
+FROM retention_counts
+WHERE week_n = 0;
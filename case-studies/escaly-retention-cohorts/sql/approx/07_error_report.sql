@@ -0,0 +1,66 @@
+-- Error of the approximate counts against exact COUNT(DISTINCT ...) on a sample.
+-- Account-level counts are checked for a hash sample of accounts (getvariable('approx_sample_pct'),
+-- default 10%); the matrix cells are checked in full, since retention_long already holds one row
+-- per account and week. bound_95_pct is the 95% bound of a single estimate (2 x 1.04 / sqrt(4096)).
+-- requires: ../../../scripts/hll_macros.sql
+CREATE OR REPLACE TEMP TABLE approx_sample AS
+SELECT account_id
+FROM cohorts
+WHERE hash(account_id, 'approx_sample') % 100 < COALESCE(getvariable('approx_sample_pct'), 10);
+
+CREATE OR REPLACE TABLE approx_error_report AS
+WITH active_users AS (
+  SELECT 'org_weekly_active.active_user_count' AS site, o.active_user_count AS approx, e.exact
+  FROM (
+    SELECT account_id, week_start_at, COUNT(DISTINCT user_id) AS exact
+    FROM qualifying_events
+    WHERE account_id IN (SELECT account_id FROM approx_sample)
+    GROUP BY 1,2
+  ) e
+  JOIN org_weekly_active o USING (account_id, week_start_at)
+),
+team_size AS (
+  SELECT 'team_size_w4.users_active_by_w4' AS site, t.users_active_by_w4 AS approx, e.exact
+  FROM (
+    SELECT q.account_id,
+           COUNT(DISTINCT CASE WHEN date_diff('week', c.signup_week, q.week_start_at) BETWEEN 0 AND 4
+                               THEN q.user_id END) AS exact
+    FROM qualifying_events q
+    JOIN cohorts c USING (account_id)
+    WHERE q.account_id IN (SELECT account_id FROM approx_sample)
+    GROUP BY 1
+  ) e
+  JOIN team_size_w4 t USING (account_id)
+),
+cells AS (
+  SELECT ts.team_seg, r.week_n, COUNT(*) AS n_accounts, COUNT(*) FILTER (WHERE r.is_active) AS orgs_active
+  FROM retention_long r
+  JOIN team_segment ts USING (account_id)
+  GROUP BY GROUPING SETS ((ts.team_seg, r.week_n), (r.week_n))
+),
+matrix AS (
+  SELECT 'retention_counts.orgs_active' AS site, a.orgs_active AS approx, c.orgs_active AS exact
+  FROM cells c
+  JOIN retention_rollup a ON a.team_seg = COALESCE(c.team_seg, '*') AND a.week_n = c.week_n
+  UNION ALL
+  SELECT 'retention_counts.n_accounts', a.n_accounts, c.n_accounts
+  FROM cells c
+  JOIN retention_rollup a ON a.team_seg = COALESCE(c.team_seg, '*') AND a.week_n = c.week_n
+),
+compared AS (
+  SELECT * FROM active_users
+  UNION ALL SELECT * FROM team_size
+  UNION ALL SELECT * FROM matrix
+)
+SELECT
+  site,
+  COUNT(*) AS n_compared,
+  SUM(exact) AS exact_total,
+  SUM(approx) AS approx_total,
+  ROUND(100.0 * AVG(abs(approx - exact) / NULLIF(exact, 0)), 2) AS mean_abs_err_pct,
+  ROUND(100.0 * MAX(abs(approx - exact) / NULLIF(exact, 0)), 2) AS max_abs_err_pct,
+  ROUND(100.0 * AVG((approx = exact)::INTEGER), 1) AS exact_match_pct,
+  ROUND(100.0 * 2 * hll_rse(), 2) AS bound_95_pct
+FROM compared
+GROUP BY 1
+ORDER BY 1;
@@ -0,0 +1,17 @@
+-- Out-of-core alternative to 00_setup.sql (run_retention_experiment.py --parquet-log).
+-- `events` is a view over the partitioned Parquet log; it is never loaded. The log's glob
+-- (getvariable('events_glob')) is written into the view as a literal by run_dag(literals=...),
+-- so the view also works on later connections to a persisted --db. Timestamps are read as UTC wall-clock TIMESTAMPs like the CSV. Only day/month
+-- matrices scan it (through qualifying_events); the weekly tables come from per-partition
+-- partials (01_partition_partials.sql, 02_merge_partials.sql).
+CREATE OR REPLACE VIEW events AS
+SELECT account_id, user_id, event_name, CAST(event_ts AS TIMESTAMP) AS event_ts,
+       report_id, assessment_id, scale_id
+FROM read_parquet(getvariable('events_glob'), union_by_name=true);
+
+-- Helpful views (same definition as 00_setup.sql)
+CREATE OR REPLACE VIEW qualifying_events AS
+SELECT account_id, user_id, event_name, event_ts,
+       date_trunc('week', event_ts) AS week_start_at
+FROM events
+WHERE event_name IN ('submit_assessment','generate_report');
@@ -0,0 +1,25 @@
+-- Per-partition partial aggregates of the Parquet log, kept between runs (--db).
+-- partition_log fingerprints each partition (file count, bytes, newest mtime) so only new or
+-- changed partitions are reduced again.
+CREATE TABLE IF NOT EXISTS partition_log (
+  part        VARCHAR PRIMARY KEY,
+  n_files     INTEGER,
+  size_bytes  BIGINT,
+  mtime_ns    BIGINT,
+  loaded_at   TIMESTAMP
+);
+
+-- Distinct user-weeks of one partition (a week may span two partitions; merged with DISTINCT)
+CREATE TABLE IF NOT EXISTS part_user_weekly (
+  part          VARCHAR,
+  account_id    VARCHAR,
+  user_id       VARCHAR,
+  week_start_at TIMESTAMP
+);
+
+-- First signup per account within one partition (merged with MIN)
+CREATE TABLE IF NOT EXISTS part_signups (
+  part                VARCHAR,
+  account_id          VARCHAR,
+  signup_completed_at TIMESTAMP
+);
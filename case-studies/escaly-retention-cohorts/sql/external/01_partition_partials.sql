@@ -0,0 +1,16 @@
+-- Reduce one partition (getvariable('part_files'), recorded as getvariable('part')) to partials.
+-- Each statement streams the partition's Parquet files; nothing but the partials is kept.
+DELETE FROM part_user_weekly WHERE part = getvariable('part');
+DELETE FROM part_signups WHERE part = getvariable('part');
+
+INSERT INTO part_user_weekly
+SELECT DISTINCT getvariable('part'), account_id, user_id,
+       date_trunc('week', CAST(event_ts AS TIMESTAMP)) AS week_start_at
+FROM read_parquet(getvariable('part_files'), union_by_name=true)
+WHERE event_name IN ('submit_assessment','generate_report');
+
+INSERT INTO part_signups
+SELECT getvariable('part'), account_id, MIN(CAST(event_ts AS TIMESTAMP)) AS signup_completed_at
+FROM read_parquet(getvariable('part_files'), union_by_name=true)
+WHERE event_name = 'signup_completed'
+GROUP BY 1, 2;
@@ -0,0 +1,15 @@
+-- Merge the per-partition partials into the inputs of sql/02..06:
+-- signup_events (first signup per account) and user_weekly (distinct user-weeks).
+-- Both aggregations spill to temp_directory under memory_limit.
+CREATE OR REPLACE TABLE account_signups AS
+SELECT account_id, MIN(signup_completed_at) AS signup_completed_at
+FROM part_signups
+GROUP BY account_id;
+
+CREATE OR REPLACE VIEW signup_events AS
+SELECT account_id, signup_completed_at
+FROM account_signups;
+
+CREATE OR REPLACE TABLE user_weekly AS
+SELECT DISTINCT account_id, user_id, week_start_at
+FROM part_user_weekly;
@@ -0,0 +1,4 @@
+-- Incremental state, recorded after a full rebuild (00..05).
+-- high_water_ts: latest event_ts already loaded into `events`.
+CREATE OR REPLACE TABLE pipeline_state AS
+SELECT (SELECT MAX(event_ts) FROM events) AS high_water_ts;
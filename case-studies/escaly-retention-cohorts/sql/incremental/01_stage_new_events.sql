@@ -0,0 +1,19 @@
+-- Stage only events newer than the high-water mark (typed like 00_setup.sql).
+-- Assumes the log is appended in event_ts order (late events <= high_water_ts are not picked up).
+CREATE OR REPLACE TEMP TABLE new_events AS
+SELECT *
+FROM read_csv('case-studies/escaly-retention-cohorts/data/events.csv', header=True,
+              types={'event_ts': 'TIMESTAMP'})
+WHERE event_ts > (SELECT high_water_ts FROM pipeline_state);
+
+-- Account-weeks with new qualifying activity
+CREATE OR REPLACE TEMP TABLE affected_weeks AS
+SELECT DISTINCT account_id, date_trunc('week', event_ts) AS week_start_at
+FROM new_events
+WHERE event_name IN ('submit_assessment','generate_report');
+
+-- Accounts whose cohort, segment or retention rows may change
+CREATE OR REPLACE TEMP TABLE affected_accounts AS
+SELECT account_id FROM affected_weeks
+UNION
+SELECT account_id FROM new_events WHERE event_name = 'signup_completed';
@@ -0,0 +1,3 @@
+-- Append staged events to the `events` table (default storage)
+INSERT INTO events BY NAME
+SELECT * FROM new_events;
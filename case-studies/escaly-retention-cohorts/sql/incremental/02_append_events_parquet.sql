@@ -0,0 +1,16 @@
+-- Append staged events as new Parquet files (--storage parquet) in the database's
+-- getvariable('events_parquet_dir'); the `events` view picks them up.
+-- Partition key = account signup week (known cohort, or a signup arriving in this batch).
+COPY (
+  WITH new_signups AS (
+    SELECT account_id, date_trunc('week', MIN(event_ts)) AS signup_week
+    FROM new_events
+    WHERE event_name = 'signup_completed'
+    GROUP BY 1
+  )
+  SELECT n.*, CAST(COALESCE(c.signup_week, s.signup_week) AS DATE) AS signup_week
+  FROM new_events n
+  LEFT JOIN cohorts c ON c.account_id = n.account_id
+  LEFT JOIN new_signups s ON s.account_id = n.account_id
+) TO getvariable('events_parquet_dir')
+  (FORMAT parquet, PARTITION_BY (signup_week), APPEND true);
@@ -0,0 +1,27 @@
+-- user_weekly: insert new distinct user-weeks only
+INSERT INTO user_weekly
+SELECT DISTINCT n.account_id, n.user_id, date_trunc('week', n.event_ts) AS week_start_at
+FROM new_events n
+WHERE n.event_name IN ('submit_assessment','generate_report')
+  AND NOT EXISTS (
+    SELECT 1 FROM user_weekly uw
+    WHERE uw.account_id = n.account_id
+      AND uw.user_id = n.user_id
+      AND uw.week_start_at = date_trunc('week', n.event_ts)
+  );
+
+-- org_weekly_active: recompute the affected account-weeks
+DELETE FROM org_weekly_active o
+USING affected_weeks a
+WHERE o.account_id = a.account_id
+  AND o.week_start_at = a.week_start_at;
+
+INSERT INTO org_weekly_active
+SELECT
+  uw.account_id,
+  uw.week_start_at,
+  COUNT(DISTINCT uw.user_id) AS active_user_count,
+  COUNT(DISTINCT uw.user_id) > 0 AS is_active
+FROM user_weekly uw
+JOIN affected_weeks a USING (account_id, week_start_at)
+GROUP BY 1,2;
@@ -0,0 +1,70 @@
+-- Contributions of affected accounts to the matrix counts *before* the refresh
+CREATE OR REPLACE TEMP TABLE old_counts AS
+SELECT ts.team_seg, r.week_n, COUNT(*) AS n_accounts, COUNT(*) FILTER (WHERE r.is_active) AS orgs_active
+FROM retention_long r
+JOIN team_segment ts USING (account_id)
+WHERE r.account_id IN (SELECT account_id FROM affected_accounts)
+GROUP BY 1,2;
+
+CREATE OR REPLACE TEMP TABLE old_sizes AS
+SELECT team_seg, COUNT(*) AS cohort_size
+FROM team_segment
+WHERE account_id IN (SELECT account_id FROM affected_accounts)
+GROUP BY 1;
+
+-- Cohorts: new accounts only (a later signup event cannot move an existing MIN)
+INSERT INTO cohorts
+SELECT account_id, date_trunc('week', MIN(event_ts)) AS signup_week
+FROM new_events
+WHERE event_name = 'signup_completed'
+  AND account_id NOT IN (SELECT account_id FROM cohorts)
+GROUP BY 1;
+
+-- Team size by week 4 and segment label for affected accounts
+DELETE FROM team_size_w4 WHERE account_id IN (SELECT account_id FROM affected_accounts);
+INSERT INTO team_size_w4
+SELECT
+  uw.account_id,
+  COUNT(DISTINCT CASE WHEN date_diff('week', c.signup_week, uw.week_start_at) BETWEEN 0 AND 4 THEN uw.user_id END) AS users_active_by_w4
+FROM user_weekly uw
+JOIN cohorts c USING (account_id)
+WHERE uw.account_id IN (SELECT account_id FROM affected_accounts)
+GROUP BY 1;
+
+DELETE FROM team_segment WHERE account_id IN (SELECT account_id FROM affected_accounts);
+INSERT INTO team_segment
+SELECT
+  account_id,
+  CASE WHEN users_active_by_w4 >= 2 THEN 'multi_user' ELSE 'single_user' END AS team_seg
+FROM team_size_w4
+WHERE account_id IN (SELECT account_id FROM affected_accounts);
+
+-- retention_long: rebuild affected accounts over the reported horizon (week_n 0..12).
+-- The horizon is relative to each account's signup week, so other accounts never need extending.
+DELETE FROM retention_long WHERE account_id IN (SELECT account_id FROM affected_accounts);
+INSERT INTO retention_long
+SELECT
+  c.account_id,
+  c.signup_week,
+  w.week_n,
+  COALESCE(o.is_active, FALSE) AS is_active
+FROM cohorts c
+CROSS JOIN range(0, 13) AS w(week_n)
+LEFT JOIN org_weekly_active o
+  ON o.account_id = c.account_id
+  AND o.week_start_at = c.signup_week + to_weeks(w.week_n::INTEGER)
+WHERE c.account_id IN (SELECT account_id FROM affected_accounts);
+
+-- Contributions of affected accounts *after* the refresh
+CREATE OR REPLACE TEMP TABLE new_counts AS
+SELECT ts.team_seg, r.week_n, COUNT(*) AS n_accounts, COUNT(*) FILTER (WHERE r.is_active) AS orgs_active
+FROM retention_long r
+JOIN team_segment ts USING (account_id)
+WHERE r.account_id IN (SELECT account_id FROM affected_accounts)
+GROUP BY 1,2;
+
+CREATE OR REPLACE TEMP TABLE new_sizes AS
+SELECT team_seg, COUNT(*) AS cohort_size
+FROM team_segment
+WHERE account_id IN (SELECT account_id FROM affected_accounts)
+GROUP BY 1;
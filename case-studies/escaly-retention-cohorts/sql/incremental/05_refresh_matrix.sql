@@ -0,0 +1,28 @@
+-- Apply deltas (new - old) to the per-cell counts; only touched cells change
+CREATE OR REPLACE TABLE retention_counts AS
+SELECT team_seg, week_n, SUM(n_accounts)::BIGINT AS n_accounts, SUM(orgs_active)::BIGINT AS orgs_active
+FROM (
+  SELECT team_seg, week_n, n_accounts, orgs_active FROM retention_counts
+  UNION ALL
+  SELECT team_seg, week_n, -n_accounts, -orgs_active FROM old_counts
+  UNION ALL
+  SELECT team_seg, week_n, n_accounts, orgs_active FROM new_counts
+)
+GROUP BY 1,2
+HAVING SUM(n_accounts) > 0;
+
+CREATE OR REPLACE TABLE cohort_sizes AS
+SELECT team_seg, SUM(cohort_size)::BIGINT AS cohort_size
+FROM (
+  SELECT team_seg, cohort_size FROM cohort_sizes
+  UNION ALL
+  SELECT team_seg, -cohort_size FROM old_sizes
+  UNION ALL
+  SELECT team_seg, cohort_size FROM new_sizes
+)
+GROUP BY 1
+HAVING SUM(cohort_size) > 0;
+
+-- Advance the high-water mark
+UPDATE pipeline_state
+SET high_water_ts = GREATEST(high_water_ts, (SELECT MAX(event_ts) FROM events));
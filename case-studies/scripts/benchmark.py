@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+benchmark.py
+
+Benchmark the mock-data generators and the retention / funnel SQL pipelines at scale.
+
+For every scale (accounts for the retention case study, users for the activation funnel):
+  - the case study's generate_mock_data.py writes a fresh dataset into --work_dir;
+  - every SQL stage then runs against a DuckDB file in that directory, in pipeline order:
+      retention: 00_setup.sql, 01_user_weekly_activity.sql ... 05_retention_matrix.sql
+      funnel:    load mock_events, then funnel.sql and time_to_activation*.sql (with the
+                 `-- requires:` stages they read from, each timed on its own)
+
+Each step runs in its own child process, so the numbers are per step:
+  - wall_s       wall time of the child process (interpreter start-up included)
+  - query_s      time spent executing the stage's SQL (generators: equal to wall_s)
+  - peak_rss_mb  maximum resident set size of the child (os.wait4 rusage)
+  - rows_per_s   input events / query_s (generators: events written / wall_s)
+  - operators    DuckDB JSON profiles summed per operator over the stage's statements
+                 (top operators by time; full profiles under <work_dir>/profiles/)
+
+Results are written as JSON (--out). With --baseline, every step present in both files is
+compared, and the run fails (exit code 1) if wall time, query time or peak RSS grew by more
+than --threshold (default 20%). Steps under --min_seconds in the baseline are compared on
+peak RSS only, since their timings are mostly noise.
+
+Usage:
+  python case-studies/scripts/benchmark.py --scales 10000,100000 --out bench_base.json
+  python case-studies/scripts/benchmark.py --scales 10000,100000 --baseline bench_base.json
+  python case-studies/scripts/benchmark.py --pipelines funnel --scales 1000000 --keep_data
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import duckdb
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+CASE_STUDIES = SCRIPTS_DIR.parent
+RETENTION_DIR = CASE_STUDIES / "escaly-retention-cohorts"
+FUNNEL_DIR = CASE_STUDIES / "escaly-activation-funnel"
+
+sys.path.insert(0, str(RETENTION_DIR / "scripts"))
+from run_duckdb import load_events, stage_order  # noqa: E402
+from run_retention_experiment import EVENTS_CSV, FULL_STAGES, SETUP_STAGE  # noqa: E402
+
+SCALES = [10_000, 100_000, 1_000_000, 10_000_000]
+PIPELINES = ["retention", "funnel"]
+RETENTION_STAGES = [SETUP_STAGE["table"]] + FULL_STAGES
+FUNNEL_QUERIES = ["funnel.sql", "time_to_activation.sql", "time_to_activation_by_segment.sql",
+                  "time_to_activation_rollup.sql"]
+COMPARED = ["wall_s", "query_s", "peak_rss_mb"]
+TOP_OPERATORS = 5
+
+
+# -------------------------
+# Steps of a pipeline
+# -------------------------
+
+def funnel_stages() -> List[Path]:
+    """The funnel queries with their `-- requires:` stages first, each file once."""
+    done: set = set()
+    order = []
+    for name in FUNNEL_QUERIES:
+        path = FUNNEL_DIR / name
+        order += stage_order(path, done)
+        order.append(path)
+    return order
+
+
+def generator_cmd(pipeline: str, scale: int, data: Path) -> List[str]:
+    if pipeline == "retention":
+        # The NumPy engine is the retention generator's load-test path (same schema)
+        return [sys.executable, str(RETENTION_DIR / "scripts" / "generate_mock_data.py"),
+                "--accounts", str(scale), "--engine", "numpy", "--out", str(data)]
+    return [sys.executable, str(FUNNEL_DIR / "generate_mock_data.py"), "--n_users", str(scale), "--out", str(data)]
+
+
+def pipeline_steps(pipeline: str, work: Path) -> List[dict]:
+    """Child-process arguments for every SQL step of a pipeline, in order."""
+    db = work / f"{pipeline}.duckdb"
+    if pipeline == "retention":
+        # 00_setup.sql reads EVENTS_CSV relative to the working directory: run inside `work`
+        return [{"stage": name, "sql": str(RETENTION_DIR / "sql" / name), "db": str(db), "cwd": str(work)}
+                for name in RETENTION_STAGES]
+    data = work / "funnel_events.csv"
+    steps = [{"stage": "load mock_events", "load": str(data), "db": str(db), "cwd": str(work)}]
+    steps += [{"stage": path.name, "sql": str(path), "db": str(db), "cwd": str(work)} for path in funnel_stages()]
+    return steps
+
+
+def dataset_path(pipeline: str, work: Path) -> Path:
+    return work / EVENTS_CSV if pipeline == "retention" else work / "funnel_events.csv"
+
+
+# -------------------------
+# Child processes
+# -------------------------
+
+def run_child(cmd: List[str], cwd: Optional[str] = None) -> dict:
+    """Run cmd to completion; wall time, peak RSS (rusage) and its JSON stdout line if any."""
+    t0 = time.perf_counter()
+    # stderr goes to a file: with two pipes, a child filling the stderr pipe while we block
+    # reading stdout to EOF would deadlock (tracebacks, DuckDB warnings at large scales)
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as err_file:
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=err_file, text=True)
+        out = proc.stdout.read()
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+        err_file.seek(0)
+        err = err_file.read()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed ({proc.returncode}):\n{err.strip()}")
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss_bytes = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    result = {"wall_s": round(wall, 4), "peak_rss_mb": round(rss_bytes / 2**20, 1)}
+    lines = [line for line in out.splitlines() if line.startswith("{")]
+    if lines:
+        result.update(json.loads(lines[-1]))
+    return result
+
+
+def _summarize_profile(node: dict, totals: Dict[str, dict]) -> None:
+    if "operator_type" in node:
+        op = totals[node.get("operator_name") or node["operator_type"]]
+        op["seconds"] += node.get("operator_timing", 0.0)
+        op["rows"] += node.get("operator_cardinality", 0)
+    for child in node.get("children", []):
+        _summarize_profile(child, totals)
+
+
+def stage_main(argv=None) -> None:
+    """Child entry point: run one stage with JSON profiling and print its stats as one JSON line."""
+    p = argparse.ArgumentParser(prog="benchmark.py _stage")
+    p.add_argument("--db", required=True)
+    p.add_argument("--sql")
+    p.add_argument("--load")
+    p.add_argument("--profile", required=True)
+    args = p.parse_args(argv)
+
+    con = duckdb.connect(args.db)
+    con.execute("SET TimeZone = 'UTC'")
+    profiles, totals = [], defaultdict(lambda: {"seconds": 0.0, "rows": 0})
+    t0 = time.perf_counter()
+    if args.load:
+        load_events(con, Path(args.load), rebuild=True)
+    else:
+        tmp = Path(args.profile).with_suffix(".stmt.json")
+        con.execute("PRAGMA enable_profiling = 'json'")
+        con.execute(f"PRAGMA profiling_output = '{tmp.as_posix()}'")
+        for statement in con.extract_statements(Path(args.sql).read_text(encoding="utf-8")):
+            con.execute(statement.query).fetchall()
+            if tmp.exists():
+                profile = json.loads(tmp.read_text(encoding="utf-8"))
+                profiles.append(profile)
+                _summarize_profile(profile, totals)
+        con.execute("PRAGMA disable_profiling")
+        tmp.unlink(missing_ok=True)
+    query_s = time.perf_counter() - t0
+    Path(args.profile).write_text(json.dumps(profiles, indent=1), encoding="utf-8")
+
+    top = sorted(totals.items(), key=lambda kv: -kv[1]["seconds"])[:TOP_OPERATORS]
+    print(json.dumps({
+        "query_s": round(query_s, 4),
+        "operators": [{"operator": name, "seconds": round(v["seconds"], 4), "rows": v["rows"]} for name, v in top],
+    }))
+
+
+# -------------------------
+# Benchmark run
+# -------------------------
+
+def count_rows(path: Path) -> int:
+    return duckdb.connect().execute(f"SELECT COUNT(*) FROM read_csv('{path.as_posix()}', header=true)").fetchone()[0]
+
+
+def bench_pipeline(pipeline: str, scale: int, work: Path) -> List[dict]:
+    work.mkdir(parents=True, exist_ok=True)
+    (work / "profiles").mkdir(exist_ok=True)
+    data = dataset_path(pipeline, work)
+    data.parent.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    gen = run_child(generator_cmd(pipeline, scale, data))
+    n_events = count_rows(data)
+    gen.update(stage="generate_mock_data.py", query_s=gen["wall_s"], rows=n_events,
+               rows_per_s=round(n_events / gen["wall_s"]), operators=[])
+    results.append(gen)
+    print(f"   generate_mock_data.py: {n_events:,} events in {gen['wall_s']:.2f}s, {gen['peak_rss_mb']:.0f} MB")
+
+    for i, step in enumerate(pipeline_steps(pipeline, work)):
+        profile = work / "profiles" / f"{pipeline}_{scale}_{i:02d}_{Path(step['stage']).stem.replace(' ', '_')}.json"
+        cmd = [sys.executable, str(Path(__file__).resolve()), "_stage", "--db", step["db"], "--profile", str(profile)]
+        cmd += ["--load", step["load"]] if "load" in step else ["--sql", step["sql"]]
+        res = run_child(cmd, cwd=step["cwd"])
+        res.update(stage=step["stage"], rows=n_events,
+                   rows_per_s=round(n_events / res["query_s"]) if res["query_s"] else None)
+        results.append(res)
+        print(f"   {step['stage']}: {res['query_s']:.3f}s query / {res['wall_s']:.2f}s wall, "
+              f"{res['peak_rss_mb']:.0f} MB")
+    for r in results:
+        r.update(pipeline=pipeline, scale=scale)
+    return results
+
+
+def compare(results: List[dict], baseline: List[dict], threshold: float, min_seconds: float) -> List[dict]:
+    """Steps whose wall / query time or peak RSS grew by more than threshold over the baseline."""
+    base = {(b["pipeline"], b["scale"], b["stage"]): b for b in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r["pipeline"], r["scale"], r["stage"]))
+        if b is None:
+            continue
+        for metric in COMPARED:
+            if metric != "peak_rss_mb" and b[metric] < min_seconds:
+                continue
+            if b[metric] and r[metric] > b[metric] * (1 + threshold):
+                regressions.append({"pipeline": r["pipeline"], "scale": r["scale"], "stage": r["stage"],
+                                    "metric": metric, "baseline": b[metric], "current": r[metric],
+                                    "change_pct": round(100.0 * (r[metric] / b[metric] - 1), 1)})
+    return regressions
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the Escaly generators and SQL pipelines at scale.")
+    p.add_argument("--scales", type=lambda v: [int(x) for x in v.split(",")], default=SCALES,
+                   help="Comma-separated accounts (retention) / users (funnel) per run "
+                        "(default: 10000,100000,1000000,10000000)")
+    p.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=PIPELINES)
+    p.add_argument("--work_dir", type=str, default=None,
+                   help="Where datasets, databases and DuckDB profiles go (default: a temporary directory)")
+    p.add_argument("--keep_data", action="store_true", help="Keep --work_dir after the run")
+    p.add_argument("--out", type=str, default="benchmark_results.json", help="Results JSON")
+    p.add_argument("--baseline", type=str, default=None, help="Results JSON of an earlier run to compare against")
+    p.add_argument("--threshold", type=float, default=0.2,
+                   help="Allowed relative growth of wall time, query time and peak RSS (default: 0.2 = 20%%)")
+    p.add_argument("--min_seconds", type=float, default=0.05,
+                   help="Baseline steps faster than this are only compared on peak RSS")
+    return p.parse_args(argv)
+
+
+def main():
+    if sys.argv[1:2] == ["_stage"]:
+        stage_main(sys.argv[2:])
+        return
+    args = parse_args()
+    work_root = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="escaly-bench-"))
+    results = []
+    try:
+        for pipeline in args.pipelines:
+            for scale in args.scales:
+                print(f"⏱ {pipeline} @ {scale:,}")
+                results += bench_pipeline(pipeline, scale, work_root / f"{pipeline}_{scale}")
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(work_root, ignore_errors=True)
+        else:
+            print(f"📁 Data, databases and profiles kept in {work_root}")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "duckdb": duckdb.__version__, "cpus": os.cpu_count()},
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline["results"], args.threshold, args.min_seconds)
+        report["baseline"] = {"path": args.baseline, "threshold": args.threshold, "regressions": regressions}
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"💾 Wrote {args.out} ({len(results)} steps)")
+
+    if args.baseline:
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%} vs {args.baseline}:")
+            for r in regressions:
+                print(f"   {r['pipeline']} @ {r['scale']:,} {r['stage']}: {r['metric']} "
+                      f"{r['baseline']} → {r['current']} (+{r['change_pct']}%)")
+            sys.exit(1)
+        print(f"✅ No regressions over {args.threshold:.0%} vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
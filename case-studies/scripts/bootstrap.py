@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+bootstrap.py
+
+Poisson-bootstrap confidence intervals for the case-study metrics (retention matrix cells,
+median time to activation).
+
+  - Every unit (account / user) gets a Poisson(1) weight per resample instead of being drawn
+    with replacement, so resamples are independent across units and need no global shuffle.
+  - Units with the same group and the same value are interchangeable: a sum of n Poisson(1)
+    weights is one Poisson(n) draw. Callers pass (group, value, n_units) rows, usually
+    aggregated in DuckDB, and a resample costs one draw per distinct row, not per unit
+    (a 1M-account retention matrix is a few hundred rows of activity patterns).
+  - Resamples run in fixed-size batches of vectorized NumPy draws. Batches are spread over a
+    process pool (sharding.map_shards) and batch k is seeded with shard_seed(seed, k), so the
+    intervals are identical for any --workers value.
+  - Intervals are percentile intervals of the resampled statistic; the point estimate is the
+    statistic on the observed data.
+
+Statistics:
+  - ratio_ci:  share of units with a hit, per group and column (e.g. retained accounts per
+               segment and week).
+  - median_ci: median per group, interpolated between the two middle units like DuckDB's
+               median().
+"""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from sharding import map_shards, shard_seed
+
+DEFAULT_RESAMPLES = 2000
+DEFAULT_LEVEL = 95.0
+DEFAULT_SEED = 42
+# Upper bound on Poisson draws (resamples x rows) held in memory by one batch
+BATCH_CELLS = 4_000_000
+
+
+def group_bounds(groups: np.ndarray) -> List[Tuple[int, int]]:
+    """[(lo, hi)] slices of each run of equal group ids in a group-sorted array."""
+    groups = np.asarray(groups)
+    if len(groups) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ends = np.r_[starts[1:], len(groups)]
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def batches(n_resamples: int, n_rows: int, batch_cells: int = BATCH_CELLS) -> List[Tuple[int, int]]:
+    """[(batch_idx, n_in_batch)] covering n_resamples; the layout depends only on the data size."""
+    size = max(1, min(n_resamples, batch_cells // max(1, n_rows)))
+    return [(k, min(size, n_resamples - lo)) for k, lo in enumerate(range(0, n_resamples, size))]
+
+
+def _weights(seed: int, batch_idx: int, n: int, counts: np.ndarray) -> np.ndarray:
+    rng = np.random.default_rng(shard_seed(seed, batch_idx))
+    return rng.poisson(counts, size=(n, len(counts))).astype(np.float64)
+
+
+def _interval(stats: np.ndarray, level: float) -> Tuple[np.ndarray, np.ndarray]:
+    tail = (100.0 - level) / 2
+    with np.errstate(all="ignore"):
+        lo, hi = np.nanpercentile(stats, [tail, 100.0 - tail], axis=0)
+    return lo, hi
+
+
+def _resample(task, fn, seed):
+    batch_idx, n = task
+    return fn(seed, batch_idx, n)
+
+
+def _run(fn, n_resamples: int, n_rows: int, seed: int, workers: int) -> np.ndarray:
+    tasks = batches(n_resamples, n_rows)
+    return np.concatenate(list(map_shards(partial(_resample, fn=fn, seed=seed), tasks, workers)), axis=0)
+
+
+# -------------------------
+# Ratio of hits per group
+# -------------------------
+
+def _ratio_batch(seed, batch_idx, n, bounds, counts, hits):
+    w = _weights(seed, batch_idx, n, counts)
+    out = np.empty((n, len(bounds), hits.shape[1]))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for g, (lo, hi) in enumerate(bounds):
+            out[:, g, :] = (w[:, lo:hi] @ hits[lo:hi]) / w[:, lo:hi].sum(axis=1, keepdims=True)
+    return out
+
+
+def ratio_ci(groups: Sequence[int], counts: Sequence[int], hits: np.ndarray,
+             n_resamples: int = DEFAULT_RESAMPLES, level: float = DEFAULT_LEVEL,
+             seed: int = DEFAULT_SEED, workers: int = 1):
+    """
+    Share of units with a hit per group and column, with a percentile interval.
+
+    Rows must be sorted by group: row i stands for counts[i] units of group groups[i] that all
+    have hits[i, j] (0/1) in column j. Returns (point, low, high), each (n_groups, n_columns),
+    groups in order of first appearance.
+    """
+    groups = np.asarray(groups)
+    counts = np.asarray(counts, dtype=np.int64)
+    hits = np.asarray(hits, dtype=np.float64).reshape(len(counts), -1)
+    bounds = group_bounds(groups)
+    point = np.stack([counts[lo:hi] @ hits[lo:hi] / counts[lo:hi].sum() for lo, hi in bounds])
+    fn = partial(_ratio_batch, bounds=bounds, counts=counts, hits=hits)
+    low, high = _interval(_run(fn, n_resamples, len(counts), seed, workers), level)
+    return point, low, high
+
+
+# -------------------------
+# Median per group
+# -------------------------
+
+def _weighted_median(values: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Median of each row's weighted sample of (sorted) values; NaN for an empty resample."""
+    cum = np.cumsum(w, axis=1)
+    total = cum[:, -1]
+    lo_rank = np.floor((total - 1) / 2)[:, None]
+    hi_rank = np.floor(total / 2)[:, None]
+    last = len(values) - 1
+    lo = values[np.minimum((cum <= lo_rank).sum(axis=1), last)]
+    hi = values[np.minimum((cum <= hi_rank).sum(axis=1), last)]
+    return np.where(total > 0, (lo + hi) / 2, np.nan)
+
+
+def _median_batch(seed, batch_idx, n, bounds, counts, values):
+    w = _weights(seed, batch_idx, n, counts)
+    out = np.empty((n, len(bounds)))
+    for g, (lo, hi) in enumerate(bounds):
+        out[:, g] = _weighted_median(values[lo:hi], w[:, lo:hi])
+    return out
+
+
+def median_ci(groups: Sequence[int], values: Sequence[float], counts: Sequence[int],
+              n_resamples: int = DEFAULT_RESAMPLES, level: float = DEFAULT_LEVEL,
+              seed: int = DEFAULT_SEED, workers: int = 1):
+    """
+    Median per group with a percentile interval.
+
+    Rows must be sorted by group, then value: row i stands for counts[i] units of group
+    groups[i] with value values[i]. Returns (point, low, high), each (n_groups,).
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    bounds = group_bounds(groups)
+    point = np.array([_weighted_median(values[lo:hi], counts[None, lo:hi])[0] for lo, hi in bounds])
+    fn = partial(_median_batch, bounds=bounds, counts=counts, values=values)
+    low, high = _interval(_run(fn, n_resamples, len(counts), seed, workers), level)
+    return point, low, high
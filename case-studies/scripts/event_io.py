@@ -0,0 +1,680 @@
+#!/usr/bin/env python3
+"""
+event_io.py
+
+Bounded-memory event writers shared by the case-study mock-data generators.
+
+Both generators stream events through an EventWriter instead of building the
+full event list in memory:
+  - Rows are buffered per output file and flushed every `chunk_rows` rows
+    (one CSV block or one Parquet row group per flush).
+  - Output is CSV or Parquet (inferred from the --out suffix unless given).
+  - Optionally partitioned by event date (Hive layout):
+        <out>/event_date=2025-05-15/part-00000.parquet
+  - external_sort() provides time ordering with a bounded-memory external
+    merge sort (sorted runs spilled to temp files, then k-way heap merges of at most
+    MERGE_FAN_IN runs at a time).
+
+Peak memory is O(chunk_rows), independent of how many events are generated.
+
+Compact events (EventBuffer): instead of one dict / tuple of strings per event, a
+generator can describe its columns once (Column) and append rows of compact values:
+  - timestamps as epoch seconds, ids as integers (formatted, e.g. "u_{:05d}", only
+    when written), categoricals dictionary-encoded to uint16 codes;
+  - each column is one `array` of the narrowest width that fits (4 or 8 bytes per int /
+    timestamp, 1–2 per categorical), so an event costs tens of bytes instead of hundreds
+    of bytes of Python objects;
+  - EventWriter(columns=...) buffers and external_sort_events() sorts runs in that form,
+    and strings are only produced at flush time (CSV text, or Arrow arrays for Parquet
+    with timestamps converted straight from int64).
+"""
+
+from __future__ import annotations
+
+import calendar
+import csv
+import heapq
+import tempfile
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for Parquet output
+    pa = pc = pq = None
+
+try:
+    import numpy as np
+except ImportError:  # only needed for columnar (NumPy) batches and faster sorting
+    np = None
+
+
+DEFAULT_CHUNK_ROWS = 100_000
+MERGE_FAN_IN = 64  # run files open at once while merging
+FORMATS = ("csv", "parquet")
+ISO_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+TIMESTAMP = "timestamp"
+CATEGORY = "category"
+INT = "int"
+COLUMN_KINDS = (TIMESTAMP, CATEGORY, INT)
+
+
+def resolve_format(out: Path, fmt: Optional[str] = None) -> str:
+    """Explicit format wins; otherwise infer from the output suffix (default: csv)."""
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}; expected one of {FORMATS}.")
+        return fmt
+    return "parquet" if Path(out).suffix.lower() in (".parquet", ".pq") else "csv"
+
+
+# ----------------------------
+# Compact columnar events
+# ----------------------------
+
+@dataclass(frozen=True)
+class Column:
+    """
+    One column of compact events:
+      - "timestamp": epoch seconds (int), written as ISO-8601 "…Z" / a UTC timestamp.
+      - "category":  string from a small set (event names, channels, ""), dictionary-encoded.
+      - "int":       integer, -1 = empty; written through fmt, a format string such as
+                     "u_{:05d}" or a function of the int (default: the decimal number).
+    """
+    name: str
+    kind: str = CATEGORY
+    fmt: Union[str, Callable[[int], str], None] = None
+
+    def __post_init__(self):
+        if self.kind not in COLUMN_KINDS:
+            raise ValueError(f"Unsupported column kind {self.kind!r}; expected one of {COLUMN_KINDS}.")
+
+    def formatter(self) -> Callable[[int], str]:
+        if self.fmt is None:
+            return str
+        return self.fmt.format if isinstance(self.fmt, str) else self.fmt
+
+
+_DAYS: Dict[int, str] = {}
+
+
+def iso_date(ts: int) -> str:
+    """YYYY-MM-DD (UTC) of epoch seconds; days are cached, events cluster on few of them."""
+    day = ts // 86400
+    s = _DAYS.get(day)
+    if s is None:
+        s = _DAYS[day] = datetime.fromtimestamp(day * 86400, tz=timezone.utc).strftime("%Y-%m-%d")
+    return s
+
+
+def iso_ts(ts: int) -> str:
+    """Epoch seconds as ISO_TS_FORMAT ("2025-08-01T08:30:16Z")."""
+    secs = ts % 86400
+    return f"{iso_date(ts)}T{secs // 3600:02d}:{secs // 60 % 60:02d}:{secs % 60:02d}Z"
+
+
+def epoch(dt: datetime) -> int:
+    """Epoch seconds of a datetime (naive datetimes are taken as UTC)."""
+    return calendar.timegm(dt.utctimetuple())
+
+
+# Category codes widen uint8 -> uint16 -> uint32, ints int32 -> int64, as values need it
+_CODE_WIDTHS = {1 << 8: "H", 1 << 16: "I"}
+_INT32 = (-(1 << 31), (1 << 31) - 1)
+# Rows formatted to strings at a time when a buffer is written
+FORMAT_BLOCK = 50_000
+
+
+def _view(data: array):
+    return np.frombuffer(data, dtype=data.typecode) if np is not None and len(data) else data
+
+
+class EventBuffer:
+    """
+    Columnar buffer of compact events: one `array` per column (int32 for timestamps and
+    ints, widened to int64 on the first value that needs it; uint8 codes for categoricals,
+    widened to uint16 / uint32 past 256 / 65,536 distinct values).
+    Rows go in as sequences of compact values in column order and come out again through
+    rows() (compact), text_columns() (CSV strings) or to_arrow() (Parquet).
+    """
+
+    def __init__(self, columns: Sequence[Column]):
+        self.columns = list(columns)
+        self.fieldnames = [c.name for c in self.columns]
+        self._is_cat = [c.kind == CATEGORY for c in self.columns]
+        self._data = [array("B") if cat else array("i") for cat in self._is_cat]
+        self._codes: List[Dict[str, int]] = [{} for _ in self.columns]
+        self._values: List[List[str]] = [[] for _ in self.columns]
+
+    def __len__(self) -> int:
+        return len(self._data[0]) if self._data else 0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays and the category dictionaries."""
+        return (sum(d.itemsize * len(d) for d in self._data)
+                + sum(len(v) for vals in self._values for v in vals))
+
+    def _code(self, i: int, value: str) -> int:
+        codes = self._codes[i]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._values[i])
+            self._values[i].append(value)
+            if code in _CODE_WIDTHS:
+                self._data[i] = array(_CODE_WIDTHS[code], self._data[i])
+        return code
+
+    def _widen(self, i: int) -> array:
+        self._data[i] = array("q", self._data[i])
+        return self._data[i]
+
+    def append(self, row: Sequence) -> None:
+        for i, v in enumerate(row):
+            if self._is_cat[i]:
+                self._data[i].append(self._code(i, "" if v is None else v))
+            else:
+                v = -1 if v is None or v == "" else v
+                try:
+                    self._data[i].append(v)
+                except OverflowError:
+                    self._widen(i).append(v)
+
+    def append_columns(self, columns: Mapping[str, Sequence]) -> None:
+        """Append a columnar batch ({name: NumPy array}); categoricals as strings, timestamps as datetime64 or ints."""
+        for i, c in enumerate(self.columns):
+            col = np.asarray(columns[c.name])
+            if self._is_cat[i]:
+                uniq, inverse = np.unique(col, return_inverse=True)
+                codes = np.array([self._code(i, str(u)) for u in uniq], dtype=np.int64)[inverse]
+                self._data[i].frombytes(codes.astype(self._data[i].typecode).tobytes())
+            else:
+                if np.issubdtype(col.dtype, np.datetime64):
+                    col = col.astype("datetime64[s]")
+                col = col.astype(np.int64)
+                data = self._data[i]
+                if data.typecode == "i" and len(col) and (col.min() < _INT32[0] or col.max() > _INT32[1]):
+                    data = self._widen(i)
+                data.frombytes(col.astype(data.typecode).tobytes())
+
+    def _empty_like(self) -> "EventBuffer":
+        out = EventBuffer.__new__(EventBuffer)
+        out.columns, out.fieldnames, out._is_cat = self.columns, self.fieldnames, self._is_cat
+        out._codes, out._values = self._codes, self._values  # shared dictionaries
+        out._data = [array(d.typecode) for d in self._data]
+        return out
+
+    def take(self, idx: Sequence[int]) -> "EventBuffer":
+        """New buffer with rows idx (e.g. an argsort order); dictionaries are shared."""
+        out = self._empty_like()
+        for d, src in zip(out._data, self._data):
+            if np is not None:
+                d.frombytes(_view(src)[np.asarray(idx, dtype=np.int64)].tobytes())
+            else:
+                d.extend(src[j] for j in idx)
+        return out
+
+    def split(self, n: int) -> Tuple["EventBuffer", "EventBuffer"]:
+        """(first n rows, the rest)."""
+        head, rest = self._empty_like(), self._empty_like()
+        for h, r, src in zip(head._data, rest._data, self._data):
+            h.extend(src[:n])
+            r.extend(src[n:])
+        return head, rest
+
+    def argsort(self, name: str) -> Sequence[int]:
+        """Stable row order by one column."""
+        data = self._data[self.fieldnames.index(name)]
+        if np is not None:
+            return np.argsort(_view(data), kind="stable")
+        return sorted(range(len(data)), key=data.__getitem__)
+
+    def rows(self) -> Iterator[tuple]:
+        """Compact rows (categoricals as their strings, ints and timestamps as ints)."""
+        cols = [map(vals.__getitem__, d) if cat else d
+                for d, vals, cat in zip(self._data, self._values, self._is_cat)]
+        return zip(*cols)
+
+    def text_rows(self) -> Iterator[tuple]:
+        """Rows of the strings written to CSV, formatted FORMAT_BLOCK rows at a time."""
+        for lo in range(0, len(self), FORMAT_BLOCK):
+            yield from zip(*self.text_columns(lo, lo + FORMAT_BLOCK))
+
+    def text_columns(self, lo: int = 0, hi: Optional[int] = None) -> List[List[str]]:
+        """Every column (rows lo:hi) as the strings written to CSV (empty ints as "")."""
+        out = []
+        for c, d, vals, cat in zip(self.columns, self._data, self._values, self._is_cat):
+            d = d[lo:hi]
+            if cat:
+                out.append([vals[k] for k in d])
+            elif c.kind == TIMESTAMP:
+                out.append([iso_ts(v) for v in d])
+            else:
+                f = c.formatter()
+                out.append(["" if v == -1 else f(v) for v in d])
+        return out
+
+    def to_arrow(self, timestamp_fields: Sequence[str] = ()):
+        """Arrow table with string columns (empty = NULL) and UTC timestamps for timestamp_fields."""
+        arrays = []
+        for c, d, vals, cat in zip(self.columns, self._data, self._values, self._is_cat):
+            if cat:
+                dictionary = pa.array([v if v else None for v in vals], type=pa.string())
+                arr = dictionary.take(pa.array(_view(d), type=pa.uint32()))
+            elif c.kind == TIMESTAMP and c.name in timestamp_fields:
+                arr = pa.array(_view(d), type=pa.int64()).cast(pa.timestamp("s", tz="UTC"))
+            elif c.kind == TIMESTAMP:
+                arr = pa.chunked_array([pa.array([iso_ts(v) for v in d[lo:lo + FORMAT_BLOCK]], type=pa.string())
+                                        for lo in range(0, len(d), FORMAT_BLOCK)], type=pa.string())
+            else:
+                f = c.formatter()
+                arr = pa.chunked_array([pa.array([None if v == -1 else f(v) for v in d[lo:lo + FORMAT_BLOCK]],
+                                                 type=pa.string())
+                                        for lo in range(0, len(d), FORMAT_BLOCK)], type=pa.string())
+            arrays.append(arr)
+        return pa.Table.from_arrays(arrays, names=self.fieldnames)
+
+
+def decode_row(columns: Sequence[Column], text: Sequence[str]) -> tuple:
+    """Compact row back from its spilled text (ints parsed, categoricals as read)."""
+    return tuple(v if c.kind == CATEGORY else int(v) for c, v in zip(columns, text))
+
+
+def read_compact_rows(path: Path, columns: Sequence[Column]) -> Iterator[tuple]:
+    """Stream a header-less spill file of compact rows (see external_sort_events)."""
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        for text in csv.reader(f):
+            yield decode_row(columns, text)
+
+
+def write_compact_rows(path: Path, rows: Iterable[Sequence]) -> Path:
+    """Spill compact rows to a header-less CSV (ints as decimals; fast to write and re-read)."""
+    with Path(path).open("w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+    return Path(path)
+
+
+class _Sink:
+    """One physical output file (CSV handle or Parquet writer) plus its column buffer."""
+
+    def __init__(self, path: Path, fieldnames: Sequence[str], fmt: str, timestamp_fields: Sequence[str],
+                 columns: Optional[Sequence[Column]] = None):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.fmt = fmt
+        self.timestamp_fields = set(timestamp_fields)
+        self.columns: Dict[str, list] = {c: [] for c in self.fieldnames}
+        # Compact rows are buffered columnar instead (EventWriter(columns=...))
+        self.buffer = EventBuffer(columns) if columns else None
+        self.n_buffered = 0
+        self._fh = None
+        self._csv = None
+        self._pq = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def append_compact(self, row: Sequence) -> None:
+        self.buffer.append(row)
+        self.n_buffered += 1
+
+    def extend_compact(self, columns: Mapping[str, Sequence], n: int) -> None:
+        self.buffer.append_columns(columns)
+        self.n_buffered += n
+
+    def extend(self, columns: Mapping[str, Sequence]) -> int:
+        n = 0
+        for c in self.fieldnames:
+            col = columns[c]
+            self.columns[c].extend(col)
+            n = len(col)
+        self.n_buffered += n
+        return n
+
+    def append(self, row: Mapping) -> None:
+        for c in self.fieldnames:
+            self.columns[c].append(row[c])
+        self.n_buffered += 1
+
+    def flush(self, n: Optional[int] = None) -> None:
+        """Write the first n buffered rows (all when n is None) as one CSV block / row group."""
+        if not self.n_buffered:
+            return
+        if self.buffer is not None:
+            self._flush_compact(n)
+            return
+        if n is not None and n < self.n_buffered:
+            keep = {c: col[n:] for c, col in self.columns.items()}
+            self.columns = {c: col[:n] for c, col in self.columns.items()}
+            self.n_buffered, rest = n, self.n_buffered - n
+        else:
+            keep, rest = None, 0
+        if self.fmt == "csv":
+            self._open_csv()
+            self._csv.writerows(zip(*(self.columns[c] for c in self.fieldnames)))
+        else:
+            table = self._to_arrow()
+            if self._pq is None:
+                self._pq = pq.ParquetWriter(str(self.path), table.schema)
+            self._pq.write_table(table, row_group_size=len(table))
+        self.columns = keep if keep is not None else {c: [] for c in self.fieldnames}
+        self.n_buffered = rest
+
+    def _flush_compact(self, n: Optional[int]) -> None:
+        head, rest = (self.buffer.split(n) if n is not None and n < self.n_buffered
+                      else (self.buffer, None))
+        if self.fmt == "csv":
+            self._open_csv()
+            self._csv.writerows(head.text_rows())
+        else:
+            table = head.to_arrow(self.timestamp_fields)
+            if self._pq is None:
+                self._pq = pq.ParquetWriter(str(self.path), table.schema)
+            self._pq.write_table(table, row_group_size=len(table))
+        self.buffer = rest if rest is not None else head._empty_like()
+        self.n_buffered = len(self.buffer)
+
+    def _open_csv(self) -> None:
+        if self._fh is None:
+            self._fh = self.path.open("w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._fh)
+            self._csv.writerow(self.fieldnames)
+
+    def _to_arrow(self):
+        arrays = []
+        for c in self.fieldnames:
+            # Empty strings become NULL so Parquet reads back like the CSV (read_csv_auto)
+            values = [v if isinstance(v, str) and v else (None if v is None or v == "" else str(v))
+                      for v in self.columns[c]]
+            arr = pa.array(values, type=pa.string())
+            if c in self.timestamp_fields:
+                arr = pc.assume_timezone(pc.strptime(arr, format=ISO_TS_FORMAT, unit="s"), "UTC")
+            arrays.append(arr)
+        return pa.Table.from_arrays(arrays, names=self.fieldnames)
+
+    def close(self) -> None:
+        self.flush()
+        if self._fh is not None:
+            self._fh.close()
+        if self._pq is not None:
+            self._pq.close()
+
+
+class EventWriter:
+    """
+    Streaming event writer with bounded buffers.
+
+      - fieldnames: output columns, in order.
+      - fmt: "csv" | "parquet" (None = infer from `out`).
+      - chunk_rows: rows buffered in memory before a flush (CSV block / Parquet row group;
+        unpartitioned output always gets exactly chunk_rows rows per row group).
+      - partition_field: ISO timestamp column to partition by event date; `out` is then a
+        directory holding one `event_date=YYYY-MM-DD/<part_name>.<ext>` file per day.
+      - timestamp_fields: ISO-8601 "…Z" columns stored as UTC timestamps in Parquet.
+      - columns: Column specs (names = fieldnames) for compact rows: append() /
+        append_columns() then buffer them columnar and format strings only when flushing.
+    """
+
+    def __init__(
+        self,
+        out: Path,
+        fieldnames: Sequence[str],
+        fmt: Optional[str] = None,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        partition_field: Optional[str] = None,
+        timestamp_fields: Sequence[str] = (),
+        part_name: str = "part-00000",
+        columns: Optional[Sequence[Column]] = None,
+    ):
+        self.out = Path(out)
+        self.fieldnames = list(fieldnames)
+        if columns is not None and [c.name for c in columns] != self.fieldnames:
+            raise ValueError("columns must describe fieldnames, in order.")
+        self.columns = list(columns) if columns is not None else None
+        self.fmt = resolve_format(self.out, fmt)
+        if self.fmt == "parquet" and pa is None:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow).")
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.partition_field = partition_field
+        self._partition_idx = self.fieldnames.index(partition_field) if partition_field else None
+        self.timestamp_fields = list(timestamp_fields)
+        self.part_name = part_name
+        self.rows_written = 0
+        self._sinks: Dict[str, _Sink] = {}
+        self._n_buffered = 0
+
+    # --- sinks ---
+    def _sink(self, key: str) -> _Sink:
+        sink = self._sinks.get(key)
+        if sink is None:
+            if self.partition_field:
+                path = self.out / f"event_date={key}" / f"{self.part_name}.{self.fmt}"
+            else:
+                path = self.out
+            sink = _Sink(path, self.fieldnames, self.fmt, self.timestamp_fields, self.columns)
+            self._sinks[key] = sink
+        return sink
+
+    def _maybe_flush(self) -> None:
+        if self._n_buffered < self.chunk_rows:
+            return
+        if self.partition_field:
+            self.flush()
+        else:
+            # Exactly chunk_rows per block/row group, however rows arrive (row vs batch writes)
+            sink = self._sinks[""]
+            while sink.n_buffered >= self.chunk_rows:
+                sink.flush(self.chunk_rows)
+            self._n_buffered = sink.n_buffered
+
+    # --- public API ---
+    def write(self, row: Mapping) -> None:
+        """Buffer one event given as a mapping of fieldname -> value."""
+        self._check_compact(False)
+        key = str(row[self.partition_field])[:10] if self.partition_field else ""
+        self._sink(key).append(row)
+        self._n_buffered += 1
+        self.rows_written += 1
+        self._maybe_flush()
+
+    def write_rows(self, rows: Iterable[Mapping]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def write_columns(self, columns: Mapping[str, Sequence]) -> None:
+        """Buffer a columnar batch ({fieldname: sequence}); e.g. one NumPy-engine batch."""
+        self._check_compact(False)
+        cols = {c: list(columns[c]) for c in self.fieldnames}
+        n = len(cols[self.fieldnames[0]])
+        if self.partition_field:
+            groups: Dict[str, List[int]] = {}
+            for i, ts in enumerate(cols[self.partition_field]):
+                groups.setdefault(str(ts)[:10], []).append(i)
+            for key, idx in groups.items():
+                self._sink(key).extend({c: [cols[c][i] for i in idx] for c in self.fieldnames})
+        else:
+            self._sink("").extend(cols)
+        self._n_buffered += n
+        self.rows_written += n
+        self._maybe_flush()
+
+    def append(self, row: Sequence) -> None:
+        """Buffer one compact event: values in column order (needs columns=...)."""
+        self._check_compact(True)
+        key = iso_date(row[self._partition_idx]) if self.partition_field else ""
+        self._sink(key).append_compact(row)
+        self._n_buffered += 1
+        self.rows_written += 1
+        self._maybe_flush()
+
+    def append_columns(self, columns: Mapping[str, Sequence]) -> None:
+        """Buffer a columnar batch of compact events ({name: NumPy array}; needs columns=...)."""
+        self._check_compact(True)
+        n = len(columns[self.fieldnames[0]])
+        if self.partition_field:
+            ts = np.asarray(columns[self.partition_field])
+            if np.issubdtype(ts.dtype, np.datetime64):
+                ts = ts.astype("datetime64[s]").astype(np.int64)
+            days = ts // 86400
+            for day in np.unique(days):
+                idx = np.nonzero(days == day)[0]
+                self._sink(iso_date(int(day) * 86400)).extend_compact(
+                    {c: np.asarray(columns[c])[idx] for c in self.fieldnames}, len(idx))
+        else:
+            self._sink("").extend_compact(columns, n)
+        self._n_buffered += n
+        self.rows_written += n
+        self._maybe_flush()
+
+    def _check_compact(self, compact: bool) -> None:
+        if compact != (self.columns is not None):
+            raise TypeError("append()/append_columns() take compact rows and need columns=...; "
+                            "write()/write_columns() take formatted values and need columns=None.")
+
+    def flush(self) -> None:
+        for sink in self._sinks.values():
+            sink.flush()
+        self._n_buffered = 0
+
+    def close(self) -> None:
+        for sink in self._sinks.values():
+            sink.close()
+        if not self._sinks and not self.partition_field:
+            # Still produce a header-only file / empty table for zero events
+            self._sink("").close()
+
+    @property
+    def paths(self) -> List[Path]:
+        return [s.path for s in self._sinks.values()]
+
+    def __enter__(self) -> "EventWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ----------------------------
+# External merge sort
+# ----------------------------
+
+def external_sort(
+    rows: Iterable[Sequence[str]],
+    key: Callable[[Sequence[str]], object],
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    tmp_dir: Optional[str] = None,
+    fan_in: int = MERGE_FAN_IN,
+) -> Iterator[tuple]:
+    """
+    Yield `rows` (sequences of strings) ordered by `key` using at most ~chunk_rows rows of memory.
+
+      - Rows are collected into runs of chunk_rows, each run is sorted and spilled to a temp CSV.
+      - Runs are merged with heapq.merge (k-way, one row per run in memory), at most fan_in
+        runs at a time (see merge_runs), so open files stay bounded too.
+      - Stable: ties keep input order, so the result equals sorted(rows, key=key).
+      - If everything fits in a single run, no temp files are written.
+    """
+    chunk_rows = max(1, int(chunk_rows))
+    with tempfile.TemporaryDirectory(prefix="extsort_", dir=tmp_dir) as tmp:
+        run_paths: List[Path] = []
+        buf: List[tuple] = []
+        for row in rows:
+            buf.append(tuple(row))
+            if len(buf) >= chunk_rows:
+                run_paths.append(_spill_run(sorted(buf, key=key), Path(tmp), len(run_paths)))
+                buf = []
+
+        if not run_paths:
+            yield from sorted(buf, key=key)
+            return
+        if buf:
+            run_paths.append(_spill_run(sorted(buf, key=key), Path(tmp), len(run_paths)))
+            buf = []
+
+        yield from merge_runs(run_paths, _read_run, key, Path(tmp), fan_in)
+
+
+def _spill_run(rows: List[tuple], tmp: Path, idx: int) -> Path:
+    path = tmp / f"run-{idx:05d}.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+    return path
+
+
+def _read_run(path: Path) -> Iterator[tuple]:
+    with path.open(newline="", encoding="utf-8") as f:
+        yield from map(tuple, csv.reader(f))
+
+
+def merge_runs(
+    run_paths: Sequence[Path],
+    read: Callable[[Path], Iterator[tuple]],
+    key: Callable[[Sequence], object],
+    tmp: Path,
+    fan_in: int = MERGE_FAN_IN,
+) -> Iterator[tuple]:
+    """
+    k-way merge of sorted run files (read(path) streams one), with at most fan_in files open.
+
+    While there are more than fan_in runs, each consecutive group of fan_in runs is merged
+    into an intermediate run in `tmp` (header-less CSV, see write_compact_rows) and its inputs
+    are deleted. heapq.merge breaks ties by iterable order and groups keep run order, so the
+    merge is stable across passes.
+    """
+    fan_in = max(2, int(fan_in))
+    paths = [Path(p) for p in run_paths]
+    n_pass = 0
+    while len(paths) > fan_in:
+        merged = []
+        for i in range(0, len(paths), fan_in):
+            group = paths[i:i + fan_in]
+            out = tmp / f"merge-{n_pass:02d}-{len(merged):05d}.csv"
+            merged.append(write_compact_rows(out, heapq.merge(*(read(p) for p in group), key=key)))
+            for p in group:
+                p.unlink()
+        paths = merged
+        n_pass += 1
+    yield from heapq.merge(*(read(p) for p in paths), key=key)
+
+
+def external_sort_events(
+    rows: Iterable[Sequence],
+    columns: Sequence[Column],
+    by: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    tmp_dir: Optional[str] = None,
+    fan_in: int = MERGE_FAN_IN,
+) -> Iterator[tuple]:
+    """
+    external_sort for compact rows, ordered by column `by` (stable).
+
+    Runs are collected in an EventBuffer, so a run of chunk_rows events costs tens of bytes
+    per event; sorted runs are spilled as compact text and merged back as compact rows.
+    """
+    chunk_rows = max(1, int(chunk_rows))
+    key = itemgetter([c.name for c in columns].index(by))
+    with tempfile.TemporaryDirectory(prefix="extsort_", dir=tmp_dir) as tmp:
+        run_paths: List[Path] = []
+        buf = EventBuffer(columns)
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                run = buf.take(buf.argsort(by))
+                run_paths.append(write_compact_rows(Path(tmp) / f"run-{len(run_paths):05d}.csv", run.rows()))
+                buf = EventBuffer(columns)
+
+        if not run_paths:
+            run, buf = buf.take(buf.argsort(by)), None
+            yield from run.rows()
+            return
+        if len(buf):
+            run = buf.take(buf.argsort(by))
+            run_paths.append(write_compact_rows(Path(tmp) / f"run-{len(run_paths):05d}.csv", run.rows()))
+        buf = None
+        yield from merge_runs(run_paths, lambda p: read_compact_rows(p, columns), key, Path(tmp), fan_in)
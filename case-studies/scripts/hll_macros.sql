@@ -0,0 +1,50 @@
+-- hll_macros.sql
+-- HyperLogLog sketches as DuckDB macros, shared by the approximate-distinct modes of the
+-- retention (sql/approx/) and activation (funnel_approx.sql) case studies.
+--
+-- A sketch has 4096 registers (precision p = 12, relative standard error 1.04 / sqrt(4096) ≈ 1.6%).
+-- It is stored sparse, as a sorted UINTEGER[] with one code per non-empty register:
+--     code = register * 64 + rank
+-- where register is the low 12 bits of hash(x) and rank is 1 + the number of leading zeros
+-- of the remaining 52 bits. Sketches are mergeable: the union of two sets is the per-register
+-- maximum, so week / segment / day rollups merge stored sketches instead of re-scanning rows.
+--
+-- Aggregates (expand to list() aggregates, so use them like COUNT(DISTINCT ...)):
+--   hll_sketch(x)    sketch of the non-NULL values of x in the group (NULL if there are none)
+--   hll_merge(s)     union of the sketches s in the group (NULL sketches are ignored)
+-- Scalars:
+--   hll_estimate(s)  estimated distinct count (0 for NULL / empty)
+--   hll_rse()        relative standard error of one estimate
+
+CREATE OR REPLACE MACRO hll_code(x) AS (
+  (hash(x) & 4095) * 64 + 53
+  - CASE WHEN hash(x) >> 12 = 0 THEN 0 ELSE length(bin(hash(x) >> 12)) END
+)::UINTEGER;
+
+-- Keep the highest code of each register in a sorted code list (pairs each code with its successor)
+CREATE OR REPLACE MACRO hll_compact(codes) AS
+  list_transform(
+    list_filter(list_zip(codes, list_concat(codes[2:], [NULL]), true),
+                p -> p[2] IS NULL OR p[2] // 64 <> p[1] // 64),
+    p -> p[1]);
+
+CREATE OR REPLACE MACRO hll_sketch(x) AS
+  hll_compact(list_sort(list(DISTINCT hll_code(x)) FILTER (WHERE x IS NOT NULL)));
+
+CREATE OR REPLACE MACRO hll_merge(s) AS hll_compact(list_sort(list_distinct(flatten(list(s)))));
+
+-- Raw HLL estimate alpha_m * m^2 / sum(2^-rank); empty registers count 2^0
+CREATE OR REPLACE MACRO hll_raw(s) AS
+  0.7213 / (1 + 1.079 / 4096) * 4096 * 4096
+  / (4096 - len(s) + list_sum(list_transform(s, c -> pow(2.0, -(c % 64)::INTEGER))));
+
+-- Linear counting while registers are still empty and the raw estimate is small (<= 2.5 m).
+-- The 64-bit hash needs no large-range correction.
+CREATE OR REPLACE MACRO hll_estimate(s) AS
+  CASE
+    WHEN s IS NULL OR len(s) = 0 THEN 0
+    WHEN len(s) < 4096 AND hll_raw(s) <= 2.5 * 4096 THEN round(4096 * ln(4096 / (4096 - len(s))))::BIGINT
+    ELSE round(hll_raw(s))::BIGINT
+  END;
+
+CREATE OR REPLACE MACRO hll_rse() AS 1.04 / sqrt(4096);
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+replay_stream.py
+
+Replay a generated event log as a paced, time-ordered stream, e.g. to load-test an
+ingestion endpoint with the output of generate_mock_data.py --load_profile.
+
+  - Input: a CSV or Parquet file, or a directory of them (e.g. --partition_by_date or
+    --shard_files output). Every file is read in its own order and the files are k-way
+    merged on --time_field (default received_at when present, else occurred_at), so nothing
+    is sorted or loaded in full. Rows that are behind the merged stream are sent
+    right away and counted as out of order.
+  - Pacing: --rate is the target mean events/sec. With --pace shape (default), the log's own
+    timeline is compressed by one speedup factor, so diurnal peaks, bursts and quiet nights
+    keep their relative shape and the peak rate is higher than --rate. With --pace flat,
+    events go out evenly at exactly --rate. --speedup sets the compression directly (1 =
+    real time). --rate 0 sends as fast as possible.
+  - Output (--to): stdout (-), a file, tcp://host:port or unix:///path/to.sock (the receiver
+    must already be listening), as CSV lines (header first) or NDJSON.
+  - A pre-pass in DuckDB counts the events and reports the log's natural and the replay's
+    expected mean and peak (busiest second) rates; the achieved rate is reported at the end.
+    Progress goes to stderr, so stdout can carry the stream.
+
+Usage:
+  python case-studies/escaly-activation-funnel/generate_mock_data.py --n_users 20000 --load_profile \\
+    --out load_events.csv
+  python case-studies/scripts/replay_stream.py --data load_events.csv --rate 2000 --to tcp://127.0.0.1:9000
+  python case-studies/scripts/replay_stream.py --data load_events.csv --rate 0 --format ndjson --to replay.ndjson
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import heapq
+import json
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import duckdb
+
+FETCH_ROWS = 10_000
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"  # generate_mock_data.py's text timestamps
+
+
+def log(msg: str) -> None:
+    print(msg, file=sys.stderr, flush=True)
+
+
+# -------------------------
+# Input
+# -------------------------
+
+def input_files(data: Path) -> List[Path]:
+    """The event files of --data: the file itself, or every Parquet (else CSV) file under the directory."""
+    if data.is_file():
+        return [data]
+    files = sorted(data.rglob("*.parquet")) or sorted(data.rglob("*.csv"))
+    if not files:
+        raise SystemExit(f"No Parquet or CSV files under {data}.")
+    return files
+
+
+def scan(path: Path) -> str:
+    """DuckDB table function reading one file (CSV as text, so rows are replayed as written)."""
+    if path.suffix == ".parquet":
+        return f"read_parquet('{path.as_posix()}', hive_partitioning=false)"
+    return f"read_csv('{path.as_posix()}', header=true, all_varchar=true)"
+
+
+def columns(con, path: Path) -> List[Tuple[str, str]]:
+    return [(r[0], r[1]) for r in con.execute(f"DESCRIBE SELECT * FROM {scan(path)}").fetchall()]
+
+
+def select_sql(cols: List[Tuple[str, str]], time_field: str, path: Path) -> str:
+    """Output columns (timestamps as ISO text) plus the epoch seconds of time_field as the last column."""
+    exprs = [f"strftime(\"{name}\", '{TIME_FORMAT}') AS \"{name}\"" if dtype.startswith("TIMESTAMP")
+             else f"\"{name}\"" for name, dtype in cols]
+    exprs.append(f"epoch(CAST(\"{time_field}\" AS TIMESTAMPTZ)) AS _t")
+    return f"SELECT {', '.join(exprs)} FROM {scan(path)}"
+
+
+def read_rows(con, sql: str) -> Iterator[tuple]:
+    cur = con.cursor()
+    cur.execute(sql)
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        yield from rows
+
+
+def profile(con, sqls: List[str], speedup: Optional[float]) -> Tuple[int, float, float, int]:
+    """(events, first time, last time, busiest replay second) of the log; the second is natural without speedup."""
+    union = " UNION ALL ".join(f"SELECT _t FROM ({s})" for s in sqls)
+    n, t0, t1 = con.execute(f"SELECT COUNT(*), MIN(_t), MAX(_t) FROM ({union})").fetchone()
+    if not n:
+        return 0, 0.0, 0.0, 0
+    window = speedup or 1.0
+    peak = con.execute(f"SELECT MAX(c) FROM (SELECT COUNT(*) AS c FROM ({union}) "
+                       f"GROUP BY FLOOR((_t - {t0}) / {window}))").fetchone()[0]
+    return n, t0, t1, peak
+
+
+# -------------------------
+# Output
+# -------------------------
+
+@contextmanager
+def open_target(to: str):
+    """Text stream for --to: '-', a file path, tcp://host:port or unix:///path."""
+    if to == "-":
+        yield sys.stdout
+        return
+    if to.startswith(("tcp://", "unix://")):
+        try:
+            if to.startswith("tcp://"):
+                host, _, port = to[len("tcp://"):].rpartition(":")
+                sock = socket.create_connection((host or "127.0.0.1", int(port)))
+            else:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(to[len("unix://"):])
+        except OSError as e:
+            raise SystemExit(f"Cannot connect to {to}: {e}")
+        with sock, sock.makefile("w", encoding="utf-8", newline="") as f:
+            yield f
+        return
+    Path(to).parent.mkdir(parents=True, exist_ok=True)
+    with open(to, "w", encoding="utf-8", newline="") as f:
+        yield f
+
+
+def line_writer(f, names: List[str], fmt: str):
+    """Function writing one row (without its _t column) to f as CSV or NDJSON."""
+    if fmt == "ndjson":
+        return lambda row: f.write(json.dumps(dict(zip(names, row))) + "\n")
+    w = csv.writer(f, lineterminator="\n")
+    w.writerow(names)
+    n = len(names)
+    return lambda row: w.writerow(row[:n])
+
+
+# -------------------------
+# Replay
+# -------------------------
+
+def replay(rows: Iterator[tuple], write, f, t0: float, n: int, rate: float, speedup: Optional[float],
+           pace: str) -> Tuple[int, int, float]:
+    """Send rows on schedule; returns (sent, out of order, seconds)."""
+    sent = late = 0
+    last_t = t0
+    start = time.perf_counter()
+    for row in rows:
+        t = row[-1]
+        if t < last_t:
+            late += 1
+        else:
+            last_t = t
+        if rate or speedup:
+            due = sent / rate if pace == "flat" else (last_t - t0) / speedup
+            ahead = due - (time.perf_counter() - start)
+            if ahead > 0.001:
+                f.flush()
+                time.sleep(ahead)
+        write(row)
+        sent += 1
+        if sent % 100_000 == 0:
+            log(f"   ⏩ {sent:,}/{n:,} events, {sent / (time.perf_counter() - start):,.0f} eps")
+    f.flush()
+    return sent, late, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an event log as a paced, time-ordered stream.")
+    parser.add_argument("--data", type=str, required=True, help="Event CSV/Parquet file or a directory of them")
+    parser.add_argument("--time_field", type=str, default=None,
+                        help="Timestamp that orders and paces the stream (default received_at, else occurred_at)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Target mean events/sec (0 = as fast as possible)")
+    parser.add_argument("--speedup", type=float, default=None,
+                        help="Compress the log's timeline by this factor instead of --rate (1 = real time)")
+    parser.add_argument("--pace", choices=["shape", "flat"], default="shape",
+                        help="shape: keep the log's peaks and lulls; flat: constant --rate")
+    parser.add_argument("--to", type=str, default="-", help="'-' (stdout), a file, tcp://host:port or unix:///path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv", help="Line format of the stream")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many events")
+    args = parser.parse_args()
+    if args.speedup is not None and (args.speedup <= 0 or args.pace == "flat"):
+        raise SystemExit("--speedup must be > 0 and only applies to --pace shape.")
+    if args.rate < 0:
+        raise SystemExit("--rate must be >= 0.")
+
+    files = input_files(Path(args.data))
+    con = duckdb.connect()
+    con.execute("SET TimeZone = 'UTC'")
+    cols = columns(con, files[0])
+    names = [name for name, _ in cols]
+    time_field = args.time_field or ("received_at" if "received_at" in names else "occurred_at")
+    if time_field not in names:
+        raise SystemExit(f"No {time_field} column in {files[0]}; columns: {names}")
+    sqls = [select_sql(cols, time_field, p) for p in files]
+
+    total, t0, t1, _ = profile(con, sqls, None)
+    if not total:
+        raise SystemExit(f"No events in {args.data}.")
+    n = total if args.limit is None else min(total, args.limit)
+    span = max(t1 - t0, 1.0)
+    speedup = args.speedup
+    if speedup is None and args.rate and args.pace == "shape":
+        speedup = span * args.rate / total  # --limit replays a prefix at the whole log's pace
+    _, _, _, peak = profile(con, sqls, speedup)
+    log(f"📥 {total:,} events in {len(files)} file(s) over {span / 86400:,.1f} days by {time_field}: "
+        f"natural mean {total / span:,.2f} eps")
+    if args.pace == "flat" and args.rate:
+        log(f"⏱️ Flat pace: {args.rate:,.0f} eps for ~{n / args.rate:,.0f}s")
+    elif speedup:
+        log(f"⏱️ Speedup x{speedup:,.0f}: mean {total * speedup / span:,.0f} eps, busiest second ~{peak:,} events, "
+            f"~{span / speedup:,.0f}s")
+    else:
+        log("⏱️ Unpaced: as fast as possible")
+
+    streams = [read_rows(con, s) for s in sqls]
+    rows = streams[0] if len(streams) == 1 else heapq.merge(*streams, key=itemgetter(-1))
+    if args.limit is not None:
+        rows = (row for _, row in zip(range(args.limit), rows))
+    try:
+        with open_target(args.to) as f:
+            write = line_writer(f, names, args.format)
+            sent, late, secs = replay(rows, write, f, t0, n, args.rate, speedup, args.pace)
+    except (BrokenPipeError, ConnectionResetError) as e:
+        raise SystemExit(f"Receiver closed the stream: {e}")
+    log(f"✅ Sent {sent:,} events to {args.to} in {secs:,.1f}s ({sent / max(secs, 1e-9):,.0f} eps"
+        f"{f', {late:,} out of order' if late else ''})")
+
+
+if __name__ == "__main__":
+    main()
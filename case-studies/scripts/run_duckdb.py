@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+run_duckdb.py
+
+Run activation-funnel SQL files against a cached, typed `mock_events` table.
+
+  - mock_data.csv (or a Parquet file / partitioned directory from the generator) is
+    loaded once into a persistent DuckDB database with occurred_at typed as TIMESTAMP
+    (UTC) and rows sorted by (user_id, occurred_at), so per-user scans and joins hit
+    contiguous row groups.
+  - Later runs reuse the table while the source file is unchanged (size + mtime
+    fingerprint); --rebuild forces a reload.
+  - Any number of SQL files run in one process; each prints its result and timing.
+  - A file may declare shared stages it reads from with a header line such as
+        -- requires: tta_stage.sql
+    (paths relative to the file). Stages may require other stages; each runs once per
+    process, dependencies first, and is timed separately.
+  - Files and stages run through sql_dag.py: those that do not depend on each other run
+    concurrently (--jobs), and a stage whose SQL, upstream stages, mock_events source and
+    variables are unchanged since the last run on this database is skipped (--no_cache
+    re-runs it). Query files (ending in a SELECT) always run.
+  - --set name=value defines DuckDB variables the SQL reads with getvariable(), e.g.
+    --set session_timeout_min=45 for sessions_stage.sql.
+
+Usage (from case-studies/escaly-activation-funnel):
+  python ../scripts/run_duckdb.py funnel.sql
+  python ../scripts/run_duckdb.py funnel.sql time_to_activation.sql time_to_activation_by_segment.sql
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+import duckdb
+
+FUNNEL_DIR = Path(__file__).resolve().parents[1] / "escaly-activation-funnel"
+DEFAULT_DATA = FUNNEL_DIR / "mock_data.csv"
+TABLE = "mock_events"
+REQUIRES_RE = re.compile(r"^--\s*requires:\s*(.+)$", re.MULTILINE)
+
+
+def source_fingerprint(path: Path):
+    if path.is_dir():
+        files = sorted(path.rglob("*.parquet"))
+        return str(path.resolve()), sum(f.stat().st_size for f in files), max((f.stat().st_mtime_ns for f in files), default=0)
+    st = os.stat(path)
+    return str(path.resolve()), st.st_size, st.st_mtime_ns
+
+
+def source_sql(path: Path) -> str:
+    if path.is_dir():
+        return f"SELECT * EXCLUDE (event_date) FROM read_parquet('{path.as_posix()}/**/*.parquet', hive_partitioning=true)"
+    if path.suffix.lower() in (".parquet", ".pq"):
+        return f"SELECT * FROM read_parquet('{path.as_posix()}')"
+    return (f"SELECT * FROM read_csv('{path.as_posix()}', header=true, "
+            f"types={{'occurred_at': 'TIMESTAMP'}})")
+
+
+def is_cached(con, path: Path) -> bool:
+    has_manifest = con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'source_manifest'"
+    ).fetchone()[0]
+    if not has_manifest:
+        return False
+    row = con.execute("SELECT path, size_bytes, mtime_ns FROM source_manifest").fetchone()
+    return row is not None and tuple(row) == source_fingerprint(path)
+
+
+def load_events(con, path: Path, rebuild: bool = False) -> bool:
+    """(Re)build the typed, sorted mock_events table unless it is cached; returns True if loaded."""
+    if not rebuild and is_cached(con, path):
+        return False
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {TABLE} AS
+        SELECT * REPLACE (occurred_at::TIMESTAMP AS occurred_at)
+        FROM ({source_sql(path)})
+        ORDER BY user_id, occurred_at
+    """)
+    fp = source_fingerprint(path)
+    con.execute(
+        "CREATE OR REPLACE TABLE source_manifest AS "
+        "SELECT ?::VARCHAR AS path, ?::BIGINT AS size_bytes, ?::BIGINT AS mtime_ns",
+        list(fp),
+    )
+    return True
+
+
+def required_stages(sql_path: Path):
+    """Stage files named in `-- requires:` header lines, resolved next to sql_path."""
+    text = sql_path.read_text(encoding="utf-8")
+    return [sql_path.parent / name.strip()
+            for line in REQUIRES_RE.findall(text) for name in line.split(",") if name.strip()]
+
+
+def stage_order(sql_path: Path, done: set) -> list:
+    """Stages sql_path needs that have not run yet, dependencies first (depth-first)."""
+    order = []
+
+    def visit(path: Path, stack: tuple):
+        for stage in required_stages(path):
+            key = stage.resolve()
+            if key in stack:
+                raise ValueError(f"Circular '-- requires:' between {path.name} and {stage.name}.")
+            if key in done:
+                continue
+            visit(stage, stack + (key,))
+            done.add(key)
+            order.append(stage)
+
+    visit(sql_path, (sql_path.resolve(),))
+    return order
+
+
+def parse_variables(assignments) -> dict:
+    """{name: value} from --set name=value pairs (numbers stay numeric)."""
+    variables = {}
+    for item in assignments:
+        name, sep, value = item.partition("=")
+        if not sep or not re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", name.strip()):
+            raise ValueError(f"--set expects name=value, got {item!r}.")
+        variables[name.strip()] = _coerce(value.strip())
+    return variables
+
+
+def _coerce(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def run_file(con, sql_path: Path):
+    """Execute every statement in a SQL file; returns (last result DataFrame or None, seconds)."""
+    t0 = time.perf_counter()
+    result = con.execute(sql_path.read_text(encoding="utf-8"))
+    df = result.fetchdf() if result.description else None
+    return df, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run funnel SQL files against a cached, typed mock_events table.")
+    parser.add_argument("sql", nargs="+", help="SQL files to run, in order")
+    parser.add_argument("--data", type=str, default=str(DEFAULT_DATA),
+                        help="Events CSV, Parquet file or partitioned Parquet directory")
+    parser.add_argument("--db", type=str, default=None,
+                        help="DuckDB file holding mock_events (default: <data>.duckdb next to the data)")
+    parser.add_argument("--memory", action="store_true", help="Use an in-memory database (no cache)")
+    parser.add_argument("--rebuild", action="store_true", help="Reload mock_events even if the cache is fresh")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="DuckDB variable for the SQL (getvariable), e.g. session_timeout_min=45")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1),
+                        help="SQL files / stages that do not depend on each other run concurrently")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Re-run stages even if their SQL, inputs and variables are unchanged")
+    args = parser.parse_args()
+    from sql_dag import run_dag  # sql_dag imports this module
+
+    data = Path(args.data)
+    db = ":memory:" if args.memory else (args.db or str(data.with_suffix(".duckdb")))
+    con = duckdb.connect(db)
+    con.execute("SET TimeZone = 'UTC'")
+    variables = parse_variables(args.set)
+
+    t0 = time.perf_counter()
+    loaded = load_events(con, data, rebuild=args.rebuild)
+    n = con.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+    verb = "Loaded" if loaded else "Reused cached"
+    print(f"📦 {verb} {TABLE} ({n:,} rows) from {data} in {time.perf_counter() - t0:.3f}s [{db}]")
+
+    t0 = time.perf_counter()
+    manifest = con.execute("SELECT path, size_bytes, mtime_ns FROM source_manifest").fetchone()
+    runs = run_dag(con, [Path(p) for p in args.sql], jobs=args.jobs, force=args.no_cache,
+                   variables=variables, inputs={TABLE: ":".join(map(str, manifest))})
+    wall = time.perf_counter() - t0
+    queries = {Path(p).resolve() for p in args.sql}
+    for run in runs:
+        path = run.stage.path
+        if path.resolve() not in queries:
+            state = "unchanged, skipped" if run.status == "cached" else f"{run.seconds * 1000:.1f} ms"
+            print(f"\n⚙️ Stage {path.name} ({state})")
+            continue
+        print(f"\n=== {path.name} ({run.seconds * 1000:.1f} ms) ===")
+        if run.result is not None:
+            print(run.result.to_markdown(index=False))
+    print(f"\n⏱ {len(args.sql)} queries in {wall * 1000:.1f} ms ({args.jobs} jobs)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+sharding.py
+
+Deterministic sharding helpers for the case-study mock-data generators.
+
+  - Entities (accounts / users) are split into fixed-size shards. The shard
+    layout depends only on --shard-size, never on the number of workers.
+  - Each shard gets its own seed derived from the run seed (shard 0 keeps the
+    run seed itself, so small runs reproduce the single-stream output).
+  - Shards run in a process pool and results come back in shard order, which
+    makes the merged output byte-identical for any --workers value.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_SHARD_SIZE = 100_000
+
+
+def shard_ranges(n: int, shard_size: int = DEFAULT_SHARD_SIZE) -> List[Tuple[int, int, int]]:
+    """Return [(shard_idx, lo, hi)] covering range(n) in fixed-size, half-open shards."""
+    shard_size = max(1, int(shard_size))
+    return [(k, lo, min(lo + shard_size, n)) for k, lo in enumerate(range(0, n, shard_size))]
+
+
+def shard_seed(seed: int, shard_idx: int) -> int:
+    """Per-shard seed: the run seed for shard 0, a stable 64-bit hash of (seed, shard) otherwise."""
+    if shard_idx == 0:
+        return seed
+    digest = hashlib.sha256(f"{seed}:{shard_idx}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def map_shards(fn: Callable[[T], R], tasks: Sequence[T], workers: int = 1) -> Iterator[R]:
+    """Run fn over tasks (in a process pool when workers > 1) and yield results in task order."""
+    workers = max(1, int(workers))
+    if workers == 1 or len(tasks) <= 1:
+        for t in tasks:
+            yield fn(t)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        yield from pool.map(fn, tasks)
+
+
+def read_csv_rows(path: Path) -> Iterator[tuple]:
+    """Stream a header-prefixed CSV (e.g. a shard spill file) as tuples, skipping the header."""
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            yield tuple(row)
+
+
+def concat_rows(paths: Iterable[Path]) -> Iterator[tuple]:
+    """Concatenate shard CSV files in the given (shard) order."""
+    for p in paths:
+        yield from read_csv_rows(p)
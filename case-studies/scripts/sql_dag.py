@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+sql_dag.py
+
+Run case-study SQL stages as a dependency graph: independent stages run concurrently and
+stages whose inputs have not changed since the last run are skipped.
+
+  - Dependencies are read from the SQL. A stage *writes* the objects it creates, replaces,
+    inserts into, updates, deletes from or drops (tables, views, macros), and *reads* every
+    object written by an earlier stage that its text mentions. A stage depends on the
+    earlier stages that write what it reads or writes, and on those that read what it
+    writes, so the listed order is always a valid order. `-- requires:` headers (see
+    run_duckdb.py) add the named files as stages with an explicit edge.
+  - Ready stages run on up to --jobs worker threads, each on its own cursor of the same
+    database. TEMP objects are per cursor, so a stage must not read another stage's TEMP
+    objects; DuckDB variables are re-applied on every cursor.
+  - Variables are read when a statement runs, so a view or COPY target that must keep a
+    value after the run (e.g. a file path in a persisted --db) takes it as a literal:
+    run_dag(literals=...) writes the value into the SQL text in place of getvariable('name').
+  - Each stage gets a fingerprint: the hash of its SQL text, its upstream stages'
+    fingerprints, the size + mtime of files it reads (read_csv / read_parquet literals),
+    the values of the variables it reads (getvariable) and the fingerprints of external
+    input tables it mentions. Fingerprints are stored in `dag_state`; a stage whose
+    fingerprint is unchanged and whose objects still exist is skipped. Running a stage
+    forgets the stored fingerprints of other stages that write the same objects. Stages
+    that end with a SELECT return a result and always run.
+
+Usage (from the repo root):
+  python case-studies/scripts/sql_dag.py --db retention.duckdb \\
+    case-studies/escaly-retention-cohorts/sql/00_setup.sql case-studies/escaly-retention-cohorts/sql/0[1-5]_*.sql
+  python case-studies/scripts/sql_dag.py --plan case-studies/escaly-activation-funnel/time_to_activation.sql
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import duckdb
+
+from run_duckdb import parse_variables, required_stages
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+STATE_TABLE = "dag_state"
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IDENT_RE = re.compile(r"\b[a-z_][a-z0-9_]*\b")
+_CREATE_RE = re.compile(
+    r"\bcreate\s+(?:or\s+replace\s+)?(temp\s+|temporary\s+)?(?:table|view|macro)\s+(?:if\s+not\s+exists\s+)?([a-z_]\w*)")
+_MUTATE_RE = re.compile(
+    r"\binsert\s+(?:or\s+\w+\s+)?into\s+([a-z_]\w*)|\bdelete\s+from\s+([a-z_]\w*)|\bupdate\s+([a-z_]\w*)\s+set\b")
+_DROP_RE = re.compile(r"\bdrop\s+(?:table|view|macro)\s+(?:if\s+exists\s+)?([a-z_]\w*)")
+_READ_FILE_RE = re.compile(r"\b(?:read_csv\w*|read_parquet|parquet_scan|read_json\w*)\(\s*'([^']+)'", re.IGNORECASE)
+_COPY_TO_RE = re.compile(r"\bTO\s+'([^']+)'", re.IGNORECASE)
+_VARIABLE_RE = re.compile(r"getvariable\(\s*'([^']+)'\s*\)", re.IGNORECASE)
+
+
+@dataclass
+class Stage:
+    path: Path
+    sql: str
+    writes: set
+    creates: set
+    temp: set
+    tokens: set
+    files: List[str]
+    variables: List[str]
+    requires: List[Path]
+    deps: List["Stage"] = field(default_factory=list)
+    reads: set = field(default_factory=set)
+    fingerprint: str = ""
+
+    @property
+    def name(self) -> str:
+        try:
+            return self.path.resolve().relative_to(REPO_ROOT).as_posix()
+        except ValueError:
+            return self.path.as_posix()
+
+
+@dataclass
+class StageRun:
+    stage: Stage
+    status: str  # "ran" | "cached"
+    seconds: float = 0.0
+    result: Optional[object] = None  # DataFrame of a stage ending with a SELECT
+
+
+# -------------------------
+# Parsing and planning
+# -------------------------
+
+def inline_literals(sql: str, literals: Optional[Dict[str, str]] = None) -> str:
+    """sql with getvariable('name') replaced by the quoted string literal of literals[name]."""
+    if not literals:
+        return sql
+
+    def literal(m):
+        if m.group(1) not in literals:
+            return m.group(0)
+        return "'" + str(literals[m.group(1)]).replace("'", "''") + "'"
+
+    return _VARIABLE_RE.sub(literal, sql)
+
+
+def parse_stage(path: Path, literals: Optional[Dict[str, str]] = None) -> Stage:
+    sql = inline_literals(path.read_text(encoding="utf-8"), literals)
+    code = _COMMENT_RE.sub(" ", sql)
+    bare = _STRING_RE.sub("''", code).lower()
+    creates, temp = set(), set()
+    for is_temp, name in _CREATE_RE.findall(bare):
+        (temp if is_temp else creates).add(name)
+    mutated = {n for groups in _MUTATE_RE.findall(bare) for n in groups if n}
+    dropped = set(_DROP_RE.findall(bare))
+    written = set(_COPY_TO_RE.findall(code))
+    files = sorted({f for f in _READ_FILE_RE.findall(code) if not any(f.startswith(w) for w in written)})
+    return Stage(
+        path=path, sql=sql,
+        writes=(creates | mutated | dropped) - temp,
+        creates=creates - dropped,
+        temp=temp,
+        tokens=set(_IDENT_RE.findall(bare)),
+        files=files,
+        variables=sorted(set(_VARIABLE_RE.findall(code))),
+        requires=required_stages(path),
+    )
+
+
+def plan(paths: List[Path], literals: Optional[Dict[str, str]] = None) -> List[Stage]:
+    """Stages of paths (with their `-- requires:` stages first), in order, with dependencies."""
+    stages: List[Stage] = []
+    by_key: Dict[Path, Stage] = {}
+
+    def add(path: Path, stack: tuple):
+        key = path.resolve()
+        if key in by_key:
+            return by_key[key]
+        if key in stack:
+            raise ValueError(f"Circular '-- requires:' through {path.name}.")
+        stage = parse_stage(path, literals)
+        required = [add(p, stack + (key,)) for p in stage.requires]
+        stage.deps = list(required)
+        by_key[key] = stage
+        stages.append(stage)
+        return stage
+
+    for path in paths:
+        add(Path(path), ())
+
+    for i, stage in enumerate(stages):
+        earlier_writes = set().union(*(s.writes for s in stages[:i])) if i else set()
+        stage.reads = (stage.tokens & earlier_writes) - stage.temp
+        for prev in stages[:i]:
+            if prev in stage.deps:
+                continue
+            if prev.temp & stage.tokens - stage.temp - stage.writes:
+                raise ValueError(f"{stage.name} reads TEMP objects of {prev.name}; make them regular tables.")
+            if prev.writes & (stage.reads | stage.writes) or prev.reads & stage.writes:
+                stage.deps.append(prev)
+    return stages
+
+
+def file_fingerprint(pattern: str) -> str:
+    if any(ch in pattern for ch in "*?["):
+        files = sorted(Path(f) for f in glob.glob(pattern, recursive=True) if os.path.isfile(f))
+    elif Path(pattern).is_dir():
+        files = sorted(f for f in Path(pattern).rglob("*") if f.is_file())
+    else:
+        files = [Path(pattern)] if Path(pattern).exists() else []
+    if not files:
+        return f"{pattern}:missing"
+    stats = [f.stat() for f in files]
+    return f"{pattern}:{len(files)}:{sum(s.st_size for s in stats)}:{max(s.st_mtime_ns for s in stats)}"
+
+
+def fingerprint(stages: List[Stage], variables: Dict[str, object], inputs: Dict[str, str]) -> None:
+    """Set each stage's fingerprint (stages are in dependency order)."""
+    for stage in stages:
+        h = hashlib.sha256(stage.sql.encode("utf-8"))
+        for dep in stage.deps:
+            h.update(f"dep:{dep.fingerprint}".encode())
+        for pattern in stage.files:
+            h.update(f"file:{file_fingerprint(pattern)}".encode())
+        for name in stage.variables:
+            h.update(f"var:{name}={variables.get(name)!r}".encode())
+        for name in sorted(stage.tokens & set(inputs)):
+            h.update(f"input:{name}={inputs[name]}".encode())
+        stage.fingerprint = h.hexdigest()
+
+
+# -------------------------
+# Execution
+# -------------------------
+
+def _existing_objects(con) -> set:
+    return {r[0] for r in con.execute("""
+        SELECT table_name FROM duckdb_tables() WHERE NOT temporary
+        UNION ALL SELECT view_name FROM duckdb_views() WHERE NOT temporary AND NOT internal
+        UNION ALL SELECT function_name FROM duckdb_functions() WHERE function_type IN ('macro', 'table_macro')
+    """).fetchall()}
+
+
+def _returns_rows(con, stage: Stage) -> bool:
+    statements = con.extract_statements(stage.sql)
+    return bool(statements) and statements[-1].type == duckdb.StatementType.SELECT
+
+
+def _run_stage(con, stage: Stage, variables: Dict[str, object]) -> StageRun:
+    cur = con.cursor()
+    try:
+        for name, value in variables.items():
+            cur.execute(f"SET VARIABLE {name} = ?", [value])
+        t0 = time.perf_counter()
+        result = cur.execute(stage.sql)
+        df = result.fetchdf() if result.description else None
+        return StageRun(stage, "ran", time.perf_counter() - t0, df)
+    finally:
+        cur.close()
+
+
+def run_dag(con, paths: List[Path], jobs: int = 1, force: bool = False,
+            variables: Optional[Dict[str, object]] = None, inputs: Optional[Dict[str, str]] = None,
+            literals: Optional[Dict[str, str]] = None) -> List[StageRun]:
+    """
+    Run the stages of paths on con; returns one StageRun per stage in plan order.
+    inputs maps external tables the stages read (not created by any stage) to a fingerprint
+    of their contents, e.g. the source_manifest of mock_events. literals are written into
+    the SQL in place of getvariable('name') (see inline_literals).
+    """
+    variables, inputs = dict(variables or {}), dict(inputs or {})
+    stages = plan(paths, literals)
+    fingerprint(stages, variables, inputs)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} "
+                "(stage VARCHAR, fingerprint VARCHAR, writes VARCHAR[], ran_at TIMESTAMP)")
+    stored = dict(con.execute(f"SELECT stage, fingerprint FROM {STATE_TABLE}").fetchall())
+    existing = _existing_objects(con)
+
+    runs: Dict[int, StageRun] = {}
+    pending = []
+    for i, stage in enumerate(stages):
+        cached = (not force and stored.get(stage.name) == stage.fingerprint
+                  and stage.creates <= existing and not _returns_rows(con, stage))
+        if cached:
+            runs[i] = StageRun(stage, "cached")
+        else:
+            pending.append(i)
+
+    index = {id(s): i for i, s in enumerate(stages)}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        running = {}
+        while pending or running:
+            for i in [i for i in pending if all(index[id(d)] in runs for d in stages[i].deps)][:max(1, jobs) - len(running)]:
+                pending.remove(i)
+                running[pool.submit(_run_stage, con, stages[i], variables)] = i
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                try:
+                    runs[i] = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+                # Other stages writing the same objects (e.g. an alternative build of a table)
+                # no longer describe what is stored
+                writes = sorted(stages[i].writes)
+                con.execute(f"DELETE FROM {STATE_TABLE} WHERE stage = ? OR len(list_intersect(writes, ?)) > 0",
+                            [stages[i].name, writes])
+                con.execute(f"INSERT INTO {STATE_TABLE} VALUES (?, ?, ?, now()::TIMESTAMP)",
+                            [stages[i].name, stages[i].fingerprint, writes])
+    return [runs[i] for i in range(len(stages))]
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def print_plan(stages: List[Stage]) -> None:
+    for stage in stages:
+        deps = ", ".join(Path(d.name).name for d in stage.deps) or "-"
+        print(f"{stage.name}\n   writes: {', '.join(sorted(stage.writes)) or '-'}\n   after:  {deps}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SQL stages as a dependency graph with result caching.")
+    parser.add_argument("sql", nargs="+", help="SQL stage files, in a valid order")
+    parser.add_argument("--db", type=str, default=":memory:", help="DuckDB database (default: in-memory, no cache)")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Stages run concurrently")
+    parser.add_argument("--force", action="store_true", help="Run every stage, ignoring stored fingerprints")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="DuckDB variable for the SQL (getvariable)")
+    parser.add_argument("--plan", action="store_true", help="Print the stages and their dependencies, run nothing")
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.sql]
+    if args.plan:
+        print_plan(plan(paths))
+        return
+    variables = parse_variables(args.set)
+
+    con = duckdb.connect(args.db)
+    con.execute("SET TimeZone = 'UTC'")
+    t0 = time.perf_counter()
+    runs = run_dag(con, paths, jobs=args.jobs, force=args.force, variables=variables)
+    for run in runs:
+        if run.status == "cached":
+            print(f"♻️ {run.stage.name} (unchanged, skipped)")
+        else:
+            print(f"⚙️ {run.stage.name} ({run.seconds * 1000:.1f} ms)")
+            if run.result is not None:
+                print(run.result.to_markdown(index=False))
+    n_ran = sum(r.status == "ran" for r in runs)
+    print(f"⏱ {n_ran} of {len(runs)} stages ran in {(time.perf_counter() - t0) * 1000:.1f} ms ({args.jobs} jobs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+plan_registry.py
+
+Version-aware registry of the Escaly tracking plan snapshots (events*.json).
+
+  - Each plan file is parsed once and compiled into a compact PlanSpec:
+      event -> EventSpec(version, required identifiers, property -> PropSpec(type, required, pii, enum set))
+    with cross-event property references already resolved.
+  - Compiled specs are pickled under tracking-plan-escaly/.cache/, keyed by the sha256 of
+    the plan files, so a process start only hashes the files and loads one pickle; JSON is
+    re-parsed only when a plan file actually changes.
+  - Lookups are dict hits: registry.plan("1.1.0"), registry.resolve("user_invited", "1.0.0").
+  - diff_plans() lists structural changes between two versions and flags breaking ones
+    (removed events/properties, type changes, newly required fields, removed enum values).
+
+Usage:
+  python tracking-plan-escaly/scripts/plan_registry.py list
+  python tracking-plan-escaly/scripts/plan_registry.py diff 1.0.0 1.1.0
+  python tracking-plan-escaly/scripts/plan_registry.py resolve user_invited 1.0.0
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import pickle
+import warnings
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+try:
+    import jsonschema
+except ImportError:  # optional: only used to check plan files when they are (re)compiled
+    jsonschema = None
+
+PLAN_DIR = Path(__file__).resolve().parents[1]
+CACHE_DIR = PLAN_DIR / ".cache"
+PLAN_GLOB = "events*.json"
+PLAN_SCHEMA = PLAN_DIR / "events.schema.json"
+NON_PLAN_FILES = {PLAN_SCHEMA.name}
+CACHE_FORMAT = 3  # bump when the compiled dataclasses (or the cached state) change shape
+
+
+# -------------------------
+# Compiled form
+# -------------------------
+
+@dataclass(frozen=True)
+class PropSpec:
+    type: Optional[str]
+    required: bool = False
+    pii: bool = False
+    enum: FrozenSet[str] = frozenset()
+
+
+@dataclass(frozen=True)
+class EventSpec:
+    event: str
+    version: str
+    required_identifiers: Tuple[str, ...]
+    properties: Dict[str, PropSpec]
+
+
+@dataclass
+class PlanSpec:
+    name: str
+    version: str
+    sha256: str
+    path: str
+    identifiers: Tuple[str, ...]
+    events: Dict[str, EventSpec] = field(default_factory=dict)
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def parse_plan(path: Path, schema_path: Optional[Path] = PLAN_SCHEMA) -> dict:
+    plan = json.loads(Path(path).read_text(encoding="utf-8"))
+    if jsonschema is not None and schema_path is not None and Path(schema_path).exists():
+        jsonschema.validate(plan, json.loads(Path(schema_path).read_text(encoding="utf-8")))
+    return plan
+
+
+def compile_spec(plan: dict, sha256: str = "", path: str = "") -> PlanSpec:
+    """Compile a parsed plan (dict) into a PlanSpec; cross-event property references are resolved."""
+    cross = plan.get("cross_event_properties", {})
+    spec = PlanSpec(plan.get("name", ""), plan.get("version", ""), sha256, path,
+                    tuple(plan.get("identifiers", {})))
+    for ev in plan["events"]:
+        props = {}
+        for name, p in ev.get("properties", {}).items():
+            if "use" in p:
+                p = cross.get(name, p)
+            props[name] = PropSpec(p.get("type"), bool(p.get("required", False)), bool(p.get("pii", False)),
+                                   frozenset(p.get("enum", ())))
+        spec.events[ev["event"]] = EventSpec(ev["event"], ev.get("version", spec.version),
+                                             tuple(ev.get("required_identifiers", ())), props)
+    return spec
+
+
+@dataclass(frozen=True)
+class Conflict:
+    """Two definitions of one plan version (version) or of one event version (event = (name, version))."""
+    message: str
+    version: Optional[str] = None
+    event: Optional[Tuple[str, str]] = None
+
+
+# -------------------------
+# Registry
+# -------------------------
+
+class PlanRegistry:
+    """
+    All plan snapshots in a directory, compiled once and cached on disk by content hash.
+
+      - plans:   plan version -> PlanSpec (files declaring the same version, e.g. events.json
+                 and events.v1.0.0.json, collapse to one entry; byte-identical files compile once)
+      - by_file: file name -> PlanSpec
+      - index:   (event, event version) -> EventSpec, for O(1) resolution at ingest
+      - conflicts: one Conflict per version declared by files with different contents, and per
+                 (event, version) defined differently by two plan versions. The events.v<version>.json
+                 snapshot wins for a plan version, and the later plan version wins for an event
+                 version. A conflict is issued as a warning only when plan() / resolve() return
+                 the conflicting plan version or event version.
+    """
+
+    def __init__(self, plan_dir: Path = PLAN_DIR, cache_dir: Optional[Path] = CACHE_DIR):
+        self.plan_dir = Path(plan_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.files = sorted(p for p in self.plan_dir.glob(PLAN_GLOB) if p.name not in NON_PLAN_FILES)
+        self.hashes = {p.name: file_sha256(p) for p in self.files}
+        self.cache_hit = False
+        state = self._load_cache()
+        if state is None:
+            state = self._compile()
+            self._save_cache(state)
+        self.by_file: Dict[str, PlanSpec] = state["by_file"]
+        self.plans: Dict[str, PlanSpec] = state["plans"]
+        self.index: Dict[Tuple[str, str], EventSpec] = state["index"]
+        self.conflicts: List[Conflict] = state["conflicts"]
+        self._warned: set = set()
+
+    # --- cache ---
+    @property
+    def cache_key(self) -> str:
+        h = hashlib.sha256(f"format={CACHE_FORMAT}".encode())
+        for name in sorted(self.hashes):
+            h.update(f"{name}:{self.hashes[name]}".encode())
+        return h.hexdigest()
+
+    @property
+    def cache_path(self) -> Optional[Path]:
+        return self.cache_dir / f"registry-{self.cache_key[:16]}.pickle" if self.cache_dir else None
+
+    def _load_cache(self):
+        path = self.cache_path
+        if path is None or not path.exists():
+            return None
+        try:
+            with path.open("rb") as f:
+                state = pickle.load(f)
+        except Exception:  # stale or corrupt cache: rebuild
+            return None
+        self.cache_hit = True
+        return state
+
+    def _save_cache(self, state) -> None:
+        path = self.cache_path
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for old in path.parent.glob("registry-*.pickle"):
+            old.unlink()
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    def _compile(self):
+        by_file, plans, index, conflicts = {}, {}, {}, []
+        by_hash: Dict[str, PlanSpec] = {}
+        by_version: Dict[str, Dict[str, List[str]]] = {}  # version -> sha256 -> files
+        for p in self.files:
+            sha = self.hashes[p.name]
+            spec = by_hash.get(sha)
+            if spec is None:
+                spec = compile_spec(parse_plan(p, self.plan_dir / PLAN_SCHEMA.name), sha, p.name)
+                by_hash[sha] = spec
+            by_file[p.name] = spec
+            by_version.setdefault(spec.version, {}).setdefault(sha, []).append(p.name)
+        for version, files_by_sha in by_version.items():
+            files = [f for fs in files_by_sha.values() for f in fs]
+            snapshot = f"events.v{version}.json"
+            plans[version] = by_file[snapshot if snapshot in files else files[-1]]
+            if len(files_by_sha) > 1:
+                listing = ", ".join(f"{f} ({sha[:12]})" for sha, fs in files_by_sha.items() for f in fs)
+                conflicts.append(Conflict(f"Plan version {version} is declared by files with different contents: "
+                                          f"{listing}; version {version} resolves to {plans[version].path}.", version=version))
+        # Older plan versions first, so a later snapshot wins for the same (event, version)
+        owner: Dict[Tuple[str, str], str] = {}
+        for version in sorted(plans, key=_version_key):
+            for ev in plans[version].events.values():
+                key = (ev.event, ev.version)
+                if key in index and index[key] != ev:
+                    conflicts.append(Conflict(f"Event {ev.event} v{ev.version} is defined differently in plan "
+                                              f"v{owner[key]} and v{version}; using v{version}.", event=key))
+                index[key], owner[key] = ev, version
+        return {"by_file": by_file, "plans": plans, "index": index, "conflicts": conflicts}
+
+    # --- lookups ---
+    @property
+    def versions(self) -> List[str]:
+        return sorted(self.plans, key=_version_key)
+
+    @property
+    def latest(self) -> PlanSpec:
+        return self.plans[self.versions[-1]]
+
+    def plan(self, version_or_file: Optional[str] = None) -> PlanSpec:
+        """Plan by version ("1.1.0"), file name ("events.json") or path; latest when None."""
+        spec = self._find_plan(version_or_file)
+        self._warn(c for c in self.conflicts if c.version == spec.version)
+        return spec
+
+    def _find_plan(self, version_or_file: Optional[str]) -> PlanSpec:
+        if version_or_file is None:
+            return self.latest
+        key = str(version_or_file)
+        if key in self.plans:
+            return self.plans[key]
+        name = Path(key).name
+        if name in self.by_file:
+            return self.by_file[name]
+        raise KeyError(f"No tracking plan {key!r}; known versions {self.versions}, files {sorted(self.by_file)}.")
+
+    def resolve(self, event: str, version: Optional[str] = None) -> EventSpec:
+        """EventSpec for an event at a given event version (latest plan's definition when None)."""
+        if version is None:
+            return self.plan().events[event]
+        try:
+            spec = self.index[(event, version)]
+        except KeyError:
+            raise KeyError(f"No schema for event {event!r} at version {version!r}.") from None
+        self._warn(c for c in self.conflicts if c.event == (event, version))
+        return spec
+
+    def _warn(self, conflicts: Iterable[Conflict]) -> None:
+        for c in conflicts:
+            if c not in self._warned:
+                self._warned.add(c)
+                warnings.warn(c.message, stacklevel=3)
+
+
+def _version_key(v: str):
+    return tuple(int(x) if x.isdigit() else x for x in str(v).split("."))
+
+
+_DEFAULT: Optional[PlanRegistry] = None
+
+
+def default_registry() -> PlanRegistry:
+    """Process-wide registry over tracking-plan-escaly/ (built or loaded from cache once)."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = PlanRegistry()
+    return _DEFAULT
+
+
+def load_spec(path: Path) -> PlanSpec:
+    """Compiled spec for any plan file; files inside the registry directory come from its cache."""
+    path = Path(path)
+    if path.resolve().parent == PLAN_DIR and path.name not in NON_PLAN_FILES:
+        return default_registry().plan(path.name)
+    return compile_spec(parse_plan(path), file_sha256(path), path.name)
+
+
+# -------------------------
+# Structural diff
+# -------------------------
+
+@dataclass(frozen=True)
+class Change:
+    kind: str
+    event: str
+    property: str = ""
+    detail: str = ""
+    breaking: bool = False
+
+
+def diff_plans(old: PlanSpec, new: PlanSpec) -> List[Change]:
+    """Structural changes from `old` to `new` (events, identifiers, properties, types, enums)."""
+    changes: List[Change] = []
+    for name in sorted(set(old.events) - set(new.events)):
+        changes.append(Change("event_removed", name, breaking=True))
+    for name in sorted(set(new.events) - set(old.events)):
+        changes.append(Change("event_added", name, detail=f"v{new.events[name].version}"))
+    for name in sorted(set(old.events) & set(new.events)):
+        changes.extend(_diff_event(old.events[name], new.events[name]))
+    return changes
+
+
+def _diff_event(a: EventSpec, b: EventSpec) -> Iterable[Change]:
+    ev = a.event
+    if a.version != b.version:
+        yield Change("event_version", ev, detail=f"{a.version} -> {b.version}")
+    for ident in sorted(set(b.required_identifiers) - set(a.required_identifiers)):
+        yield Change("identifier_required", ev, ident, breaking=True)
+    for ident in sorted(set(a.required_identifiers) - set(b.required_identifiers)):
+        yield Change("identifier_optional", ev, ident)
+    for prop in sorted(set(a.properties) - set(b.properties)):
+        yield Change("property_removed", ev, prop, breaking=True)
+    for prop in sorted(set(b.properties) - set(a.properties)):
+        p = b.properties[prop]
+        yield Change("property_added", ev, prop, detail=p.type or "", breaking=p.required)
+    for prop in sorted(set(a.properties) & set(b.properties)):
+        pa, pb = a.properties[prop], b.properties[prop]
+        if pa.type != pb.type:
+            yield Change("type_changed", ev, prop, f"{pa.type} -> {pb.type}", breaking=True)
+        if pa.required != pb.required:
+            yield Change("required_changed", ev, prop, f"{pa.required} -> {pb.required}", breaking=pb.required)
+        if pa.pii != pb.pii:
+            yield Change("pii_changed", ev, prop, f"{pa.pii} -> {pb.pii}")
+        if pb.enum - pa.enum:
+            yield Change("enum_values_added", ev, prop, ", ".join(sorted(pb.enum - pa.enum)))
+        if pa.enum - pb.enum:
+            yield Change("enum_values_removed", ev, prop, ", ".join(sorted(pa.enum - pb.enum)), breaking=True)
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, diff and resolve Escaly tracking plan versions.")
+    parser.add_argument("--plan_dir", type=str, default=str(PLAN_DIR))
+    parser.add_argument("--no_cache", action="store_true", help="Compile from JSON without reading/writing the cache")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="List plan versions, files and events")
+    d = sub.add_parser("diff", help="Structural diff between two plan versions (or files)")
+    d.add_argument("old")
+    d.add_argument("new")
+    r = sub.add_parser("resolve", help="Show the schema that applies to an event version")
+    r.add_argument("event")
+    r.add_argument("version", nargs="?", default=None)
+    args = parser.parse_args()
+
+    reg = PlanRegistry(Path(args.plan_dir), cache_dir=None if args.no_cache else Path(args.plan_dir) / ".cache")
+    source = "cache" if reg.cache_hit else "compiled from JSON"
+    if args.cmd == "list":
+        print(f"📚 {len(reg.plans)} plan versions ({source})")
+        for v in reg.versions:
+            spec = reg.plans[v]
+            print(f"  v{v}  ({spec.path})  events: {', '.join(spec.events)}")
+            for f in sorted(f for f, s in reg.by_file.items() if s.version == v):
+                print(f"      {f}  sha256={reg.hashes[f][:12]}")
+        for c in reg.conflicts:
+            print(f"⚠️ {c.message}")
+    elif args.cmd == "diff":
+        old, new = reg.plan(args.old), reg.plan(args.new)
+        changes = diff_plans(old, new)
+        n_breaking = sum(c.breaking for c in changes)
+        print(f"🔀 v{old.version} -> v{new.version}: {len(changes)} changes ({n_breaking} breaking)")
+        for c in changes:
+            flag = "❌" if c.breaking else "➕" if c.kind.endswith("added") else "•"
+            target = f"{c.event}.{c.property}" if c.property else c.event
+            print(f"  {flag} {c.kind:<20} {target}" + (f"  ({c.detail})" if c.detail else ""))
+    else:
+        ev = reg.resolve(args.event, args.version)
+        print(f"🔎 {ev.event} v{ev.version}: required identifiers {list(ev.required_identifiers)}")
+        for name, p in ev.properties.items():
+            extra = f" enum={sorted(p.enum)}" if p.enum else ""
+            print(f"  - {name}: {p.type}{' (required)' if p.required else ''}{' (pii)' if p.pii else ''}{extra}")
+
+
+if __name__ == "__main__":
+    main()
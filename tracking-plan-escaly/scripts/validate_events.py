@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+validate_events.py
+
+Validate event streams (CSV, Parquet or NDJSON) against the Escaly tracking plan.
+
+The plan is loaded through plan_registry (compiled once, cached by file hash) and turned
+into a flat check table (event, property, rule, severity, ...):
+
+  rule                severity  fails when
+  ------------------  --------  ----------------------------------------------------------
+  unknown_event       error     event name is not defined in the plan
+  missing_identifier  error     a required identifier (required_identifiers) is null/empty
+  missing_property    error     a property marked required is null/empty
+  missing_column      error     a required identifier/property column is absent from the data
+  type                error     value does not parse as the declared integer/number/boolean/timestamp
+  enum                error     value is not one of the declared enum values
+  pii                 error     a property flagged pii=true carries a value
+  undeclared          warning   a column has a value on an event that does not declare it
+
+All checks are bound to the dataset's columns and evaluated in ONE DuckDB scan grouped
+by event: each distinct predicate (e.g. "channel is not a valid enum value") is one
+COUNT(*) FILTER aggregate shared by every event that checks it. Validation is
+vectorized and costs a single pass over the data however many events the plan defines.
+
+Usage:
+  python tracking-plan-escaly/scripts/validate_events.py case-studies/escaly-activation-funnel/mock_data.csv
+  python tracking-plan-escaly/scripts/validate_events.py case-studies/escaly-retention-cohorts/data/events.csv \\
+      --event_col event_name --time_col event_ts
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+import duckdb
+
+from plan_registry import PlanSpec, compile_spec, load_spec
+
+PLAN_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_PLAN = PLAN_DIR / "events.v1.1.0.json"
+
+SEVERITY = {
+    "unknown_event": "error",
+    "missing_identifier": "error",
+    "missing_property": "error",
+    "missing_column": "error",
+    "type": "error",
+    "enum": "error",
+    "pii": "error",
+    "undeclared": "warning",
+}
+TYPE_CASTS = {"integer": "BIGINT", "number": "DOUBLE", "boolean": "BOOLEAN", "timestamp": "TIMESTAMPTZ"}
+# Envelope columns every event may carry without declaring them
+ENVELOPE_COLUMNS = {"event", "event_name", "occurred_at", "event_ts", "timestamp", "received_at", "event_date"}
+
+
+# -------------------------
+# Compiled plan
+# -------------------------
+
+@dataclass(frozen=True)
+class Check:
+    event: str
+    property: str
+    rule: str
+    required: bool = False
+    type: Optional[str] = None
+    enum: Tuple[str, ...] = ()
+
+    @property
+    def severity(self) -> str:
+        return SEVERITY[self.rule]
+
+
+@dataclass
+class CompiledPlan:
+    name: str
+    version: str
+    identifiers: Tuple[str, ...]
+    checks: Dict[str, List[Check]] = field(default_factory=dict)       # event -> checks
+    declared: Dict[str, frozenset] = field(default_factory=dict)       # event -> declared columns
+
+    @property
+    def events(self) -> List[str]:
+        return list(self.checks)
+
+    def check_table(self) -> List[dict]:
+        """Flat (event, property, rule, ...) rows, e.g. for inspection or export."""
+        return [dict(event=c.event, property=c.property, rule=c.rule, severity=c.severity,
+                     required=c.required, type=c.type, enum=list(c.enum))
+                for checks in self.checks.values() for c in checks]
+
+
+def compile_plan(plan: Union[dict, PlanSpec]) -> CompiledPlan:
+    """Turn the plan (JSON dict or registry PlanSpec) into per-event check lists (independent of any dataset)."""
+    spec = plan if isinstance(plan, PlanSpec) else compile_spec(plan)
+    compiled = CompiledPlan(spec.name, spec.version, spec.identifiers)
+    for name, ev in spec.events.items():
+        checks = [Check(name, ident, "missing_identifier", required=True) for ident in ev.required_identifiers]
+        for prop, p in ev.properties.items():
+            if p.required:
+                checks.append(Check(name, prop, "missing_property", required=True))
+            if p.type in TYPE_CASTS:
+                checks.append(Check(name, prop, "type", type=p.type))
+            if p.type == "enum" and p.enum:
+                checks.append(Check(name, prop, "enum", enum=tuple(sorted(p.enum))))
+            if p.pii:
+                checks.append(Check(name, prop, "pii"))
+        compiled.checks[name] = checks
+        compiled.declared[name] = frozenset(spec.identifiers) | frozenset(ev.properties)
+    return compiled
+
+
+# -------------------------
+# Binding checks to a dataset
+# -------------------------
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _lit(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def source_sql(path: Path) -> str:
+    """Raw (untyped where possible) relation over CSV / Parquet / NDJSON input."""
+    p = Path(path)
+    suffix = p.suffix.lower()
+    if p.is_dir():
+        return f"read_parquet('{p.as_posix()}/**/*.parquet', hive_partitioning=true)"
+    if suffix in (".parquet", ".pq"):
+        return f"read_parquet('{p.as_posix()}')"
+    if suffix in (".ndjson", ".jsonl", ".json"):
+        return f"read_json('{p.as_posix()}', format='newline_delimited')"
+    # all_varchar: type rules are checked on the raw strings, not on DuckDB's sniffed types
+    return f"read_csv('{p.as_posix()}', header=true, all_varchar=true)"
+
+
+def relation_sql(con, path: Path) -> Tuple[str, Dict[str, str]]:
+    """Relation SQL plus its {column: DuckDB type}; a nested `properties` object (NDJSON) is flattened."""
+    src = source_sql(path)
+    types = {c[0]: c[1] for c in con.execute(f"DESCRIBE SELECT * FROM {src}").fetchall()}
+    if types.get("properties", "").startswith("STRUCT"):
+        src = f"(SELECT * EXCLUDE (properties), properties.* FROM {src})"
+        types = {c[0]: c[1] for c in con.execute(f"DESCRIBE SELECT * FROM {src}").fetchall()}
+    return src, types
+
+
+# Rules answered by one per-column non-empty COUNT (no per-row predicate needed)
+EMPTY_RULES = ("missing_identifier", "missing_property")
+PRESENT_RULES = ("pii", "undeclared")
+# Storage types that already guarantee a plan type (typed Parquet / NDJSON columns)
+NATIVE_TYPES = {
+    "integer": ("BIGINT", "INTEGER", "SMALLINT", "TINYINT", "HUGEINT", "UBIGINT", "UINTEGER"),
+    "number": ("DOUBLE", "FLOAT", "BIGINT", "INTEGER", "DECIMAL"),
+    "boolean": ("BOOLEAN",),
+    "timestamp": ("TIMESTAMP", "DATE"),
+}
+
+
+def _violation_sql(check: Check, col: str, col_type: str = "VARCHAR") -> Optional[str]:
+    """
+    Per-row violation predicate for value rules ("nonempty:<col>" for presence rules, which
+    share one COUNT per column; None when the column's storage type already satisfies the rule).
+    """
+    v = _q(col) if col_type == "VARCHAR" else f"{_q(col)}::VARCHAR"
+    if check.rule in EMPTY_RULES or check.rule in PRESENT_RULES:
+        return f"nonempty:{col}"
+    if check.rule == "type":
+        if col_type.startswith(NATIVE_TYPES[check.type]):
+            return None
+        if col_type != "VARCHAR":
+            return f"({_q(col)} IS NOT NULL AND TRY_CAST({_q(col)} AS {TYPE_CASTS[check.type]}) IS NULL)"
+        return f"({v} <> '' AND TRY_CAST({v} AS {TYPE_CASTS[check.type]}) IS NULL)"
+    if check.rule == "enum":
+        return f"({v} NOT IN ({', '.join(map(_lit, check.enum))}))"
+    raise ValueError(f"Unknown rule {check.rule!r}")
+
+
+def bind_checks(compiled: CompiledPlan, columns: Mapping[str, str], event_col: str,
+                time_col: Optional[str], include_undeclared: bool = True) -> List[Tuple[Check, Optional[str]]]:
+    """
+    Pair every applicable check with its violation predicate for this dataset
+    ({column: type}); a predicate of None means the required column is missing entirely.
+    """
+    bound: List[Tuple[Check, Optional[str]]] = []
+    envelope = ENVELOPE_COLUMNS | {event_col} | ({time_col} if time_col else set())
+    for event, checks in compiled.checks.items():
+        for check in checks:
+            if check.property not in columns:
+                if check.required:
+                    bound.append((Check(event, check.property, "missing_column", required=True), None))
+                continue
+            pred = _violation_sql(check, check.property, columns[check.property])
+            if pred is not None:
+                bound.append((check, pred))
+        if include_undeclared:
+            for col in columns:
+                if col not in compiled.declared[event] and col not in envelope:
+                    bound.append((Check(event, col, "undeclared"), f"nonempty:{col}"))
+    if time_col:
+        ts_check = Check("*", time_col, "type", type="timestamp")
+        pred = _violation_sql(ts_check, time_col, columns[time_col])
+        if pred is not None:
+            bound.append((ts_check, pred))
+    return bound
+
+
+def validate(path: Path, compiled: CompiledPlan, event_col: str = "event", time_col: Optional[str] = "occurred_at",
+             include_undeclared: bool = True, con=None):
+    """Run every check in one grouped aggregate scan; returns (report DataFrame, total rows, seconds)."""
+    con = con or duckdb.connect()
+    src, columns = relation_sql(con, path)
+    if event_col not in columns:
+        raise ValueError(f"Event column {event_col!r} not found; columns are {list(columns)}.")
+    if time_col and time_col not in columns:
+        time_col = None
+    bound = bind_checks(compiled, columns, event_col, time_col, include_undeclared)
+
+    # Checks share aggregates across events: one non-empty COUNT per column (missing / pii /
+    # undeclared) and one COUNT_IF per distinct value predicate (type / enum), so the scan
+    # evaluates each once per row and the GROUP BY splits the counts by event.
+    preds: Dict[str, int] = {}
+    for _, pred in bound:
+        if pred is not None and pred not in preds:
+            preds[pred] = len(preds)
+    aggs = ["COUNT(*) AS n"]
+    for pred, j in preds.items():
+        if pred.startswith("nonempty:"):
+            col = pred.split(":", 1)[1]
+            expr = _q(col) if columns[col] == "VARCHAR" else f"{_q(col)}::VARCHAR"
+            aggs.append(f"COUNT(NULLIF({expr}, '')) AS v{j}")
+        else:
+            aggs.append(f"COUNT_IF({pred}) AS v{j}")
+    ev = _q(event_col)
+
+    t0 = time.perf_counter()
+    cur = con.execute(f"SELECT {ev}::VARCHAR AS event, {', '.join(aggs)} FROM {src} GROUP BY 1")
+    names = [d[0] for d in cur.description]
+    groups = {r[0]: dict(zip(names, r)) for r in cur.fetchall()}
+    secs = time.perf_counter() - t0
+
+    def scope_of(check):
+        if check.event == "*":
+            return list(groups.values())
+        return [groups[check.event]] if check.event in groups else []
+
+    n_total = sum(g["n"] for g in groups.values())
+    report = []
+    for event, g in groups.items():
+        if event not in compiled.checks:
+            report.append(dict(event=event if event is not None else "<null>", property=event_col,
+                               rule="unknown_event", severity="error", rows_checked=g["n"],
+                               violations=g["n"], example=event))
+    failing_values = []
+    for check, pred in bound:
+        scope = scope_of(check)
+        rows = sum(g["n"] for g in scope)
+        if pred is None:
+            violations = rows
+        elif check.rule in EMPTY_RULES:
+            violations = rows - sum(g[f"v{preds[pred]}"] for g in scope)
+        else:
+            violations = sum(g[f"v{preds[pred]}"] for g in scope)
+        if violations:
+            report.append(dict(event=check.event, property=check.property, rule=check.rule,
+                               severity=check.severity, rows_checked=rows, violations=violations, example=None))
+            if check.rule in ("type", "enum"):
+                failing_values.append((len(report) - 1, check, pred))
+
+    # Example values only for failing type/enum checks (never for pii), in one small extra query
+    if failing_values:
+        ex = []
+        for k, (_, check, pred) in enumerate(failing_values):
+            scope = pred if check.event == "*" else f"{ev} = {_lit(check.event)} AND {pred}"
+            ex.append(f"ANY_VALUE({_q(check.property)}::VARCHAR) FILTER (WHERE {scope}) AS x{k}")
+        row = con.execute(f"SELECT {', '.join(ex)} FROM {src}").fetchone()
+        for (i, _, _), value in zip(failing_values, row):
+            report[i]["example"] = value
+
+    import pandas as pd
+    df = pd.DataFrame(report, columns=["event", "property", "rule", "severity", "rows_checked", "violations", "example"])
+    if not df.empty:
+        df["example"] = df["example"].fillna("")
+        df["violation_pct"] = (100.0 * df["violations"] / df["rows_checked"].where(df["rows_checked"] > 0)).round(2)
+        df = df.sort_values(["severity", "event", "property", "rule"]).reset_index(drop=True)
+    return df, n_total, secs
+
+
+def detect_columns(con, path: Path, event_col: Optional[str], time_col: Optional[str]):
+    """Default to the funnel layout (event / occurred_at) or the retention layout (event_name / event_ts)."""
+    _, columns = relation_sql(con, path)
+    if event_col is None:
+        event_col = next((c for c in ("event", "event_name") if c in columns), "event")
+    if time_col is None:
+        time_col = next((c for c in ("occurred_at", "event_ts", "timestamp") if c in columns), None)
+    return event_col, time_col
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate CSV / Parquet / NDJSON events against the tracking plan.")
+    parser.add_argument("data", help="Events file (CSV, Parquet, NDJSON) or partitioned Parquet directory")
+    parser.add_argument("--plan", type=str, default=str(DEFAULT_PLAN), help="Tracking plan JSON")
+    parser.add_argument("--event_col", type=str, default=None, help="Event name column (default: event / event_name)")
+    parser.add_argument("--time_col", type=str, default=None, help="Timestamp column (default: occurred_at / event_ts)")
+    parser.add_argument("--no_undeclared", action="store_true", help="Skip the undeclared-column warnings")
+    parser.add_argument("--out", type=str, default=None, help="Write the violation report to CSV / JSON")
+    parser.add_argument("--fail_on_error", action="store_true", help="Exit with status 1 if any error-level rule fails")
+    args = parser.parse_args()
+
+    compiled = compile_plan(load_spec(Path(args.plan)))
+    con = duckdb.connect()
+    event_col, time_col = detect_columns(con, Path(args.data), args.event_col, args.time_col)
+    df, n_rows, secs = validate(Path(args.data), compiled, event_col, time_col,
+                                include_undeclared=not args.no_undeclared, con=con)
+
+    n_checks = sum(len(c) for c in compiled.checks.values())
+    rate = n_rows / secs if secs > 0 else float("inf")
+    print(f"🧾 {compiled.name} v{compiled.version}: {len(compiled.checks)} events, {n_checks} compiled checks")
+    print(f"⚡ Scanned {n_rows:,} rows in {secs:.3f}s ({rate:,.0f} rows/s)")
+    if df.empty:
+        print("✅ No violations.")
+    else:
+        n_err = int(df.loc[df["severity"] == "error", "violations"].sum())
+        n_warn = int(df.loc[df["severity"] == "warning", "violations"].sum())
+        print(f"❌ {n_err:,} error and ⚠️ {n_warn:,} warning violations\n")
+        print(df.to_markdown(index=False))
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if out.suffix.lower() == ".json":
+            df.to_json(out, orient="records", indent=2)
+        else:
+            df.to_csv(out, index=False)
+        print(f"💾 Wrote report: {out}")
+
+    if args.fail_on_error and not df.empty and (df["severity"] == "error").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()